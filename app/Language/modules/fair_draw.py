@@ -46,6 +46,11 @@ fair_draw_settings = {
             "description": "启用后按时间参与公平抽取计算",
             "switchbutton_name": {"enable": "", "disable": ""},
         },
+        "group_proportional_draw": {
+            "name": "小组按成员权重抽取",
+            "description": "启用后抽取小组时，小组被抽中的概率与组内成员公平权重之和成正比；关闭时每个小组概率相同",
+            "switchbutton_name": {"enable": "", "disable": ""},
+        },
         "frequency_function": {
             "name": "频率惩罚函数",
             "description": "选择频率惩罚的计算函数类型",
@@ -178,6 +183,10 @@ fair_draw_settings = {
             "name": "Fair pick by time",
             "description": "Enable to participate in fair pick by time",
         },
+        "group_proportional_draw": {
+            "name": "Pick groups by member weight",
+            "description": "When enabled, a group's chance of being picked is proportional to the sum of its members' fair weights; when disabled, every group has the same chance",
+        },
         "base_weight": {
             "name": "Base weight",
             "description": "Set the base weight of each option",
@@ -303,6 +312,10 @@ fair_draw_settings = {
             "name": "時間で公平抽選",
             "description": "有効にすると時間参加で公平抽選",
         },
+        "group_proportional_draw": {
+            "name": "メンバーの重みでグループを抽選",
+            "description": "有効にすると、グループが選ばれる確率はメンバーの公平重みの合計に比例します。無効の場合、すべてのグループが同じ確率になります",
+        },
         "base_weight": {
             "name": "基本重み",
             "description": "各オプションの基本重みを設定",
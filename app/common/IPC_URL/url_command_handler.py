@@ -75,6 +75,8 @@ class URLCommandHandler(QObject):
             "data/lottery_list": self._handle_get_lottery_list,
             "data/roll_call_history": self._handle_get_roll_call_history,
             "data/lottery_history": self._handle_get_lottery_history,
+            # 性能诊断命令（只读）
+            "perf/draw_stats": self._handle_get_draw_stats,
         }
 
         # 设置页面映射
@@ -253,7 +255,7 @@ class URLCommandHandler(QObject):
         from app.tools.settings_access import readme_settings_async
         from app.common.safety.password import is_configured as password_is_configured
 
-        if command.startswith("data/"):
+        if command.startswith(("data/", "perf/")):
             logger.debug(f"命令无需验证（数据只读）：{command}")
             return False
 
@@ -1146,6 +1148,22 @@ class URLCommandHandler(QObject):
             "data": history_data,
         }
 
+    def _handle_get_draw_stats(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """获取抽取流程分阶段耗时统计与历史记录写盘统计（只读）"""
+        from app.tools.draw_timing import get_draw_timing_stats
+        from app.tools.history_writer import get_history_writer_stats
+
+        query = params.get("query", {}) or {}
+        pipeline = query.get("pipeline") or None
+
+        return {
+            "status": "success",
+            "message": "抽取耗时统计获取成功",
+            "pipeline": pipeline,
+            "data": get_draw_timing_stats(pipeline),
+            "history_writer": get_history_writer_stats(),
+        }
+
     def register_command(
         self,
         command: str,
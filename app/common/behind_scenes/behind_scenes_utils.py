@@ -1,10 +1,119 @@
 # ==================================================
 # 内幕工具类
 # ==================================================
+import threading
 import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
 from loguru import logger
 
-from app.common.safety.secure_store import read_behind_scenes_settings
+from app.common.safety.secure_store import (
+    get_behind_scenes_version,
+    read_behind_scenes_settings,
+)
+
+# 必中权重
+GUARANTEED_WEIGHT = 1000.0
+
+
+class BehindScenesWeights(list):
+    """内幕权重列表，附带必中项在列表中的下标"""
+
+    def __init__(self, weights: Iterable[float], guaranteed_indices: List[int]):
+        super().__init__(weights)
+        self.guaranteed_indices = guaranteed_indices
+
+
+class BehindScenesTable:
+    """编译后的内幕权重表
+
+    把某一模式（点名/某个奖池的抽奖）下的内幕设置整理为按姓名索引的数组：
+    是否启用、概率与指定奖品。第 0 行为未设置人员的默认值（未启用，概率 1.0）。
+    应用权重时只需按候选姓名取行号，再用数组运算一次算出全部权重。
+    """
+
+    __slots__ = ("disabled", "rows", "enabled", "probability", "prize_codes", "prizes")
+
+    def __init__(self, settings: Any, mode: int, pool_name: Optional[str] = None):
+        """
+        Args:
+            settings: 内幕设置数据（read_behind_scenes_settings 的返回值）
+            mode: 模式（0=点名, 1=抽奖）
+            pool_name: 奖池名称（仅在抽奖模式下使用）
+        """
+        self.disabled = bool(
+            settings
+            and isinstance(settings, dict)
+            and not settings.get("enabled_global", True)
+        )
+        self.rows: Dict[str, int] = {}
+        enabled = [False]
+        probability = [1.0]
+        prize_codes = [-1]
+        prize_index: Dict[str, int] = {}
+
+        if not self.disabled:
+            for name, person_settings in settings.items():
+                if not isinstance(person_settings, dict):
+                    # 跳过 enabled_global 等全局设置项
+                    continue
+                if mode == 0:
+                    prob_settings = person_settings.get("roll_call", {})
+                    prize = ""
+                else:
+                    lottery_settings = person_settings.get("lottery", {})
+                    if not (pool_name and pool_name in lottery_settings):
+                        continue
+                    prob_settings = lottery_settings[pool_name]
+                    prize = prob_settings.get("prize", "")
+
+                self.rows[name] = len(enabled)
+                enabled.append(bool(prob_settings.get("enabled", False)))
+                probability.append(float(prob_settings.get("probability", 1.0)))
+                prize_codes.append(
+                    prize_index.setdefault(prize, len(prize_index)) if prize else -1
+                )
+
+        self.enabled = np.array(enabled, dtype=bool)
+        self.probability = np.array(probability, dtype=float)
+        self.prize_codes = np.array(prize_codes, dtype=np.intp)
+        self.prizes = list(prize_index)
+
+    def gather(
+        self, names: List[str], drawn_prizes: Optional[Iterable[str]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """计算候选人员的权重
+
+        Args:
+            names: 候选姓名列表
+            drawn_prizes: 抽中的奖品（抽奖模式下传入，指定奖品被抽中的人员权重提高 10 倍，
+                未被抽中的人员使用正常权重；为 None 时不考虑指定奖品）
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (是否保留, 权重)
+        """
+        rows = np.fromiter(
+            (self.rows.get(name, 0) for name in names), dtype=np.intp, count=len(names)
+        )
+        enabled = self.enabled[rows]
+        probability = self.probability[rows]
+
+        if drawn_prizes is not None:
+            drawn = set(drawn_prizes)
+            # 末尾追加一项 False，未指定奖品（编码 -1）的人员取到该项
+            prize_hit = np.array([prize in drawn for prize in self.prizes] + [False])
+            hit = prize_hit[self.prize_codes[rows]]
+            boosted = np.where(probability < 1000, probability * 10, probability)
+            probability = np.where(hit, boosted, 1.0)
+
+        weights = np.where(
+            enabled,
+            np.where(probability >= 1000, GUARANTEED_WEIGHT, probability),
+            1.0,
+        )
+        keep = ~(enabled & (probability == 0))
+        return keep, weights
 
 
 class BehindScenesUtils:
@@ -14,6 +123,12 @@ class BehindScenesUtils:
     _cache_timestamp = 0
     _cache_ttl = 5.0
 
+    # 编译后的权重表，随内幕设置文件版本失效
+    _tables: Dict[Hashable, BehindScenesTable] = {}
+    _tables_settings = None
+    _tables_version = None
+    _tables_lock = threading.Lock()
+
     @staticmethod
     def get_behind_scenes_settings(use_cache=True):
         """获取内幕设置数据
@@ -88,6 +203,56 @@ class BehindScenesUtils:
             logger.error(f"获取概率设置失败: {e}")
             return {"enabled": False, "probability": 1.0}
 
+    @staticmethod
+    def get_compiled_table(mode, pool_name=None):
+        """获取编译后的内幕权重表
+
+        设置文件版本戳变化时重新读取设置并丢弃全部已编译的表。
+
+        Args:
+            mode: 模式（0=点名, 1=抽奖）
+            pool_name: 奖池名称（仅在抽奖模式下使用）
+
+        Returns:
+            BehindScenesTable: 内幕权重表
+        """
+        key = (0, None) if mode == 0 else (1, pool_name)
+        version = get_behind_scenes_version()
+        with BehindScenesUtils._tables_lock:
+            if (
+                BehindScenesUtils._tables_settings is None
+                or version != BehindScenesUtils._tables_version
+            ):
+                BehindScenesUtils._tables.clear()
+                BehindScenesUtils._tables_settings = (
+                    BehindScenesUtils.get_behind_scenes_settings(use_cache=False)
+                )
+                # 读取时可能创建设置文件，以读取后的版本为准
+                BehindScenesUtils._tables_version = get_behind_scenes_version()
+
+            table = BehindScenesUtils._tables.get(key)
+            if table is None:
+                table = BehindScenesTable(
+                    BehindScenesUtils._tables_settings, mode, pool_name
+                )
+                BehindScenesUtils._tables[key] = table
+            return table
+
+    @staticmethod
+    def _apply_table(entries, table, drawn_prizes=None):
+        if table.disabled or not table.rows:
+            return list(entries), BehindScenesWeights([1.0] * len(entries), [])
+
+        keep, weights = table.gather(
+            [entry.get("name", "") for entry in entries], drawn_prizes
+        )
+        filtered = [
+            entry for entry, kept in zip(entries, keep.tolist(), strict=True) if kept
+        ]
+        weights = weights[keep]
+        guaranteed = np.flatnonzero(weights == GUARANTEED_WEIGHT).tolist()
+        return filtered, BehindScenesWeights(weights.tolist(), guaranteed)
+
     @staticmethod
     def apply_probability_weights(
         students_dict_list, mode, class_name, pool_name=None, prize_list=None
@@ -105,88 +270,12 @@ class BehindScenesUtils:
             tuple: (过滤后的学生列表, 权重列表)
         """
         try:
-            settings = BehindScenesUtils.get_behind_scenes_settings()
-            if (
-                settings
-                and isinstance(settings, dict)
-                and not settings.get("enabled_global", True)
-            ):
-                return students_dict_list, [1.0] * len(students_dict_list)
-
-            # 构建抽中奖品集合（用于快速查找）
-            drawn_prizes = set(prize_list) if prize_list else set()
-
-            # 如果有奖品-学生关联，记录日志
-            if prize_list and pool_name:
-                prize_to_students = {}
-                for prize_name in prize_list:
-                    for student_name, student_settings in settings.items():
-                        lottery_settings = student_settings.get("lottery", {})
-                        if pool_name in lottery_settings:
-                            pool_setting = lottery_settings[pool_name]
-                            assigned_prize = pool_setting.get("prize", "")
-                            if assigned_prize == prize_name:
-                                if prize_name not in prize_to_students:
-                                    prize_to_students[prize_name] = []
-                                prize_to_students[prize_name].append(student_name)
-
-            filtered_students = []
-            weights = []
-
-            for student in students_dict_list:
-                name = student.get("name", "")
-
-                if name in settings:
-                    if mode == 0:
-                        # 点名模式
-                        prob_settings = settings[name].get("roll_call", {})
-                        enabled = prob_settings.get("enabled", False)
-                        probability = prob_settings.get("probability", 1.0)
-                    else:
-                        # 抽奖模式
-                        lottery_settings = settings[name].get("lottery", {})
-                        if pool_name in lottery_settings:
-                            prob_settings = lottery_settings[pool_name]
-                            enabled = prob_settings.get("enabled", False)
-                            probability = prob_settings.get("probability", 1.0)
-
-                            # 检查该学生指定的奖品是否在抽中的奖品列表中
-                            assigned_prize = prob_settings.get("prize", "")
-                            if assigned_prize and assigned_prize in drawn_prizes:
-                                # 指定的奖品被抽中，提高该学生的权重
-                                if probability < 1000:
-                                    # 如果不是必中，则提高权重
-                                    probability = probability * 10
-                            else:
-                                # 指定的奖品未被抽中，使用正常权重
-                                probability = 1.0
-                        else:
-                            # 未设置该奖池的权重，使用默认值
-                            enabled = False
-                            probability = 1.0
-
-                    if enabled:
-                        if probability == 0:
-                            # 禁用：排除该学生
-                            continue
-                        elif probability >= 1000:
-                            # 必中：设置极高权重
-                            filtered_students.append(student)
-                            weights.append(1000.0)
-                        else:
-                            # 直接使用用户输入的权重值
-                            filtered_students.append(student)
-                            weights.append(probability)
-                    else:
-                        # 未启用：正常权重
-                        filtered_students.append(student)
-                        weights.append(1.0)
-                else:
-                    # 未设置：正常权重
-                    filtered_students.append(student)
-                    weights.append(1.0)
-
-            return filtered_students, weights
+            table = BehindScenesUtils.get_compiled_table(mode, pool_name)
+            return BehindScenesUtils._apply_table(
+                students_dict_list,
+                table,
+                None if mode == 0 else (prize_list or ()),
+            )
         except Exception as e:
             logger.error(f"应用内幕设置失败: {e}")
             return students_dict_list, [1.0] * len(students_dict_list)
@@ -204,58 +293,11 @@ class BehindScenesUtils:
             tuple: (过滤后的奖品列表, 权重列表)
         """
         try:
-            settings = BehindScenesUtils.get_behind_scenes_settings()
-            if (
-                settings
-                and isinstance(settings, dict)
-                and not settings.get("enabled_global", True)
-            ):
-                return items, [1.0] * len(items)
-
-            filtered_items = []
-            weights = []
-
-            for item in items:
-                name = item.get("name", "")
-                if name in settings:
-                    if mode == 0:
-                        # 点名模式（奖品不使用点名模式）
-                        filtered_items.append(item)
-                        weights.append(1.0)
-                    else:
-                        # 抽奖模式
-                        lottery_settings = settings[name].get("lottery", {})
-                        if pool_name and pool_name in lottery_settings:
-                            prob_settings = lottery_settings[pool_name]
-                            enabled = prob_settings.get("enabled", False)
-                            probability = prob_settings.get("probability", 1.0)
-                        else:
-                            # 未设置该奖池的权重，使用默认值
-                            enabled = False
-                            probability = 1.0
-
-                        if enabled:
-                            if probability == 0:
-                                # 禁用：排除该奖品
-                                continue
-                            elif probability >= 1000:
-                                # 必中：设置极高权重
-                                filtered_items.append(item)
-                                weights.append(1000.0)
-                            else:
-                                # 直接使用用户输入的权重值
-                                filtered_items.append(item)
-                                weights.append(probability)
-                        else:
-                            # 未启用：正常权重
-                            filtered_items.append(item)
-                            weights.append(1.0)
-                else:
-                    # 未设置：正常权重
-                    filtered_items.append(item)
-                    weights.append(1.0)
-
-            return filtered_items, weights
+            if mode == 0:
+                # 点名模式（奖品不使用点名模式）
+                return items, BehindScenesWeights([1.0] * len(items), [])
+            table = BehindScenesUtils.get_compiled_table(mode, pool_name)
+            return BehindScenesUtils._apply_table(items, table)
         except Exception as e:
             logger.error(f"应用内幕设置失败: {e}")
             return items, [1.0] * len(items)
@@ -268,7 +310,7 @@ class BehindScenesUtils:
 
         Args:
             students_with_weight: 学生列表
-            weights: 权重列表
+            weights: 权重列表（apply_probability_weights 的返回值可直接取用其中记录的必中下标）
             class_name: 班级名称（用于日志）
             pool_name: 奖池名称（仅在抽奖模式下使用）
 
@@ -276,16 +318,18 @@ class BehindScenesUtils:
             list: 选中的学生列表（如果存在必中人员）
         """
         try:
-            guaranteed_students = []
-            for i, (student, weight) in enumerate(
-                zip(students_with_weight, weights, strict=True)
-            ):
-                if weight == 1000.0:
-                    guaranteed_students.append(student)
+            guaranteed_indices = getattr(weights, "guaranteed_indices", None)
+            if guaranteed_indices is None:
+                guaranteed_indices = [
+                    i
+                    for i, (_, weight) in enumerate(
+                        zip(students_with_weight, weights, strict=True)
+                    )
+                    if weight == GUARANTEED_WEIGHT
+                ]
 
-            if guaranteed_students:
-                names = [s.get("name", "") for s in guaranteed_students]
-                return guaranteed_students
+            if guaranteed_indices:
+                return [students_with_weight[i] for i in guaranteed_indices]
 
             return None
         except Exception as e:
@@ -1,8 +1,11 @@
 # ==================================================
 # 导入模块
 # ==================================================
+import os
 import json
-from typing import List, Dict, Any, Tuple
+import threading
+from types import MappingProxyType
+from typing import List, Dict, Any, Tuple, Callable, Optional, Mapping
 from loguru import logger
 
 from app.tools.path_utils import *
@@ -81,6 +84,269 @@ def make_unique_names(
     return unique_names, rename_map
 
 
+# ==================================================
+# 名单缓存
+# ==================================================
+RosterView = Tuple[Mapping[str, Any], ...]
+
+
+class RosterIndex:
+    """名单索引
+
+    名单加载时一次性构建，提供按小组、性别、ID、姓名的 O(1) 查找；
+    所有成员序列均为只读记录元组，并保持名单原有的 ID 顺序。
+    """
+
+    __slots__ = (
+        "records",
+        "by_group",
+        "by_gender",
+        "groups",
+        "genders",
+        "by_id",
+        "by_name",
+        "_groups_by_gender",
+    )
+
+    def __init__(self, records: RosterView):
+        by_group: Dict[Any, List[Mapping[str, Any]]] = {}
+        by_gender: Dict[Any, List[Mapping[str, Any]]] = {}
+        by_id: Dict[Any, Mapping[str, Any]] = {}
+        by_name: Dict[Any, Mapping[str, Any]] = {}
+        groups_by_gender: Dict[Any, set] = {}
+
+        for record in records:
+            group = record.get("group", "")
+            gender = record.get("gender", "")
+            by_group.setdefault(group, []).append(record)
+            by_gender.setdefault(gender, []).append(record)
+            by_id.setdefault(record.get("id", ""), record)
+            by_name.setdefault(record.get("name", ""), record)
+            if group:
+                groups_by_gender.setdefault(gender, set()).add(group)
+
+        self.records = records
+        self.by_group: Dict[Any, RosterView] = {
+            key: tuple(members) for key, members in by_group.items()
+        }
+        self.by_gender: Dict[Any, RosterView] = {
+            key: tuple(members) for key, members in by_gender.items()
+        }
+        self.groups = tuple(sorted(by_group))
+        self.genders = tuple(sorted(by_gender))
+        self.by_id = by_id
+        self.by_name = by_name
+        self._groups_by_gender = {
+            key: tuple(sorted(names)) for key, names in groups_by_gender.items()
+        }
+
+    def group_members(self, group_name) -> RosterView:
+        """获取指定小组的成员（按ID排序）"""
+        return self.by_group.get(group_name, ())
+
+    def gender_members(self, gender) -> RosterView:
+        """获取指定性别的成员（按ID排序）"""
+        return self.by_gender.get(gender, ())
+
+    def group_names(self, gender=None) -> Tuple[Any, ...]:
+        """获取非空小组名称（排序后）
+
+        Args:
+            gender: 性别，为 None 时返回所有非空小组，否则只返回包含该性别成员的小组
+        """
+        if gender is None:
+            return tuple(group for group in self.groups if group)
+        return self._groups_by_gender.get(gender, ())
+
+
+_RosterEntry = Tuple[Tuple[int, int], RosterView, Optional[RosterIndex]]
+
+
+class RosterRepository:
+    """名单文件缓存
+
+    每个名单文件只解析一次，解析并排序后的结果按 (路径, mtime, 大小) 缓存，
+    以只读视图的形式提供给调用方；文件被修改或文件监视器通知变化时重新加载。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _RosterEntry] = {}
+
+    @staticmethod
+    def _stat(path) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load_entry(
+        self, path, parser: Callable[[Dict[str, Any]], List[Dict[str, Any]]]
+    ) -> Optional[_RosterEntry]:
+        key = str(path)
+        stamp = self._stat(path)
+        if stamp is None:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry
+
+        with open(path, "r", encoding="utf-8") as f:
+            raw_data = json.load(f)
+        view = tuple(MappingProxyType(record) for record in parser(raw_data))
+
+        entry = (stamp, view, None)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def version(self, path) -> Optional[Tuple[int, int]]:
+        """获取名单文件的版本戳
+
+        Args:
+            path: 名单文件路径
+
+        Returns:
+            Optional[Tuple[int, int]]: (mtime_ns, 文件大小)，文件不存在时返回 None
+        """
+        return self._stat(path)
+
+    def load(
+        self, path, parser: Callable[[Dict[str, Any]], List[Dict[str, Any]]]
+    ) -> Optional[RosterView]:
+        """加载名单文件
+
+        Args:
+            path: 名单文件路径
+            parser: 将原始 JSON 字典转换为记录列表的函数
+
+        Returns:
+            Optional[RosterView]: 只读记录元组，文件不存在时返回 None
+        """
+        entry = self._load_entry(path, parser)
+        return None if entry is None else entry[1]
+
+    def load_index(
+        self, path, parser: Callable[[Dict[str, Any]], List[Dict[str, Any]]]
+    ) -> Optional[RosterIndex]:
+        """加载名单文件并返回其索引
+
+        索引在名单首次被请求索引时构建，并与名单视图一同缓存，文件变化时一并失效。
+
+        Args:
+            path: 名单文件路径
+            parser: 将原始 JSON 字典转换为记录列表的函数
+
+        Returns:
+            Optional[RosterIndex]: 名单索引，文件不存在时返回 None
+        """
+        entry = self._load_entry(path, parser)
+        if entry is None:
+            return None
+        if entry[2] is not None:
+            return entry[2]
+
+        stamp, view, _ = entry
+        index = RosterIndex(view)
+        key = str(path)
+        with self._lock:
+            current = self._entries.get(key)
+            # 构建期间名单未被替换时才回写，避免覆盖更新的条目
+            if current is not None and current[1] is view:
+                self._entries[key] = (stamp, view, index)
+        return index
+
+    def invalidate(self, path=None) -> None:
+        """使缓存失效
+
+        Args:
+            path: 名单文件或所在目录路径，为 None 时清除全部缓存
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            target = os.path.normpath(str(path))
+            for key in list(self._entries):
+                if key == target or os.path.dirname(key) == target:
+                    self._entries.pop(key, None)
+
+
+_roster_repository = RosterRepository()
+
+
+def get_roster_repository() -> RosterRepository:
+    """获取全局名单缓存实例"""
+    return _roster_repository
+
+
+def invalidate_roster_cache(path=None) -> None:
+    """使名单缓存失效（文件监视器检测到名单变化时调用）
+
+    Args:
+        path: 名单文件或所在目录路径，为 None 时清除全部缓存
+    """
+    _roster_repository.invalidate(path)
+
+
+def _copy_record(record: Mapping[str, Any]) -> Dict[str, Any]:
+    """将只读记录复制为普通字典"""
+    copied = dict(record)
+    if isinstance(copied.get("tags"), list):
+        copied["tags"] = list(copied["tags"])
+    return copied
+
+
+def _parse_student_data(student_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """将班级名单 JSON 转换为按 ID 排序的学生列表"""
+    student_list = []
+    for name, info in student_data.items():
+        student = {
+            "name": name,
+            "id": info.get("id", 0),
+            "gender": info.get("gender", "未知"),
+            "group": info.get("group", "未分组"),
+            "exist": info.get("exist", True),
+            "tags": _normalize_tags(info.get("tags", [])),
+        }
+        student_list.append(student)
+
+    # 按ID排序
+    student_list.sort(key=lambda x: x["id"])
+    return student_list
+
+
+def _parse_pool_data(pool_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """将奖池名单 JSON 转换为按 ID 排序的奖品列表"""
+    pool_list = []
+    for name, info in pool_data.items():
+        raw_count = info.get("count", 1)
+        try:
+            count = int(raw_count)
+        except Exception:
+            count = 1
+        if count < 0:
+            count = 0
+        pool = {
+            "name": name,
+            "id": info.get("id", 0),
+            "weight": info.get("weight", 1),
+            "exist": info.get("exist", True),
+            "count": count,
+            "tags": _normalize_tags(info.get("tags", [])),
+        }
+        pool_list.append(pool)
+
+    # 按ID排序
+    pool_list.sort(key=lambda x: x["id"])
+    return pool_list
+
+
 # ==================================================
 # 班级列表管理函数
 # ==================================================
@@ -121,54 +387,87 @@ def get_class_name_list() -> List[str]:
         return []
 
 
-def get_student_list(class_name: str) -> List[Dict[str, Any]]:
-    """获取指定班级的学生列表
+def get_student_list_view(class_name: str) -> RosterView:
+    """获取指定班级学生列表的只读视图
 
-    从 data/list/roll_call_list 文件夹中读取指定班级的名单文件，
-    并返回学生列表
+    与 get_student_list 内容相同，但直接返回缓存中的只读记录，
+    适用于只读取不修改的高频调用场景
 
     Args:
         class_name: 班级名称
 
     Returns:
-        List[Dict[str, Any]]: 学生列表，每个学生是一个字典，包含姓名、ID、性别、小组等信息
+        RosterView: 按ID排序的只读学生记录元组
     """
     try:
         # 获取班级名单文件路径
         roll_call_list_dir = get_data_path("list", "roll_call_list")
         class_file_path = roll_call_list_dir / f"{class_name}.json"
 
+        view = _roster_repository.load(class_file_path, _parse_student_data)
         # 如果文件不存在，返回空列表
-        if not class_file_path.exists():
+        if view is None:
             logger.warning(f"班级名单文件不存在: {class_file_path}")
-            return []
+            return ()
 
-        # 读取JSON文件
-        with open(class_file_path, "r", encoding="utf-8") as f:
-            student_data = json.load(f)
-
-        # 将字典数据转换为列表形式
-        student_list = []
-        for name, info in student_data.items():
-            student = {
-                "name": name,
-                "id": info.get("id", 0),
-                "gender": info.get("gender", "未知"),
-                "group": info.get("group", "未分组"),
-                "exist": info.get("exist", True),
-                "tags": _normalize_tags(info.get("tags", [])),
-            }
-            student_list.append(student)
+        # logger.debug(f"班级 {class_name} 共有 {len(view)} 名学生")
+        return view
+
+    except Exception as e:
+        logger.error(f"获取学生列表失败: {e}")
+        return ()
 
-        # 按ID排序
-        student_list.sort(key=lambda x: x["id"])
 
-        # logger.debug(f"班级 {class_name} 共有 {len(student_list)} 名学生")
-        return student_list
+def get_student_list(class_name: str) -> List[Dict[str, Any]]:
+    """获取指定班级的学生列表
+
+    从 data/list/roll_call_list 文件夹中读取指定班级的名单文件，
+    并返回学生列表
+
+    Args:
+        class_name: 班级名称
+
+    Returns:
+        List[Dict[str, Any]]: 学生列表，每个学生是一个字典，包含姓名、ID、性别、小组等信息
+    """
+    return [_copy_record(student) for student in get_student_list_view(class_name)]
+
+
+def get_roster_version(class_name: str) -> Optional[Tuple[int, int]]:
+    """获取指定班级名单文件的版本戳，名单变化时版本戳随之变化
+
+    Args:
+        class_name: 班级名称
+
+    Returns:
+        Optional[Tuple[int, int]]: 版本戳，名单不存在时返回 None
+    """
+    roll_call_list_dir = get_data_path("list", "roll_call_list")
+    return _roster_repository.version(roll_call_list_dir / f"{class_name}.json")
+
+
+def get_roster_index(class_name: str) -> RosterIndex:
+    """获取指定班级名单的索引
+
+    Args:
+        class_name: 班级名称
+
+    Returns:
+        RosterIndex: 班级名单索引，名单不存在时返回空索引
+    """
+    try:
+        roll_call_list_dir = get_data_path("list", "roll_call_list")
+        class_file_path = roll_call_list_dir / f"{class_name}.json"
+
+        index = _roster_repository.load_index(class_file_path, _parse_student_data)
+        if index is None:
+            logger.warning(f"班级名单文件不存在: {class_file_path}")
+            return RosterIndex(())
+        return index
 
     except Exception as e:
-        logger.error(f"获取学生列表失败: {e}")
-        return []
+        logger.error(f"获取名单索引失败: {e}")
+        return RosterIndex(())
 
 
 def get_group_list(class_name: str) -> List[Dict[str, Any]]:
@@ -183,15 +482,7 @@ def get_group_list(class_name: str) -> List[Dict[str, Any]]:
     Returns:
         List[Dict[str, Any]]: 小组列表，每个小组是一个字典，包含小组名称、学生列表等信息
     """
-    student_list = get_student_list(class_name)
-    group_set = set()  # 使用集合确保不重复
-    for student in student_list:
-        group_name = student["group"]
-        group_set.add(group_name)
-
-    # 转换为列表并排序
-    group_list = sorted(list(group_set))
-    return group_list
+    return list(get_roster_index(class_name).groups)
 
 
 def get_gender_list(class_name: str) -> List[str]:
@@ -206,15 +497,23 @@ def get_gender_list(class_name: str) -> List[str]:
     Returns:
         List[str]: 性别列表，包含所有学生的性别
     """
-    student_list = get_student_list(class_name)
-    gender_set = set()  # 使用集合确保不重复
-    for student in student_list:
-        gender = student["gender"]
-        gender_set.add(gender)
+    return list(get_roster_index(class_name).genders)
+
+
+def get_group_members_view(class_name: str, group_name: str) -> RosterView:
+    """获取指定小组成员的只读视图
+
+    与 get_group_members 内容相同，但直接返回索引中的只读记录，
+    适用于动画帧等只读取不修改的高频调用场景
 
-    # 转换为列表并排序
-    gender_list = sorted(list(gender_set))
-    return gender_list
+    Args:
+        class_name: 班级名称
+        group_name: 小组名称
+
+    Returns:
+        RosterView: 按ID排序的只读成员记录元组
+    """
+    return get_roster_index(class_name).group_members(group_name)
 
 
 def get_group_members(class_name: str, group_name: str) -> List[Dict[str, Any]]:
@@ -230,16 +529,10 @@ def get_group_members(class_name: str, group_name: str) -> List[Dict[str, Any]]:
     Returns:
         List[Dict[str, Any]]: 小组成员列表，每个成员是一个字典，包含姓名、ID、性别、小组等信息
     """
-    student_list = get_student_list(class_name)
-    group_members = []
-
-    for student in student_list:
-        if student["group"] == group_name:
-            group_members.append(student)
-
-    # 按ID排序
-    group_members.sort(key=lambda x: x["id"])
-    return group_members
+    return [
+        _copy_record(student)
+        for student in get_group_members_view(class_name, group_name)
+    ]
 
 
 # ==================================================
@@ -282,61 +575,63 @@ def get_pool_name_list() -> List[str]:
         return []
 
 
-def get_pool_list(pool_name: str) -> List[Dict[str, Any]]:
-    """获取指定奖池的奖品列表
+def get_pool_list_view(pool_name: str) -> RosterView:
+    """获取指定奖池奖品列表的只读视图
 
-    从 data/list/lottery_list 文件夹中读取指定奖池的名单文件，
-    并返回奖品列表
+    与 get_pool_list 内容相同，但直接返回缓存中的只读记录，
+    适用于只读取不修改的高频调用场景
 
     Args:
         pool_name: 奖池名称
 
     Returns:
-        List[Dict[str, Any]]: 奖品列表，每个奖品是一个字典，包含名称、ID、权重等信息
+        RosterView: 按ID排序的只读奖品记录元组
     """
     try:
         # 获取奖池名单文件路径
         lottery_list_dir = get_data_path("list/lottery_list")
         pool_file_path = lottery_list_dir / f"{pool_name}.json"
 
+        view = _roster_repository.load(pool_file_path, _parse_pool_data)
         # 如果文件不存在，返回空列表
-        if not pool_file_path.exists():
+        if view is None:
             logger.warning(f"奖池名单文件不存在: {pool_file_path}")
-            return []
-
-        # 读取JSON文件
-        with open(pool_file_path, "r", encoding="utf-8") as f:
-            pool_data = json.load(f)
-
-        # 将字典数据转换为列表形式
-        pool_list = []
-        for name, info in pool_data.items():
-            raw_count = info.get("count", 1)
-            try:
-                count = int(raw_count)
-            except Exception:
-                count = 1
-            if count < 0:
-                count = 0
-            pool = {
-                "name": name,
-                "id": info.get("id", 0),
-                "weight": info.get("weight", 1),
-                "exist": info.get("exist", True),
-                "count": count,
-                "tags": _normalize_tags(info.get("tags", [])),
-            }
-            pool_list.append(pool)
-
-        # 按ID排序
-        pool_list.sort(key=lambda x: x["id"])
+            return ()
 
-        # logger.debug(f"奖池 {pool_name} 共有 {len(pool_list)} 个奖品")
-        return pool_list
+        # logger.debug(f"奖池 {pool_name} 共有 {len(view)} 个奖品")
+        return view
 
     except Exception as e:
         logger.error(f"获取奖池列表失败: {e}")
-        return []
+        return ()
+
+
+def get_pool_version(pool_name: str) -> Optional[Tuple[int, int]]:
+    """获取指定奖池名单文件的版本戳，名单变化时版本戳随之变化
+
+    Args:
+        pool_name: 奖池名称
+
+    Returns:
+        Optional[Tuple[int, int]]: 版本戳，名单不存在时返回 None
+    """
+    lottery_list_dir = get_data_path("list/lottery_list")
+    return _roster_repository.version(lottery_list_dir / f"{pool_name}.json")
+
+
+def get_pool_list(pool_name: str) -> List[Dict[str, Any]]:
+    """获取指定奖池的奖品列表
+
+    从 data/list/lottery_list 文件夹中读取指定奖池的名单文件，
+    并返回奖品列表
+
+    Args:
+        pool_name: 奖池名称
+
+    Returns:
+        List[Dict[str, Any]]: 奖品列表，每个奖品是一个字典，包含名称、ID、权重等信息
+    """
+    return [_copy_record(prize) for prize in get_pool_list_view(pool_name)]
 
 
 # ==================================================
@@ -425,6 +720,67 @@ def filter_students_data(
         return []
 
 
+def filter_class_students(
+    class_name: str,
+    group_index: int,
+    group_filter: str,
+    gender_index: int,
+    gender_filter: str,
+) -> List[Tuple]:
+    """根据小组和性别条件过滤指定班级的学生
+
+    结果与 filter_students_data(get_student_list(class_name), ...) 相同，
+    但直接使用名单索引查找，无需复制和遍历整个名单
+
+    Args:
+        class_name: 班级名称
+        group_index: 小组筛选索引，0表示抽取全班学生，1表示抽取小组组号，大于等于2表示具体的小组索引
+        group_filter: 小组筛选条件，当group_index>=2时使用
+        gender_index: 性别筛选索引，0表示抽取所有性别，1表示男性，2表示女性
+        gender_filter: 性别筛选条件，"男"或"女"
+
+    Returns:
+        List[Tuple]: 包含(id, name, gender, group, exist)的元组列表
+    """
+    try:
+        index = get_roster_index(class_name)
+
+        if group_index == 1:
+            group_names = index.group_names(
+                None if gender_index == 0 else gender_filter
+            )
+            return [(None, name, None, name, True) for name in group_names]
+
+        if group_index == 0:
+            members = (
+                index.records
+                if gender_index == 0
+                else index.gender_members(gender_filter)
+            )
+        elif group_index >= 2:
+            members = index.group_members(group_filter)
+            if gender_index != 0:
+                members = [s for s in members if s.get("gender", "") == gender_filter]
+        else:
+            return []
+
+        return [
+            (
+                student.get("id", ""),
+                student.get("name", ""),
+                student.get("gender", ""),
+                student.get("group", ""),
+                student.get("exist", True),
+            )
+            for student in members
+            if student.get("exist", True)
+        ]
+
+    except Exception as e:
+        logger.error(f"过滤学生数据失败: {e}")
+        return []
+
+
 # ==================================================
 # 学生数据导出函数
 # ==================================================
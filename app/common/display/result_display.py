@@ -45,7 +45,7 @@ from app.tools.variable import (
 from app.tools.path_utils import file_exists, get_data_path
 from app.tools.personalised import is_dark_theme
 from app.tools.settings_access import readme_settings_async
-from app.common.data.list import get_group_members
+from app.common.data.list import get_group_members_view
 
 from random import SystemRandom
 
@@ -273,7 +273,7 @@ class ResultDisplayUtils:
         # 小组模式下，根据show_random设置显示格式
         if is_group_mode:
             # 获取小组成员列表
-            group_members = get_group_members(class_name, name)
+            group_members = get_group_members_view(class_name, name)
 
             if show_random == 1:  # 组名[换行]随机选择的成员
                 if group_members:
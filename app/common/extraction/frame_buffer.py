@@ -0,0 +1,109 @@
+# ==================================================
+# 导入库
+# ==================================================
+import threading
+from collections import deque
+from typing import Any, Callable, Hashable, Optional
+
+from loguru import logger
+
+
+# ==================================================
+# 动画帧预生成缓冲区
+# ==================================================
+class _FrameProducer:
+    """一次动画的帧生产任务"""
+
+    __slots__ = ("key", "frames", "space", "stopped", "thread")
+
+    def __init__(self, key: Hashable, capacity: int):
+        self.key = key
+        self.frames: deque = deque(maxlen=capacity)
+        self.space = threading.Event()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+
+class AnimationFrameBuffer:
+    """在工作线程中预先生成动画帧的环形缓冲区
+
+    工作线程始终保持缓冲区中有 capacity 帧待用，定时器每次只需取出一帧显示。
+    生产与消费只通过 deque 的 append / popleft（线程安全的原子操作）交换数据，
+    不需要额外加锁。缓冲区为空时由调用方同步生成一帧，动画不会因此停顿。
+    """
+
+    def __init__(self, capacity: int, name: str = ""):
+        """
+        Args:
+            capacity: 预生成的帧数
+            name: 名称（用于日志）
+        """
+        self.capacity = max(1, int(capacity))
+        self.name = name
+        self._producer: Optional[_FrameProducer] = None
+
+    def start(self, key: Hashable, produce: Callable[[], Any]) -> None:
+        """开始预生成帧，同一上下文已在生成时不重复启动
+
+        Args:
+            key: 动画上下文（如抽取数量），取帧时上下文不一致则不使用缓冲区
+            produce: 生成一帧的函数（在工作线程执行，不得操作界面）
+        """
+        producer = self._producer
+        if producer is not None and producer.key == key:
+            if not producer.stopped.is_set():
+                return
+        self.stop()
+
+        producer = _FrameProducer(key, self.capacity)
+        producer.thread = threading.Thread(
+            target=self._run,
+            args=(producer, produce),
+            name=f"AnimationFrameBuffer-{self.name}",
+            daemon=True,
+        )
+        self._producer = producer
+        producer.thread.start()
+
+    def _run(self, producer: _FrameProducer, produce: Callable[[], Any]) -> None:
+        while not producer.stopped.is_set():
+            if len(producer.frames) >= self.capacity:
+                producer.space.wait()
+                producer.space.clear()
+                continue
+            try:
+                frame = produce()
+            except Exception as e:
+                logger.exception(f"预生成动画帧失败（{self.name}）: {e}")
+                producer.stopped.set()
+                return
+            producer.frames.append(frame)
+
+    def next_frame(self, key: Hashable) -> Optional[Any]:
+        """取出一帧
+
+        Args:
+            key: 当前动画上下文
+
+        Returns:
+            Optional[Any]: 预生成的帧，缓冲区未启动、上下文不一致或暂无可用帧时返回 None
+        """
+        producer = self._producer
+        if producer is None or producer.key != key:
+            return None
+        try:
+            frame = producer.frames.popleft()
+        except IndexError:
+            return None
+        producer.space.set()
+        return frame
+
+    def stop(self) -> None:
+        """停止预生成并丢弃剩余帧"""
+        producer = self._producer
+        self._producer = None
+        if producer is None:
+            return
+        producer.stopped.set()
+        producer.space.set()
+        producer.frames.clear()
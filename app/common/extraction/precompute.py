@@ -0,0 +1,135 @@
+# ==================================================
+# 导入库
+# ==================================================
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+from loguru import logger
+from PySide6.QtCore import QRunnable, QThreadPool
+
+from app.tools.settings_access import get_settings_signals
+
+
+# ==================================================
+# 最终结果预计算
+# ==================================================
+class _PrecomputeJob:
+    """一次预计算任务"""
+
+    __slots__ = ("key", "stamp", "result", "lock", "done", "started", "cancelled")
+
+    def __init__(self, key: Hashable, stamp: Any):
+        self.key = key
+        self.stamp = stamp
+        self.result = None
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.started = False
+        self.cancelled = False
+
+
+class _PrecomputeRunnable(QRunnable):
+    def __init__(self, job: _PrecomputeJob, compute: Callable[[], Any], name: str):
+        super().__init__()
+        self.job = job
+        self.compute = compute
+        self.name = name
+
+    def run(self):
+        with self.job.lock:
+            if self.job.cancelled:
+                self.job.done.set()
+                return
+            self.job.started = True
+        try:
+            self.job.result = self.compute()
+        except Exception as e:
+            logger.exception(f"预计算最终抽取结果失败（{self.name}）: {e}")
+        finally:
+            self.job.done.set()
+
+
+class DrawPrecomputer:
+    """在动画播放期间于后台线程预先计算最终抽取结果
+
+    每个结果以抽取上下文（key）标识，并记录开始计算时的依赖版本戳（stamp，
+    由名单、已抽取记录、历史记录等文件的版本组成）。取用时上下文不同、
+    版本戳已变化或任何设置发生变化都会丢弃结果，由调用方重新同步计算。
+    每个结果只能取用一次。
+    """
+
+    def __init__(self, name: str, stamp_fn: Callable[[Hashable], Any]):
+        """
+        Args:
+            name: 名称（用于日志）
+            stamp_fn: 根据 key 计算依赖版本戳的函数
+        """
+        self.name = name
+        self._stamp_fn = stamp_fn
+        self._lock = threading.Lock()
+        self._job: Optional[_PrecomputeJob] = None
+        get_settings_signals().settingChanged.connect(self._on_setting_changed)
+
+    def _on_setting_changed(self, first_level_key, second_level_key, value):
+        self.invalidate()
+
+    def _current_stamp(self, key: Hashable) -> Any:
+        try:
+            return self._stamp_fn(key)
+        except Exception as e:
+            logger.exception(f"获取预计算版本戳失败（{self.name}）: {e}")
+            return None
+
+    def start(self, key: Hashable, compute: Callable[[], Any]) -> None:
+        """开始预计算，同一上下文已在计算或已有结果时不重复计算
+
+        Args:
+            key: 抽取上下文
+            compute: 计算最终结果的函数（在后台线程执行，不得操作界面）
+        """
+        with self._lock:
+            job = self._job
+            if job is not None and job.key == key and not job.cancelled:
+                return
+            if job is not None:
+                job.cancelled = True
+            job = self._job = _PrecomputeJob(key, self._current_stamp(key))
+
+        QThreadPool.globalInstance().start(_PrecomputeRunnable(job, compute, self.name))
+
+    def take(self, key: Hashable) -> Optional[Any]:
+        """取用预计算结果
+
+        计算已开始但尚未完成时等待其完成（耗时不会超过重新计算）；
+        任务仍在线程池队列中未开始时直接放弃，由调用方同步计算。
+
+        Args:
+            key: 抽取上下文
+
+        Returns:
+            Optional[Any]: 预计算结果，不可用时返回 None
+        """
+        with self._lock:
+            job = self._job
+            self._job = None
+        if job is None or job.key != key:
+            return None
+        with job.lock:
+            if job.cancelled or not job.started:
+                job.cancelled = True
+                return None
+
+        job.done.wait()
+        if job.cancelled or not job.result:
+            return None
+        if job.stamp != self._current_stamp(key):
+            logger.debug(f"预计算结果已过期（{self.name}），重新计算")
+            return None
+        return job.result
+
+    def invalidate(self) -> None:
+        """丢弃正在进行或已完成的预计算"""
+        with self._lock:
+            if self._job is not None:
+                self._job.cancelled = True
+            self._job = None
@@ -2,10 +2,12 @@
 # 导入库
 # ==================================================
 
-from typing import List, Dict, Any
+from bisect import bisect_right
+from typing import List, Dict, Any, Tuple
 from loguru import logger
 from app.common.history import *
-from app.tools.settings_access import readme_settings_async
+from app.common.history.aggregates import get_student_counters
+from app.tools.settings_access import get_settings_group
 
 
 # ==================================================
@@ -18,57 +20,48 @@ def _get_student_name(student: Dict[str, Any]) -> str:
     return student.get("name", student.get("id", ""))
 
 
-def _sort_candidates_by_count(
+def _build_count_index(
     candidates: List[Dict[str, Any]], student_counts: Dict[str, int]
-) -> List[Dict[str, Any]]:
-    """按抽取次数从小到大排序候选人"""
-    # 先转换为(次数, 学生)元组列表
-    candidates_with_count = []
-    for student in candidates:
-        student_name = _get_student_name(student)
-        count = student_counts.get(student_name, 0)
-        candidates_with_count.append((count, student))
-
-    # 按次数从小到大排序
-    candidates_with_count.sort(key=lambda x: x[0])
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """构建按抽取次数从小到大排序的候选人索引（次数相同时保持原顺序）
 
-    # 提取排序后的学生列表
-    return [student for _, student in candidates_with_count]
+    Returns:
+        Tuple[List[Dict[str, Any]], List[int]]: (排序后的候选人, 对应的抽取次数)
+    """
+    candidates_with_count = sorted(
+        (
+            (student_counts.get(_get_student_name(student), 0), student)
+            for student in candidates
+        ),
+        key=lambda x: x[0],
+    )
+    sorted_candidates = [student for _, student in candidates_with_count]
+    sorted_counts = [count for count, _ in candidates_with_count]
+    return sorted_candidates, sorted_counts
 
 
-def _get_expanded_pool(
+def _load_student_counts(
     candidates: List[Dict[str, Any]],
-    student_counts: Dict[str, int],
-    target_count: int,
-    initial_threshold: int,
-    max_count: int,
-) -> List[Dict[str, Any]]:
-    """根据阈值扩展候选池，直到达到目标人数或最大阈值"""
-    expanded_pool = []
-    new_threshold = initial_threshold
-
-    # 第一次尝试扩展
+    class_name: str,
+    history_type: str,
+    subject_filter: str,
+) -> Dict[str, int]:
+    """从历史记录的聚合统计中读取每个候选人的抽取次数"""
+    history_data = load_history_data(history_type, class_name)
+    # 点名历史的科目统计在读取时已由聚合统计补齐，无需逐条扫描历史记录
+    use_subject = bool(subject_filter) and history_type == "roll_call"
+
+    students_history = history_data.get("students", {})
+    student_counts = {}
     for student in candidates:
         student_name = _get_student_name(student)
-        count = student_counts.get(student_name, 0)
-        if count <= new_threshold:
-            expanded_pool.append(student)
-
-    logger.debug(f"第一次扩大后候选池人数: {len(expanded_pool)}")
-
-    # 如果仍然不足，继续向上扩大，直到达到最大次数
-    while len(expanded_pool) < target_count and new_threshold < max_count:
-        new_threshold += 1
-        logger.debug(f"扩大后仍不足，继续扩大到阈值: {new_threshold}")
-        expanded_pool = []
-        for student in candidates:
-            student_name = _get_student_name(student)
-            count = student_counts.get(student_name, 0)
-            if count <= new_threshold:
-                expanded_pool.append(student)
-        logger.debug(f"再次扩大后候选池人数: {len(expanded_pool)}")
-
-    return expanded_pool
+        if not student_name:
+            continue
+        counters = get_student_counters(
+            students_history.get(student_name), subject_filter if use_subject else None
+        )
+        student_counts[student_name] = counters.get("total_count", 0) if counters else 0
+    return student_counts
 
 
 # ==================================================
@@ -94,13 +87,18 @@ def apply_avg_gap_protection(
     Returns:
         处理后的候选池
     """
+    # 集中获取所有配置
+    fair_draw_settings = get_settings_group(
+        "fair_draw_settings",
+        ("enable_avg_gap_protection", "gap_threshold", "min_pool_size"),
+    )
+
     # 检查功能是否启用
-    if not readme_settings_async("fair_draw_settings", "enable_avg_gap_protection"):
+    if not fair_draw_settings.get("enable_avg_gap_protection"):
         return candidates
 
-    # 集中获取所有配置
-    gap_threshold = readme_settings_async("fair_draw_settings", "gap_threshold")
-    min_pool_size = readme_settings_async("fair_draw_settings", "min_pool_size")
+    gap_threshold = fair_draw_settings.get("gap_threshold")
+    min_pool_size = fair_draw_settings.get("min_pool_size")
 
     logger.debug(
         f"应用平均值差值保护，抽取人数: {draw_count}, 差距阈值: {gap_threshold}, 最小池大小: {min_pool_size}"
@@ -113,34 +111,9 @@ def apply_avg_gap_protection(
 
     try:
         # Step 1: 获取当前抽取单位的次数
-        # 加载历史记录
-        history_data = load_history_data(history_type, class_name)
-        # 初始化学生抽取次数字典
-        student_counts = {}
-        for student in candidates:
-            student_name = _get_student_name(student)
-            if student_name:
-                # 从历史记录中获取该学生的抽取次数
-                student_history = history_data.get("students", {}).get(student_name, {})
-
-                # 如果有科目过滤，使用科目统计
-                if subject_filter and history_type == "roll_call":
-                    subject_stats = student_history.get("subject_stats", {})
-                    if subject_filter in subject_stats:
-                        student_counts[student_name] = subject_stats[
-                            subject_filter
-                        ].get("total_count", 0)
-                    else:
-                        # 如果科目统计中没有该科目，从历史记录中计算
-                        history = student_history.get("history", [])
-                        filtered_count = 0
-                        for record in history:
-                            if record.get("class_name", "") == subject_filter:
-                                filtered_count += 1
-                        student_counts[student_name] = filtered_count
-                else:
-                    # 没有科目过滤，使用总次数
-                    student_counts[student_name] = student_history.get("total_count", 0)
+        student_counts = _load_student_counts(
+            candidates, class_name, history_type, subject_filter
+        )
 
         # 获取所有学生的抽取次数列表
         counts = list(student_counts.values())
@@ -204,34 +177,31 @@ def apply_avg_gap_protection(
 
             # 向上的一个总抽取次数 - 先尝试使用整数平均值+1作为新的阈值
             avg_int = int(avg) if avg.is_integer() else int(avg) + 1
-            new_threshold = avg_int
 
-            logger.debug(f"当前平均次数: {avg:.2f}, 初始扩展阈值: {new_threshold}")
-
-            # 扩展候选池
-            expanded_pool = _get_expanded_pool(
-                candidates, student_counts, required_size, new_threshold, max_count
+            # 按次数排序后，阈值 t 对应的候选池就是排序结果中次数 ≤ t 的前缀，
+            # 最终阈值可直接由排序后的次数二分得到，无需逐级重建候选池
+            sorted_candidates, sorted_counts = _build_count_index(
+                candidates, student_counts
             )
-
-            # 如果还是不足，就使用所有候选学生
-            if len(expanded_pool) < required_size:
+            if required_size <= len(sorted_counts):
+                new_threshold = max(avg_int, sorted_counts[required_size - 1])
+                pool_size = bisect_right(sorted_counts, new_threshold)
+                logger.debug(
+                    f"当前平均次数: {avg:.2f}, 扩展阈值: {avg_int} -> {new_threshold}, "
+                    f"扩展后候选池人数: {pool_size}"
+                )
+            else:
                 logger.debug(f"扩大到最大阈值({max_count})后仍不足，使用所有候选学生")
-                expanded_pool = candidates.copy()
-
-            # 按次数从小到大排序
-            pool_initial = _sort_candidates_by_count(expanded_pool, student_counts)
 
-            # 如果人数仍然超过需求，只保留前required_size个
-            if len(pool_initial) > required_size:
-                pool_initial = pool_initial[:required_size]
+            # 取次数最少的 required_size 人
+            pool_initial = sorted_candidates[:required_size]
 
         logger.debug(f"扩展后候选池人数: {len(pool_initial)}")
 
         # Step 6: 最终检查 - 确保候选池不为空
         if not pool_initial:
             logger.debug("最终候选池为空，使用所有候选人")
-            pool_initial = candidates.copy()
-            pool_initial = _sort_candidates_by_count(pool_initial, student_counts)
+            pool_initial, _ = _build_count_index(candidates, student_counts)
 
     except Exception as e:
         logger.exception(f"应用平均值差值保护时发生错误: {e}", exc_info=True)
@@ -0,0 +1,116 @@
+# ==================================================
+# 导入库
+# ==================================================
+from contextlib import contextmanager
+from contextvars import ContextVar
+from random import SystemRandom
+from typing import Any, Iterator, List, MutableSequence, Optional, Sequence
+
+import numpy as np
+
+system_random = SystemRandom()
+
+# 当前调用上下文使用的随机数生成器，未设置时使用 SystemRandom
+_current_rng: ContextVar[Optional[Any]] = ContextVar("draw_rng", default=None)
+
+
+# ==================================================
+# 可设定种子的随机数生成器
+# ==================================================
+class SeededRandom:
+    """基于 numpy.random.Generator（PCG64）的随机数生成器
+
+    提供抽取代码用到的 random.Random 接口（uniform、randint、random、choice、
+    shuffle、sample、getrandbits），相同种子得到相同的抽取序列。
+    只用于模拟、测试与性能测试，正式抽取始终使用 SystemRandom。
+    """
+
+    __slots__ = ("seed", "generator", "_buffer", "_position")
+
+    # 每次批量生成的浮点数个数，逐个调用 numpy 生成标量开销较大
+    _BUFFER_SIZE = 4096
+
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Args:
+            seed: 随机种子，为 None 时由系统熵源生成（结果不可复现）
+        """
+        self.seed = seed
+        self.generator = np.random.Generator(np.random.PCG64(seed))
+        self._buffer: List[float] = []
+        self._position = 0
+
+    def random(self) -> float:
+        """返回 [0, 1) 内的随机浮点数"""
+        if self._position >= len(self._buffer):
+            self._buffer = self.generator.random(self._BUFFER_SIZE).tolist()
+            self._position = 0
+        value = self._buffer[self._position]
+        self._position += 1
+        return value
+
+    def uniform(self, a: float, b: float) -> float:
+        """返回 a 与 b 之间的随机浮点数"""
+        return a + (b - a) * self.random()
+
+    def randint(self, a: int, b: int) -> int:
+        """返回 [a, b] 内的随机整数"""
+        return int(self.generator.integers(a, b, endpoint=True))
+
+    def getrandbits(self, k: int) -> int:
+        """返回 k 位的随机非负整数"""
+        if k <= 0:
+            return 0
+        value = int.from_bytes(self.generator.bytes((k + 7) // 8), "little")
+        return value >> (-k % 8)
+
+    def choice(self, seq: Sequence[Any]) -> Any:
+        """从非空序列中随机选择一项"""
+        if not len(seq):
+            raise IndexError("Cannot choose from an empty sequence")
+        return seq[int(self.generator.integers(len(seq)))]
+
+    def shuffle(self, x: MutableSequence[Any]) -> None:
+        """原地打乱序列"""
+        x[:] = [x[i] for i in self.generator.permutation(len(x)).tolist()]
+
+    def sample(self, population: Sequence[Any], k: int) -> List[Any]:
+        """不放回地随机选择 k 项"""
+        if not 0 <= k <= len(population):
+            raise ValueError("Sample larger than population or is negative")
+        indices = self.generator.choice(len(population), size=k, replace=False)
+        return [population[i] for i in indices.tolist()]
+
+
+# ==================================================
+# 随机数生成器提供者
+# ==================================================
+def get_draw_rng():
+    """获取当前调用上下文的随机数生成器
+
+    Returns:
+        当前上下文通过 use_draw_rng 指定的生成器，未指定时为 SystemRandom
+    """
+    rng = _current_rng.get()
+    return rng if rng is not None else system_random
+
+
+@contextmanager
+def use_draw_rng(rng) -> Iterator[Any]:
+    """在 with 块内使用指定的随机数生成器进行抽取
+
+    生成器只对当前线程（上下文）的 with 块生效，离开后自动恢复，
+    其他线程中的正式抽取不受影响。
+
+    用法：
+        with use_draw_rng(SeededRandom(42)):
+            RollCallUtils.draw_random_students(...)
+
+    Args:
+        rng: 随机数生成器（如 SeededRandom），为 None 时使用 SystemRandom
+    """
+    token = _current_rng.set(rng)
+    try:
+        yield get_draw_rng()
+    finally:
+        _current_rng.reset(token)
@@ -0,0 +1,337 @@
+# ==================================================
+# 导入库
+# ==================================================
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+from PySide6.QtCore import QThread, Signal
+
+from app.common.data.list import get_student_list
+from app.common.fair_draw.draw_rng import SeededRandom
+from app.common.history.weight_engine import WeightEngine
+from app.common.history.weight_utils import _load_weight_settings
+from app.tools.settings_access import get_settings_group
+
+_MICROSECONDS_PER_MINUTE = 60 * 1_000_000
+
+# 时间线最多记录的采样点数
+_TIMELINE_POINTS = 100
+
+
+# ==================================================
+# 设置与统计辅助函数
+# ==================================================
+def load_simulation_settings(
+    overrides: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """读取当前公平抽取设置，并用拟调整的设置覆盖
+
+    Args:
+        overrides: 拟调整的设置（键与 _load_weight_settings 的返回值以及
+            enable_avg_gap_protection、gap_threshold、min_pool_size 相同）
+
+    Returns:
+        Dict[str, Any]: 模拟使用的设置
+    """
+    settings = _load_weight_settings()
+    avg_gap = get_settings_group(
+        "fair_draw_settings",
+        ("enable_avg_gap_protection", "gap_threshold", "min_pool_size"),
+    )
+    settings["enable_avg_gap_protection"] = bool(
+        avg_gap.get("enable_avg_gap_protection")
+    )
+    settings["gap_threshold"] = avg_gap.get("gap_threshold") or 0
+    settings["min_pool_size"] = avg_gap.get("min_pool_size") or 0
+    if overrides:
+        settings.update(overrides)
+    return settings
+
+
+def gini_coefficient(counts: np.ndarray) -> float:
+    """计算抽取次数分布的基尼系数（0 表示完全均匀）"""
+    total = counts.sum()
+    if len(counts) == 0 or total <= 0:
+        return 0.0
+    values = np.sort(counts.astype(float))
+    n = len(values)
+    ranks = np.arange(1, n + 1)
+    return float(((2 * ranks - n - 1) * values).sum() / (n * total))
+
+
+def _avg_gap_pool(
+    counts: np.ndarray, draw_count: int, gap_threshold, min_pool_size
+) -> np.ndarray:
+    """按平均值差值保护规则（apply_avg_gap_protection）计算候选池
+
+    Returns:
+        np.ndarray: 各学生是否在候选池中
+    """
+    avg = counts.sum() / len(counts)
+    pool = counts <= avg
+
+    max_count = counts.max()
+    if max_count - counts.min() > gap_threshold:
+        below_max = counts < max_count
+        if below_max.any():
+            new_avg = counts[below_max].sum() / below_max.sum()
+            pool = below_max & (counts <= new_avg)
+
+    required_size = max(draw_count, min_pool_size)
+    if pool.sum() < required_size:
+        # 取次数最少的 required_size 人
+        pool = np.zeros(len(counts), dtype=bool)
+        pool[np.argsort(counts, kind="stable")[:required_size]] = True
+    if not pool.any():
+        pool = np.ones(len(counts), dtype=bool)
+    return pool
+
+
+def _encode(values: List[Any]):
+    index: Dict[Any, int] = {}
+    codes = np.array(
+        [index.setdefault(value, len(index)) for value in values], dtype=np.intp
+    )
+    return list(index), codes
+
+
+# ==================================================
+# 公平抽取蒙特卡洛模拟
+# ==================================================
+def run_fairness_simulation(
+    students: List[Dict[str, Any]],
+    rounds: int,
+    draw_count: int = 1,
+    settings: Optional[Dict[str, Any]] = None,
+    seed: Optional[int] = None,
+    round_interval_minutes: float = 45,
+    convergence_spread: int = 2,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> Optional[Dict[str, Any]]:
+    """在内存中模拟多轮公平抽取，评估设置的公平性
+
+    每轮用向量化权重引擎计算全班权重，按平均值差值保护筛选候选池，
+    再以加权随机键（Efraimidis-Spirakis）一次性不放回抽取 draw_count 人。
+    抽取统计只保存在内存中，不读写任何历史记录文件。
+
+    Args:
+        students: 学生列表（需包含 name，可包含 group、gender）
+        rounds: 模拟轮数
+        draw_count: 每轮抽取人数
+        settings: 模拟使用的设置（load_simulation_settings 的返回值），默认为当前设置
+        seed: 随机种子，相同种子得到相同结果
+        round_interval_minutes: 相邻两轮之间的虚拟时间间隔（分钟），影响时间因子与抽取后屏蔽
+        convergence_spread: 判定收敛的最大次数差（最多与最少抽取次数之差）
+        progress: 进度回调，参数为 (已完成轮数, 总轮数)
+        cancelled: 返回 True 时中止模拟
+
+    Returns:
+        Optional[Dict[str, Any]]: 模拟结果，包含每个学生的抽取次数与最长间隔、
+            基尼系数、次数差、收敛轮数和时间线；被中止时返回 None
+    """
+    start = time.perf_counter()
+    settings = settings if settings is not None else load_simulation_settings()
+    rounds = max(0, int(rounds))
+    names = [str(s.get("name", "")) for s in students]
+    n = len(names)
+    draw_count = max(0, min(int(draw_count), n))
+
+    group_values, group_codes = _encode([s.get("group", "") for s in students])
+    gender_values, gender_codes = _encode([s.get("gender", "") for s in students])
+    # 模拟的每轮都抽取全班，小组/性别范围计数保持为 0
+    zero_counts = np.zeros(n)
+
+    counts = np.zeros(n, dtype=np.int64)
+    last_round = np.full(n, -1, dtype=np.int64)
+    max_gaps = np.zeros(n, dtype=np.int64)
+    group_totals = np.zeros(len(group_values), dtype=np.int64)
+    gender_totals = np.zeros(len(gender_values), dtype=np.int64)
+    total_stats = 0
+
+    interval_us = int(round_interval_minutes * _MICROSECONDS_PER_MINUTE)
+    generator = SeededRandom(seed).generator
+    use_avg_gap = settings.get("enable_avg_gap_protection", False)
+    progress_step = max(1, rounds // 100)
+    timeline_step = max(1, rounds // _TIMELINE_POINTS)
+    timeline = []
+    last_unconverged = 0
+
+    for current in range(rounds):
+        if cancelled is not None and cancelled():
+            logger.info(f"公平抽取模拟已中止（第 {current} 轮）")
+            return None
+
+        if draw_count > 0:
+            valid = last_round >= 0
+            offsets = (current - last_round) * interval_us
+            engine = WeightEngine(
+                settings,
+                {
+                    value: int(count)
+                    for value, count in zip(group_values, group_totals, strict=True)
+                    if value
+                },
+                {
+                    value: int(count)
+                    for value, count in zip(gender_values, gender_totals, strict=True)
+                    if value
+                },
+                settings["cold_start_enabled"]
+                and total_stats < settings["cold_start_rounds"],
+            )
+            weights = engine.compute_weights(
+                counts.astype(float),
+                group_values,
+                group_codes,
+                zero_counts,
+                gender_values,
+                gender_codes,
+                zero_counts,
+                valid,
+                offsets,
+            )
+
+            # 加权不放回抽取：键为 log(u) / w，取最大的 draw_count 个
+            keys = np.log(generator.random(n)) / weights
+            if use_avg_gap:
+                pool = _avg_gap_pool(
+                    counts,
+                    draw_count,
+                    settings["gap_threshold"],
+                    settings["min_pool_size"],
+                )
+                keys = np.where(pool, keys, -np.inf)
+                picks = min(draw_count, int(pool.sum()))
+            else:
+                picks = draw_count
+            selected = np.argpartition(-keys, picks - 1)[:picks]
+
+            # 间隔为两次抽中之间（或开始到首次抽中之前）连续未被抽中的轮数
+            gaps = current - last_round[selected] - 1
+            max_gaps[selected] = np.maximum(max_gaps[selected], gaps)
+            counts[selected] += 1
+            last_round[selected] = current
+            np.add.at(group_totals, group_codes[selected], 1)
+            np.add.at(gender_totals, gender_codes[selected], 1)
+            total_stats += picks
+
+        spread = int(counts.max() - counts.min()) if n else 0
+        if spread > convergence_spread:
+            last_unconverged = current + 1
+        if (current + 1) % timeline_step == 0 or current + 1 == rounds:
+            timeline.append(
+                {
+                    "round": current + 1,
+                    "gini": round(gini_coefficient(counts), 4),
+                    "spread": spread,
+                }
+            )
+        if progress is not None and (
+            (current + 1) % progress_step == 0 or current + 1 == rounds
+        ):
+            progress(current + 1, rounds)
+
+    # 最后一次抽中到模拟结束的间隔也计入最长间隔
+    trailing = rounds - 1 - last_round
+    max_gaps = np.maximum(max_gaps, trailing)
+
+    expected = rounds * draw_count / n if n else 0.0
+    total_draws = counts.sum()
+    spread = int(counts.max() - counts.min()) if n else 0
+    return {
+        "rounds": rounds,
+        "draw_count": draw_count,
+        "student_count": n,
+        "seed": seed,
+        "expected_count": round(expected, 4),
+        "students": [
+            {
+                "name": names[i],
+                "count": int(counts[i]),
+                "share": round(float(counts[i] / total_draws), 6)
+                if total_draws
+                else 0.0,
+                "max_gap": int(max_gaps[i]),
+            }
+            for i in range(n)
+        ],
+        "gini": round(gini_coefficient(counts), 4),
+        "count_spread": spread,
+        "count_std": round(float(counts.std()), 4) if n else 0.0,
+        "max_gap": int(max_gaps.max()) if n else 0,
+        # 从该轮起次数差始终不超过 convergence_spread，未收敛时为 None
+        "convergence_round": last_unconverged + 1
+        if last_unconverged < rounds
+        else None,
+        "timeline": timeline,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+# ==================================================
+# 模拟工作线程
+# ==================================================
+class FairnessSimulationWorker(QThread):
+    """在工作线程中运行公平抽取模拟"""
+
+    progressChanged = Signal(int, int)
+    finishedWithResult = Signal(bool, object, str)
+
+    def __init__(
+        self,
+        class_name: str,
+        rounds: int,
+        draw_count: int = 1,
+        overrides: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None,
+        round_interval_minutes: float = 45,
+        parent=None,
+    ):
+        """
+        Args:
+            class_name: 使用其名单进行模拟的班级名称（只读取名单）
+            rounds: 模拟轮数
+            draw_count: 每轮抽取人数
+            overrides: 拟调整的设置，未指定的项使用当前设置
+            seed: 随机种子
+            round_interval_minutes: 相邻两轮之间的虚拟时间间隔（分钟）
+        """
+        super().__init__(parent)
+        self.class_name = class_name
+        self.rounds = rounds
+        self.draw_count = draw_count
+        self.overrides = dict(overrides or {})
+        self.seed = seed
+        self.round_interval_minutes = round_interval_minutes
+        self._cancelled = False
+
+    def cancel(self):
+        """请求中止模拟"""
+        self._cancelled = True
+
+    def run(self):
+        try:
+            students = [
+                s for s in get_student_list(self.class_name) if s.get("exist", True)
+            ]
+            result = run_fairness_simulation(
+                students,
+                self.rounds,
+                self.draw_count,
+                settings=load_simulation_settings(self.overrides),
+                seed=self.seed,
+                round_interval_minutes=self.round_interval_minutes,
+                progress=self.progressChanged.emit,
+                cancelled=lambda: self._cancelled,
+            )
+            if result is None:
+                self.finishedWithResult.emit(False, None, "cancelled")
+                return
+            result["class_name"] = self.class_name
+            self.finishedWithResult.emit(True, result, "")
+        except Exception as e:
+            logger.exception(f"公平抽取模拟失败: {e}")
+            self.finishedWithResult.emit(False, None, str(e))
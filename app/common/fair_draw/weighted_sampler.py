@@ -0,0 +1,401 @@
+# ==================================================
+# 导入库
+# ==================================================
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.common.fair_draw.draw_rng import get_draw_rng
+
+
+# ==================================================
+# 加权抽样器
+# ==================================================
+
+
+class WeightedSampler:
+    """基于树状数组（Fenwick 树）的加权抽样器
+
+    与逐项累加权重的线性扫描分布完全一致：
+    总权重大于 0 时，按 uniform(0, 总权重) 落点选出第一个累计权重不小于落点的候选；
+    总权重不大于 0 时，在剩余候选中等概率选择。
+    构建 O(n)，每次抽取、移除、更新 O(log n)。
+    负权重按 0 处理。
+    """
+
+    __slots__ = (
+        "_size",
+        "_weights",
+        "_weight_tree",
+        "_count_tree",
+        "_active",
+        "_positive",
+        "_rng",
+    )
+
+    def __init__(self, weights: Iterable[float], rng=None):
+        """
+        Args:
+            weights: 各候选的权重，下标即候选在原列表中的位置
+            rng: 随机数生成器，需提供 uniform 和 randint，默认为 get_draw_rng()
+        """
+        self._weights: List[float] = [max(0.0, float(w or 0)) for w in weights]
+        self._size = len(self._weights)
+        self._active = [True] * self._size
+        # 剩余候选中权重为正的数量，用于精确判断“总权重不大于 0”，不受树中浮点误差影响
+        self._positive = sum(1 for w in self._weights if w > 0)
+        self._rng = rng if rng is not None else get_draw_rng()
+
+        # 线性时间构建：每个节点把自身累加到父节点
+        self._weight_tree = [0.0] + list(self._weights)
+        self._count_tree = [0] + [1] * self._size
+        for i in range(1, self._size + 1):
+            parent = i + (i & -i)
+            if parent <= self._size:
+                self._weight_tree[parent] += self._weight_tree[i]
+                self._count_tree[parent] += self._count_tree[i]
+
+    def __len__(self) -> int:
+        return self._prefix(self._count_tree, self._size)
+
+    @staticmethod
+    def _prefix(tree, position: int):
+        total = 0
+        while position > 0:
+            total += tree[position]
+            position -= position & -position
+        return total
+
+    @staticmethod
+    def _add(tree, position: int, delta) -> None:
+        size = len(tree) - 1
+        while position <= size:
+            tree[position] += delta
+            position += position & -position
+
+    def _search(self, tree, target) -> int:
+        """返回第一个前缀和不小于 target 的下标（0 起），不存在时返回 size"""
+        position = 0
+        step = 1 << self._size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self._size and tree[nxt] < target:
+                position = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return position
+
+    def _first_active(self) -> int:
+        return self._search(self._count_tree, 1)
+
+    def total_weight(self) -> float:
+        """剩余候选的总权重"""
+        return self._prefix(self._weight_tree, self._size)
+
+    def weight(self, index: int) -> float:
+        """获取候选当前权重"""
+        return self._weights[index] if self._active[index] else 0.0
+
+    def is_active(self, index: int) -> bool:
+        """候选是否仍可被抽取"""
+        return self._active[index]
+
+    def sample(self) -> Optional[int]:
+        """抽取一个候选（不移除）
+
+        Returns:
+            Optional[int]: 被抽中候选的下标，无剩余候选时返回 None
+        """
+        remaining = len(self)
+        if remaining <= 0:
+            return None
+
+        # 所有剩余权重均为 0 时在剩余候选中等概率抽取
+        if self._positive <= 0:
+            rank = self._rng.randint(0, remaining - 1)
+            return self._search(self._count_tree, rank + 1)
+
+        total = self.total_weight()
+        rand_value = self._rng.uniform(0, total)
+        if rand_value <= 0:
+            return self._first_active()
+        index = self._search(self._weight_tree, rand_value)
+        # 浮点误差导致落点超出累计权重时，与线性扫描一致地回退到第一个候选
+        if index >= self._size or not self._active[index]:
+            return self._first_active()
+        return index
+
+    def remove(self, index: int) -> None:
+        """移除候选，使其不再被抽取"""
+        if not self._active[index]:
+            return
+        self._active[index] = False
+        self._add(self._count_tree, index + 1, -1)
+        weight = self._weights[index]
+        if weight:
+            self._add(self._weight_tree, index + 1, -weight)
+            self._positive -= 1
+        self._weights[index] = 0.0
+
+    def update(self, index: int, weight: float) -> None:
+        """更新候选权重"""
+        if not self._active[index]:
+            return
+        weight = max(0.0, float(weight or 0))
+        previous = self._weights[index]
+        if weight != previous:
+            self._add(self._weight_tree, index + 1, weight - previous)
+            self._positive += (weight > 0) - (previous > 0)
+        self._weights[index] = weight
+
+    def pop(self) -> Optional[int]:
+        """抽取并移除一个候选
+
+        Returns:
+            Optional[int]: 被抽中候选的下标，无剩余候选时返回 None
+        """
+        index = self.sample()
+        if index is not None:
+            self.remove(index)
+        return index
+
+
+def weighted_sample_indices(
+    weights: Iterable[float], count: int, rng=None
+) -> List[int]:
+    """按权重不放回地抽取下标
+
+    Args:
+        weights: 各候选的权重
+        count: 抽取数量，超过候选数量时只抽取全部候选
+        rng: 随机数生成器，默认为 get_draw_rng()
+
+    Returns:
+        List[int]: 按抽中顺序排列的候选下标
+    """
+    sampler = WeightedSampler(weights, rng)
+    indices = []
+    for _ in range(min(int(count or 0), len(sampler))):
+        index = sampler.pop()
+        if index is None:
+            break
+        indices.append(index)
+    return indices
+
+
+# ==================================================
+# 两级（小组-成员）加权抽样器
+# ==================================================
+
+
+class GroupedWeightedSampler:
+    """两级加权抽样器：先抽取小组，再在组内抽取成员
+
+    小组与每个小组的成员各自使用一个 WeightedSampler。小组权重默认为组内成员权重之和，
+    此时先抽小组再抽成员的分布与把全部成员放在一起加权抽取一致；
+    也可以指定小组权重（如全部为 1 表示等概率抽取小组）。
+    小组不放回抽取，组内成员每次独立抽取。每次抽取 O(log g + log m)。
+    """
+
+    __slots__ = ("_group_sampler", "_member_samplers", "_group_weights")
+
+    def __init__(
+        self,
+        member_weights: Iterable[Iterable[float]],
+        group_weights: Optional[Iterable[float]] = None,
+        rng=None,
+    ):
+        """
+        Args:
+            member_weights: 每个小组的成员权重列表，下标即小组/成员在原列表中的位置
+            group_weights: 各小组的权重，为 None 时使用组内成员权重之和
+            rng: 随机数生成器，默认为 get_draw_rng()
+        """
+        self._member_samplers = [
+            WeightedSampler(weights, rng) for weights in member_weights
+        ]
+        if group_weights is None:
+            group_weights = [
+                sampler.total_weight() for sampler in self._member_samplers
+            ]
+        self._group_weights = [max(0.0, float(w or 0)) for w in group_weights]
+        if len(self._group_weights) != len(self._member_samplers):
+            raise ValueError("小组权重数量与小组数量不一致")
+        self._group_sampler = WeightedSampler(self._group_weights, rng)
+
+    def __len__(self) -> int:
+        return len(self._group_sampler)
+
+    def group_weight(self, group: int) -> float:
+        """获取小组权重"""
+        return self._group_weights[group]
+
+    def pop_group(self) -> Optional[int]:
+        """抽取并移除一个小组
+
+        Returns:
+            Optional[int]: 被抽中小组的下标，无剩余小组时返回 None
+        """
+        return self._group_sampler.pop()
+
+    def sample_member(self, group: int) -> Optional[int]:
+        """在小组内抽取一名成员（不移除）
+
+        Returns:
+            Optional[int]: 被抽中成员在组内的下标，小组没有成员时返回 None
+        """
+        return self._member_samplers[group].sample()
+
+    def draw(self) -> Optional[Tuple[int, Optional[int]]]:
+        """抽取一个小组并在组内抽取一名成员
+
+        Returns:
+            Optional[Tuple[int, Optional[int]]]: (小组下标, 成员组内下标)，无剩余小组时返回 None
+        """
+        group = self.pop_group()
+        if group is None:
+            return None
+        return group, self.sample_member(group)
+
+
+# ==================================================
+# 按数量加权抽样器
+# ==================================================
+
+
+class CountedWeightedSampler:
+    """带剩余数量的加权抽样器
+
+    每个候选有单件权重和剩余数量，抽中概率与 单件权重 × 剩余数量 成正比，
+    抽中后剩余数量减一，减到 0 时移除。与每次抽取后重算权重列表的逐次抽取分布一致，
+    单次抽取并扣减为 O(log n)。
+    """
+
+    __slots__ = ("_unit_weights", "_counts", "_sampler", "_rng")
+
+    def __init__(self, unit_weights: Iterable[float], counts: Iterable[int], rng=None):
+        """
+        Args:
+            unit_weights: 各候选的单件权重
+            counts: 各候选的剩余数量，不大于 0 的候选不会被抽取
+            rng: 随机数生成器，需提供 uniform、randint、shuffle 和 getrandbits，
+                默认为 get_draw_rng()
+        """
+        self._unit_weights = [max(0.0, float(w or 0)) for w in unit_weights]
+        self._counts = [max(0, int(c or 0)) for c in counts]
+        self._rng = rng if rng is not None else get_draw_rng()
+        self._sampler = WeightedSampler(
+            (w * c for w, c in zip(self._unit_weights, self._counts, strict=True)),
+            self._rng,
+        )
+        for index, count in enumerate(self._counts):
+            if count <= 0:
+                self._sampler.remove(index)
+
+    def __len__(self) -> int:
+        return len(self._sampler)
+
+    def remaining(self, index: int) -> int:
+        """获取候选剩余数量"""
+        return self._counts[index]
+
+    def total_units(self) -> int:
+        """所有候选的剩余总数量"""
+        return sum(self._counts)
+
+    def _decrement(self, index: int, amount: int = 1) -> None:
+        self._counts[index] = max(0, self._counts[index] - amount)
+        if self._counts[index] <= 0:
+            self._sampler.remove(index)
+        else:
+            self._sampler.update(index, self._unit_weights[index] * self._counts[index])
+
+    def draw(self) -> Optional[int]:
+        """抽取一件并扣减其剩余数量
+
+        Returns:
+            Optional[int]: 被抽中候选的下标，无剩余时返回 None
+        """
+        index = self._sampler.sample()
+        if index is not None:
+            self._decrement(index)
+        return index
+
+    def _uniform_unit_weight(self) -> bool:
+        """剩余候选的单件权重是否全部相同且为正"""
+        common = None
+        for index, count in enumerate(self._counts):
+            if count <= 0:
+                continue
+            weight = self._unit_weights[index]
+            if common is None:
+                common = weight
+            elif weight != common:
+                return False
+        return bool(common)
+
+    def draw_counts(self, count: int) -> Dict[int, int]:
+        """批量抽取多件，返回各候选被抽中的数量
+
+        单件权重全部相同时，逐件不放回抽取的结果服从多元超几何分布，
+        直接一次性采样；否则退化为逐件抽取。
+
+        Args:
+            count: 抽取件数，超过剩余总数量时只抽取全部剩余
+
+        Returns:
+            Dict[int, int]: 候选下标到抽中数量的映射
+        """
+        count = min(max(0, int(count or 0)), self.total_units())
+        if count <= 0:
+            return {}
+
+        if not self._uniform_unit_weight():
+            drawn: Dict[int, int] = {}
+            for _ in range(count):
+                index = self.draw()
+                if index is None:
+                    break
+                drawn[index] = drawn.get(index, 0) + 1
+            return drawn
+
+        # 生成器自带 numpy Generator（如 SeededRandom）时直接使用，保证结果可复现
+        generator = getattr(self._rng, "generator", None)
+        if generator is None:
+            generator = np.random.default_rng(self._rng.getrandbits(128))
+        colors = np.asarray(self._counts, dtype=np.int64)
+        sampled = generator.multivariate_hypergeometric(colors, count)
+        drawn = {}
+        for index, amount in enumerate(sampled.tolist()):
+            if amount > 0:
+                drawn[index] = amount
+                self._decrement(index, amount)
+        return drawn
+
+    def draw_many(self, count: int) -> List[int]:
+        """批量抽取多件，返回按抽中顺序排列的候选下标
+
+        逐件抽取的各件结果可交换，因此对批量计数结果随机排列后，
+        与逐件调用 draw 的序列分布相同。
+
+        Args:
+            count: 抽取件数，超过剩余总数量时只抽取全部剩余
+
+        Returns:
+            List[int]: 被抽中候选的下标序列
+        """
+        if not self._uniform_unit_weight():
+            indices = []
+            for _ in range(min(max(0, int(count or 0)), self.total_units())):
+                index = self.draw()
+                if index is None:
+                    break
+                indices.append(index)
+            return indices
+
+        indices = []
+        for index, amount in self.draw_counts(count).items():
+            indices.extend([index] * amount)
+        self._rng.shuffle(indices)
+        return indices
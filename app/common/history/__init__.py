@@ -6,9 +6,21 @@
 # 文件工具
 from app.common.history.file_utils import (
     get_history_file_path,
+    get_history_version,
     load_history_data,
+    is_history_backfilled,
     save_history_data,
+    append_history_event,
+    compact_history_data,
+    compact_all_history_data,
+    delete_history_data,
     get_all_history_names,
+    uses_history_database,
+    query_history_records,
+    count_history_records,
+    count_history_records_by_name,
+    get_history_subjects,
+    import_json_histories,
 )
 
 # 统计函数
@@ -22,7 +34,10 @@ from app.common.history.statistics import (
 from app.common.history.lottery_history import save_lottery_history
 
 # 点名历史
-from app.common.history.roll_call_history import save_roll_call_history
+from app.common.history.roll_call_history import (
+    RollCallDrawResult,
+    save_roll_call_history,
+)
 
 # 权重工具
 from app.common.history.weight_utils import (
@@ -59,9 +74,21 @@ from app.common.history.history_reader import (
 __all__ = [
     # 文件工具
     "get_history_file_path",
+    "get_history_version",
     "load_history_data",
+    "is_history_backfilled",
     "save_history_data",
+    "append_history_event",
+    "compact_history_data",
+    "compact_all_history_data",
+    "delete_history_data",
     "get_all_history_names",
+    "uses_history_database",
+    "query_history_records",
+    "count_history_records",
+    "count_history_records_by_name",
+    "get_history_subjects",
+    "import_json_histories",
     # 统计函数
     "get_name_history",
     "get_draw_sessions_history",
@@ -69,6 +96,7 @@ __all__ = [
     # 抽奖历史
     "save_lottery_history",
     # 点名历史
+    "RollCallDrawResult",
     "save_roll_call_history",
     # 权重工具
     "format_weight_for_display",
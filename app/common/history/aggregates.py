@@ -0,0 +1,272 @@
+# ==================================================
+# 导入库
+# ==================================================
+import threading
+from collections.abc import Sequence
+from typing import Dict, Any, List, Optional, Tuple
+
+from loguru import logger
+
+from app.Language.obtain_language import get_content_combo_name_async
+from app.common.history.file_utils import (
+    is_history_backfilled,
+    load_history_data,
+    save_history_data,
+    get_all_history_names,
+    get_history_file_path,
+)
+from app.common.history.journal import history_file_lock
+
+# 聚合统计结构版本，结构变化时递增以触发重新构建
+# 2: 学生科目统计增加 offsets（该科目记录在学生 history 中的下标）
+# 3: 学生的 rounds_missed 改为记录 last_drawn_round（最后一次被抽中的轮次），
+#    未选中轮数由 total_rounds 计算，每轮不再更新所有学生
+ROLL_CALL_AGGREGATES_VERSION = 3
+
+# 点名历史文件读写锁，避免迁移与保存同时改写同一文件
+roll_call_history_lock = threading.RLock()
+
+
+# ==================================================
+# 点名历史聚合统计
+# ==================================================
+def get_all_filter_options() -> Tuple[str, str]:
+    """获取“全部小组”和“全部性别”选项的文本
+
+    Returns:
+        Tuple[str, str]: (全部小组选项, 全部性别选项)
+    """
+    all_group = get_content_combo_name_async("roll_call", "range_combobox")[0]
+    all_gender = get_content_combo_name_async("roll_call", "gender_combobox")[0]
+    return all_group, all_gender
+
+
+def apply_record_to_aggregates(
+    counters: Dict[str, Any],
+    draw_group: Optional[str],
+    draw_gender: Optional[str],
+    all_group: str,
+    all_gender: str,
+) -> None:
+    """将一条抽取记录计入小组/性别聚合计数
+
+    Args:
+        counters: 学生或学生科目统计字典
+        draw_group: 本次抽取的小组范围
+        draw_gender: 本次抽取的性别范围
+        all_group: “全部小组”选项文本
+        all_gender: “全部性别”选项文本
+    """
+    counters.setdefault("group_count", 0)
+    counters.setdefault("gender_count", 0)
+    if draw_group and draw_group != all_group:
+        counters["group_count"] += 1
+    if draw_gender and draw_gender != all_gender:
+        counters["gender_count"] += 1
+
+
+def rebuild_roll_call_aggregates(history_data: Dict[str, Any]) -> None:
+    """根据完整历史记录重新构建聚合统计
+
+    为每个学生以及学生的每个科目统计写入 group_count / gender_count，
+    并为每个科目统计写入记录下标 offsets，把 rounds_missed 转换为 last_drawn_round
+
+    Args:
+        history_data: 点名历史记录数据（原地修改）
+    """
+    all_group, all_gender = get_all_filter_options()
+    total_rounds = int(history_data.get("total_rounds", 0) or 0)
+
+    students = history_data.get("students", {})
+    if isinstance(students, dict):
+        for student_data in students.values():
+            if not isinstance(student_data, dict):
+                continue
+
+            if "last_drawn_round" not in student_data:
+                rounds_missed = int(student_data.pop("rounds_missed", 0) or 0)
+                student_data["last_drawn_round"] = max(0, total_rounds - rounds_missed)
+            student_data["group_count"] = 0
+            student_data["gender_count"] = 0
+            subject_stats = student_data.get("subject_stats")
+            if isinstance(subject_stats, dict):
+                for subject_data in subject_stats.values():
+                    if isinstance(subject_data, dict):
+                        subject_data["group_count"] = 0
+                        subject_data["gender_count"] = 0
+                        subject_data["offsets"] = []
+
+            history = student_data.get("history", [])
+            if not isinstance(history, list):
+                continue
+            missing_subjects = set()
+            for offset, record in enumerate(history):
+                if not isinstance(record, dict):
+                    continue
+                draw_group = record.get("draw_group", "")
+                draw_gender = record.get("draw_gender", "")
+                apply_record_to_aggregates(
+                    student_data, draw_group, draw_gender, all_group, all_gender
+                )
+
+                subject_name = record.get("class_name")
+                if subject_name is None:
+                    continue
+                if not isinstance(subject_stats, dict):
+                    subject_stats = student_data["subject_stats"] = {}
+                subject_data = subject_stats.get(subject_name)
+                if not isinstance(subject_data, dict):
+                    # 旧记录缺少科目统计时按历史记录补齐
+                    subject_data = subject_stats[subject_name] = {
+                        "total_count": 0,
+                        "group_gender_count": 0,
+                        "group_count": 0,
+                        "gender_count": 0,
+                        "offsets": [],
+                    }
+                    missing_subjects.add(subject_name)
+                if subject_name in missing_subjects:
+                    subject_data["total_count"] += 1
+                subject_data.setdefault("offsets", []).append(offset)
+                apply_record_to_aggregates(
+                    subject_data, draw_group, draw_gender, all_group, all_gender
+                )
+
+    history_data["aggregates_version"] = ROLL_CALL_AGGREGATES_VERSION
+
+
+def get_student_counters(
+    student_info: Any, subject: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """获取学生的聚合计数（total_count、group_count、gender_count 等）
+
+    Args:
+        student_info: 历史记录中的学生数据
+        subject: 科目名称，指定时返回该科目的计数
+
+    Returns:
+        Optional[Dict[str, Any]]: 计数字典，学生或该科目不存在时返回 None
+    """
+    if not isinstance(student_info, dict):
+        return None
+    if not subject:
+        return student_info
+    subject_stats = student_info.get("subject_stats")
+    if not isinstance(subject_stats, dict):
+        return None
+    counters = subject_stats.get(subject)
+    return counters if isinstance(counters, dict) else None
+
+
+def get_rounds_missed(history_data: Dict[str, Any], student_info: Any) -> int:
+    """获取学生自最后一次被抽中以来未被选中的轮数
+
+    Args:
+        history_data: 点名历史记录数据（提供 total_rounds）
+        student_info: 历史记录中的学生数据
+
+    Returns:
+        int: 未选中轮数
+    """
+    if not isinstance(student_info, dict):
+        return 0
+    last_drawn_round = student_info.get("last_drawn_round")
+    if last_drawn_round is None:
+        # 旧版本数据或已按科目过滤的数据直接记录了未选中轮数
+        return int(student_info.get("rounds_missed", 0) or 0)
+    total_rounds = int(history_data.get("total_rounds", 0) or 0)
+    return max(0, total_rounds - int(last_drawn_round))
+
+
+class SubjectRecordsView(Sequence):
+    """学生在某一科目下的抽取记录（按记录下标读取，不扫描也不复制记录）"""
+
+    __slots__ = ("_history", "_offsets")
+
+    def __init__(self, history: List[Dict[str, Any]], offsets: List[int]):
+        """
+        Args:
+            history: 学生的全部抽取记录
+            offsets: 该科目记录在 history 中的下标
+        """
+        self._history = history
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._history[i] for i in self._offsets[index]]
+        return self._history[self._offsets[index]]
+
+    def __iter__(self):
+        history = self._history
+        return (history[i] for i in self._offsets)
+
+
+def get_subject_records(
+    student_info: Any, subject: str
+) -> Optional[SubjectRecordsView]:
+    """通过科目索引获取学生在该科目下的抽取记录
+
+    Args:
+        student_info: 已包含当前版本聚合统计的学生数据
+        subject: 科目名称
+
+    Returns:
+        Optional[SubjectRecordsView]: 记录视图，尚无科目索引时返回 None
+    """
+    counters = get_student_counters(student_info, subject)
+    if counters is None:
+        return SubjectRecordsView([], []) if isinstance(student_info, dict) else None
+    offsets = counters.get("offsets")
+    history = student_info.get("history")
+    if not isinstance(offsets, list) or not isinstance(history, list):
+        return None
+    return SubjectRecordsView(history, offsets)
+
+
+def ensure_roll_call_aggregates(history_data: Dict[str, Any]) -> bool:
+    """确保历史记录数据包含当前版本的聚合统计
+
+    Args:
+        history_data: 点名历史记录数据（原地修改）
+
+    Returns:
+        bool: 是否进行了重新构建
+    """
+    if not history_data:
+        return False
+    if history_data.get("aggregates_version") == ROLL_CALL_AGGREGATES_VERSION:
+        return False
+    rebuild_roll_call_aggregates(history_data)
+    return True
+
+
+def migrate_roll_call_aggregates() -> int:
+    """为所有点名历史文件构建聚合统计（只处理尚未迁移的文件）
+
+    Returns:
+        int: 完成迁移的文件数量
+    """
+    migrated = 0
+    for class_name in get_all_history_names("roll_call"):
+        try:
+            # 读取与写回之间持有文件锁，避免后台压缩写入的检查点覆盖本次写回
+            with (
+                roll_call_history_lock,
+                history_file_lock(get_history_file_path("roll_call", class_name)),
+            ):
+                # 聚合统计在读取时已在私有数据上补齐（放入缓存之前），这里只写回快照
+                history_data = load_history_data("roll_call", class_name)
+                if not is_history_backfilled("roll_call", class_name):
+                    continue
+                if save_history_data("roll_call", class_name, history_data):
+                    migrated += 1
+        except Exception as e:
+            logger.exception(f"迁移点名历史聚合统计失败 {class_name}: {e}")
+
+    if migrated:
+        logger.info(f"已为 {migrated} 个点名历史文件构建聚合统计")
+    return migrated
@@ -1,18 +1,81 @@
 # ==================================================
 # 导入库
 # ==================================================
+import itertools
 import json
-from typing import Dict, List, Any
+import os
+import tempfile
+import threading
+from collections import deque
+from functools import partial
+from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
 from loguru import logger
 
+from app.tools.history_writer import history_writer
+from app.tools.lru_cache import VersionedLRUCache
 from app.tools.path_utils import get_path
+from app.tools.settings_access import readme_settings_async
+from app.tools.variable import (
+    HISTORY_DATA_CACHE_MAX_ENTRIES,
+    HISTORY_JOURNAL_COMPACT_THRESHOLD,
+)
+from app.common.history.journal import (
+    JOURNAL_SEQ_KEY,
+    JOURNAL_SUFFIX,
+    copy_for_journal_event,
+    get_journal_checkpoint,
+    get_journal_path,
+    has_pending_journal_entries,
+    history_file_lock,
+    journal_write_lock,
+    read_journal,
+    remove_journal,
+    replay_journal,
+    reserve_journal_seq,
+    write_journal_checkpoint,
+    write_journal_entry,
+)
+from app.common.history.sqlite_store import (
+    HISTORY_ENTRY_KEYS,
+    get_history_store,
+    get_history_store_path,
+)
+
+# 历史记录存储后端（history_management.history_storage_backend）
+HISTORY_BACKEND_JSON = 0
+HISTORY_BACKEND_SQLITE = 1
+
+# 历史记录数据缓存：键为 (类型, 名称)，版本戳为 get_history_version
+_history_cache = VersionedLRUCache(HISTORY_DATA_CACHE_MAX_ENTRIES, "history_data")
+
+# 已应用到内存、日志尚未由后台线程写盘的历史记录：键为 (类型, 名称)，
+# 值为 [包含全部已提交事件的数据, 尚未写入的日志记录 deque((序号, 事件, 数据)), 修订号]，
+# 访问时需持有 history_file_lock；日志记录全部写入后移除
+_pending_history: Dict[Tuple[str, str], list] = {}
+
+# 每次提交事件分配一个修订号，写盘完成前作为版本戳的一部分
+_pending_revisions = itertools.count(1)
+
+# 删除历史记录时递增，删除前提交但尚未执行的写入不再写盘
+_history_generations: Dict[Tuple[str, str], int] = {}
+
+# 读取时在内存中补齐了聚合统计、快照尚未写回的历史记录
+_backfilled_history: set = set()
 
 
 # ==================================================
 # 历史记录文件路径处理函数
 # ==================================================
+def uses_history_database() -> bool:
+    """当前是否使用 SQLite 数据库保存历史记录"""
+    return (
+        readme_settings_async("history_management", "history_storage_backend")
+        == HISTORY_BACKEND_SQLITE
+    )
+
+
 def get_history_file_path(history_type: str, file_name: str) -> Path:
     """获取历史记录文件路径
 
@@ -28,23 +91,58 @@ def get_history_file_path(history_type: str, file_name: str) -> Path:
     return history_dir / f"{file_name}.json"
 
 
-# ==================================================
-# 历史记录数据读写函数
-# ==================================================
-
-
-def load_history_data(history_type: str, file_name: str) -> Dict[str, Any]:
-    """加载历史记录数据
+def get_history_version(
+    history_type: str, file_name: str
+) -> Optional[Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]]:
+    """获取历史记录的版本戳，快照或日志写入后版本戳随之变化
 
     Args:
         history_type: 历史记录类型 (roll_call, lottery 等)
         file_name: 文件名（不含扩展名）
 
     Returns:
-        Dict[str, Any]: 历史记录数据
+        Optional[Tuple]: (快照的 (mtime_ns, 文件大小), 日志的 (mtime_ns, 文件大小))，
+            使用数据库时快照一项为 ("db", 修订号)；
+            不存在的一项为 None，两者都不存在时返回 None；
+            有尚未写盘的事件时为 (("pending", 修订号),)，每提交一个事件修订号都会变化
     """
     file_path = get_history_file_path(history_type, file_name)
+    pending = _pending_history.get((history_type, file_name))
+    if pending is not None:
+        return (("pending", pending[2]),)
+    versions = (
+        _get_snapshot_stamp(history_type, file_name, file_path),
+        _get_file_stamp(get_journal_path(file_path)),
+    )
+    if versions[0] is None and versions[1] is None:
+        return None
+    return versions
+
+
+def _get_file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _get_snapshot_stamp(
+    history_type: str, file_name: str, file_path: Path
+) -> Optional[Tuple]:
+    # 快照的版本戳：JSON 文件为 (mtime_ns, 文件大小)，数据库为 ("db", 修订号)
+    if uses_history_database():
+        revision = get_history_store().revision(history_type, file_name)
+        return ("db", revision) if revision is not None else None
+    return _get_file_stamp(file_path)
+
+
+# ==================================================
+# 历史记录数据读写函数
+# ==================================================
+
 
+def _read_json_snapshot(file_path: Path) -> Dict[str, Any]:
     if not file_path.exists():
         return {}
 
@@ -56,8 +154,168 @@ def load_history_data(history_type: str, file_name: str) -> Dict[str, Any]:
         return {}
 
 
+def _load_snapshot(
+    history_type: str, file_name: str, file_path: Path
+) -> Dict[str, Any]:
+    """读取当前存储后端中的快照（调用方需持有 history_file_lock）
+
+    切换存储后端后，另一后端中在上次同步之后写入、且包含更多日志记录的历史记录
+    （另一后端启用期间的抽取）会先同步到当前后端，切换前后的记录都不会丢失。
+    同步状态（数据库修订号与 JSON 文件戳）保存在数据库中。
+    """
+    if uses_history_database():
+        store = get_history_store()
+        json_stamp = _get_file_stamp(file_path)
+        sync = store.get_json_sync(history_type, file_name)
+        if json_stamp is not None and (sync is None or sync[1] != json_stamp):
+            # JSON 文件在上次同步后被写入
+            db_seq = store.journal_seq(history_type, file_name)
+            json_seq = _read_json_snapshot(file_path).get(JOURNAL_SEQ_KEY, 0)
+            if db_seq is None or int(json_seq or 0) > db_seq:
+                if store.import_json_file(history_type, file_name, file_path, True):
+                    logger.info(f"已将历史记录 {history_type}/{file_name} 导入数据库")
+            else:
+                store.record_json_sync(history_type, file_name, json_stamp)
+        return store.load(history_type, file_name) or {}
+
+    history_data = _read_json_snapshot(file_path)
+    if not get_history_store_path().exists():
+        return history_data
+    store = get_history_store()
+    revision = store.revision(history_type, file_name)
+    sync = store.get_json_sync(history_type, file_name)
+    if revision is None or (sync is not None and sync[0] == revision):
+        return history_data
+    # 数据库在上次同步后被写入
+    db_seq = store.journal_seq(history_type, file_name) or 0
+    if history_data and db_seq <= int(history_data.get(JOURNAL_SEQ_KEY, 0) or 0):
+        store.record_json_sync(history_type, file_name, _get_file_stamp(file_path))
+        return history_data
+    history_data = store.load(history_type, file_name) or {}
+    temp_path = _write_snapshot_temp(file_path, history_data)
+    try:
+        os.replace(temp_path, file_path)
+    except OSError:
+        os.remove(temp_path)
+        raise
+    store.record_json_sync(history_type, file_name, _get_file_stamp(file_path))
+    logger.info(f"已将数据库中的历史记录 {history_type}/{file_name} 导出到 JSON 文件")
+    return history_data
+
+
+def _copy_containers(value: Any) -> Any:
+    """复制数据中的字典与列表容器，列表中的抽取记录本身保持共享（记录写入后不再修改）"""
+    if isinstance(value, dict):
+        return {key: _copy_containers(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+def _capture_list_lengths(value: Any, lengths: Dict[int, int]) -> None:
+    """记录数据中各列表当前的长度（不进入列表内部，调用方需持有 history_file_lock）"""
+    if isinstance(value, dict):
+        for item in value.values():
+            _capture_list_lengths(item, lengths)
+    elif isinstance(value, list):
+        lengths[id(value)] = len(value)
+
+
+def _bounded_copy(value: Any, lengths: Dict[int, int]) -> Any:
+    """按 _capture_list_lengths 记录的长度复制字典与列表，之后追加到共享列表中的记录不包含在内"""
+    if isinstance(value, dict):
+        return {key: _bounded_copy(item, lengths) for key, item in value.items()}
+    if isinstance(value, list):
+        return value[: lengths.get(id(value), len(value))]
+    return value
+
+
+def _get_history_limits(
+    history_type: str, history_data: Dict[str, Any], lengths: Dict[int, int]
+) -> Dict[str, int]:
+    """各名称 history 列表在 _capture_list_lengths 时的长度"""
+    entries = history_data.get(HISTORY_ENTRY_KEYS.get(history_type, ""))
+    if not isinstance(entries, dict):
+        return {}
+    return {
+        name: lengths[id(entry["history"])]
+        for name, entry in entries.items()
+        if isinstance(entry, dict) and id(entry.get("history")) in lengths
+    }
+
+
+def _cache_history_data(
+    history_type: str, file_name: str, history_data: Dict[str, Any]
+) -> None:
+    # 调用方需持有 history_file_lock，保证版本戳与数据一致
+    version = get_history_version(history_type, file_name)
+    if version is not None:
+        _history_cache.put((history_type, file_name), history_data, version)
+    else:
+        _history_cache.discard((history_type, file_name))
+
+
+def load_history_data(history_type: str, file_name: str) -> Dict[str, Any]:
+    """加载历史记录数据（快照 + 尚未压缩的追加日志）
+
+    数据按 (类型, 名称) 缓存在进程内，快照或日志的 mtime/大小变化（其他进程写入）时
+    重新读取；本进程的写入直接更新缓存，不会重新解析刚写入的文件。
+    已提交但尚未写盘的事件已包含在返回的数据中。
+    返回的数据在各调用方之间共享，只能读取，不得修改。之后提交的事件写时复制
+    字典，history 等列表则在新旧数据之间共享、只追加，较早取得的数据中的列表
+    可能包含之后追加的记录。
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        file_name: 文件名（不含扩展名）
+
+    Returns:
+        Dict[str, Any]: 历史记录数据
+    """
+    file_path = get_history_file_path(history_type, file_name)
+    key = (history_type, file_name)
+
+    with history_file_lock(file_path):
+        pending = _pending_history.get(key)
+        if pending is not None:
+            return pending[0]
+        version = get_history_version(history_type, file_name)
+        history_data = _history_cache.get(key, version)
+        if history_data is not None:
+            return history_data
+
+        history_data = _load_snapshot(history_type, file_name, file_path)
+        if history_type == "roll_call" and history_data:
+            from app.common.history.aggregates import ensure_roll_call_aggregates
+
+            # 旧版本快照在放入缓存前补齐聚合统计，缓存中的数据之后不再被原地修改
+            if ensure_roll_call_aggregates(history_data):
+                _backfilled_history.add(key)
+        entries = read_journal(get_journal_path(file_path))
+        if entries:
+            replay_journal(history_type, history_data, entries)
+        _cache_history_data(history_type, file_name, history_data)
+    return history_data
+
+
+def is_history_backfilled(history_type: str, file_name: str) -> bool:
+    """读取时是否在内存中补齐了聚合统计、而快照尚未写回
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        file_name: 文件名（不含扩展名）
+
+    Returns:
+        bool: 需要用 save_history_data 写回快照时返回 True
+    """
+    return (history_type, file_name) in _backfilled_history
+
+
 def save_history_data(history_type: str, file_name: str, data: Dict[str, Any]) -> bool:
-    """保存历史记录数据
+    """保存历史记录数据（整体写入快照）
+
+    data 应来自 load_history_data，其中记录了已包含的日志序号，
+    写入后日志中已包含的记录不会被再次重放。
 
     Args:
         history_type: 历史记录类型 (roll_call, lottery 等)
@@ -68,15 +326,248 @@ def save_history_data(history_type: str, file_name: str, data: Dict[str, Any]) -
         bool: 保存是否成功
     """
     file_path = get_history_file_path(history_type, file_name)
+    temp_path = file_path.with_name(f"{file_path.name}.tmp")
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        with history_file_lock(file_path):
+            if uses_history_database():
+                get_history_store().save(history_type, file_name, data)
+            else:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=4)
+                os.replace(temp_path, file_path)
+            _backfilled_history.discard((history_type, file_name))
+            _cache_history_data(history_type, file_name, data)
         return True
     except Exception as e:
         logger.error(f"保存历史记录数据失败: {e}")
     return False
 
 
+def append_history_event(
+    history_type: str, file_name: str, event: str, data: Dict[str, Any]
+) -> bool:
+    """向历史记录追加一条事件（只追加一行日志，不重写快照）
+
+    事件立即应用到内存中的数据，之后的读取都能看到；日志行由后台写盘线程
+    按提交顺序写入，退出前由 flush_history_writes 写完。
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        file_name: 文件名（不含扩展名）
+        event: 事件类型，由该历史记录类型注册的重放函数解释
+        data: 事件数据
+
+    Returns:
+        bool: 提交是否成功
+    """
+    file_path = get_history_file_path(history_type, file_name)
+    key = (history_type, file_name)
+    try:
+        with history_file_lock(file_path):
+            base = load_history_data(history_type, file_name)
+            seq, pending = reserve_journal_seq(
+                get_journal_path(file_path), base.get(JOURNAL_SEQ_KEY, 0)
+            )
+            # 只复制本条记录会修改的容器后在副本上应用，正在读取旧数据的调用方不受影响
+            updated = copy_for_journal_event(history_type, base, event, data)
+            if updated is None:
+                updated = _copy_containers(base)
+            replay_journal(
+                history_type, updated, [{"seq": seq, "event": event, "data": data}]
+            )
+            entry = _pending_history.get(key)
+            if entry is None:
+                entry = _pending_history[key] = [updated, deque(), 0]
+            entry[0] = updated
+            entry[1].append((seq, event, data))
+            entry[2] = next(_pending_revisions)
+            generation = _history_generations.get(key, 0)
+    except Exception as e:
+        logger.error(f"提交历史记录事件失败: {e}")
+        return False
+
+    history_writer.submit(
+        f"{history_type}/{file_name}#{seq}",
+        partial(_write_history_events, history_type, file_name, generation),
+    )
+    if pending >= HISTORY_JOURNAL_COMPACT_THRESHOLD:
+        history_compactor.schedule(history_type, file_name)
+    return True
+
+
+def _write_history_events(history_type: str, file_name: str, generation: int) -> None:
+    """把尚未写入的日志记录按序号顺序写盘（在后台写盘线程中执行）
+
+    只在取出待写记录与移除已写记录时持有 history_file_lock，写入与 fsync 期间
+    只持有 journal_write_lock，抽取与读取不会等待磁盘 I/O。
+    写入失败时抛出异常，未写入的记录与内存中的数据都保留，由写盘线程在下次提交
+    或 flush 时重试；同一历史记录的任意一个任务都会写入之前失败的记录。
+    """
+    file_path = get_history_file_path(history_type, file_name)
+    journal_path = get_journal_path(file_path)
+    key = (history_type, file_name)
+    lock = history_file_lock(file_path)
+    with lock:
+        if _history_generations.get(key, 0) != generation:
+            # 提交后历史记录已被删除
+            return
+        entry = _pending_history.get(key)
+        if entry is None:
+            # 已由之前的任务写入
+            return
+        batch = list(entry[1])
+
+    written = 0
+    try:
+        with journal_write_lock(journal_path):
+            # 删除历史记录时先持有写入锁再递增代数，这里检查后写入的记录
+            # 总会在删除日志之前完成，不会残留在新的日志中
+            if _history_generations.get(key, 0) != generation:
+                return
+            for seq, event, data in batch:
+                write_journal_entry(journal_path, seq, event, data)
+                written += 1
+    finally:
+        with lock:
+            if (
+                _history_generations.get(key, 0) == generation
+                and _pending_history.get(key) is entry
+            ):
+                # 写入期间提交的记录排在本批之后，留给下一次写入
+                for _ in range(written):
+                    entry[1].popleft()
+                if not entry[1]:
+                    del _pending_history[key]
+                    _cache_history_data(history_type, file_name, entry[0])
+
+
+def _write_snapshot_temp(file_path: Path, history_data: Dict[str, Any]) -> str:
+    """把快照写入同目录的临时文件，返回临时文件路径"""
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{file_path.name}.", suffix=".tmp", dir=str(file_path.parent)
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(history_data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def compact_history_data(history_type: str, file_name: str) -> bool:
+    """把追加日志并入快照，并用检查点替换日志中已并入的记录
+
+    持有 history_file_lock 时只记录数据中各列表的长度（与记录数无关）；快照在锁外
+    按记录的长度复制、序列化并写入临时文件（字典写时复制，列表只追加），只在替换
+    快照与写入检查点时再次持有 history_file_lock，压缩期间的读取与追加不会被阻塞。
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        file_name: 文件名（不含扩展名）
+
+    Returns:
+        bool: 是否进行了压缩
+    """
+    file_path = get_history_file_path(history_type, file_name)
+    journal_path = get_journal_path(file_path)
+    key = (history_type, file_name)
+    lock = history_file_lock(file_path)
+    with lock:
+        if not has_pending_journal_entries(journal_path):
+            return False
+        # 内存中的数据已包含日志中（及已分配序号、尚未写盘）的全部记录，无需重新读取
+        history_data = load_history_data(history_type, file_name)
+        seq = history_data.get(JOURNAL_SEQ_KEY, 0)
+        list_lengths: Dict[int, int] = {}
+        _capture_list_lengths(history_data, list_lengths)
+        snapshot_stamp = _get_snapshot_stamp(history_type, file_name, file_path)
+        generation = _history_generations.get(key, 0)
+        use_database = uses_history_database()
+
+    temp_path = None
+    try:
+        if use_database:
+            # 只插入数据库中尚未写入的抽取记录，并更新快照行
+            store = get_history_store()
+            prepared = store.prepare(
+                history_type,
+                file_name,
+                history_data,
+                store.stored_draw_counts(history_type, file_name),
+                _get_history_limits(history_type, history_data, list_lengths),
+            )
+        else:
+            temp_path = _write_snapshot_temp(
+                file_path, _bounded_copy(history_data, list_lengths)
+            )
+
+        with journal_write_lock(journal_path), lock:
+            if (
+                _history_generations.get(key, 0) != generation
+                or _get_snapshot_stamp(history_type, file_name, file_path)
+                != snapshot_stamp
+                or get_journal_checkpoint(journal_path) >= seq
+            ):
+                # 写入期间历史记录被删除、快照被改写或已由其他线程压缩
+                return False
+            latest = _history_cache.get(
+                key, get_history_version(history_type, file_name)
+            )
+            if use_database:
+                get_history_store().save_prepared(history_type, file_name, prepared)
+            else:
+                os.replace(temp_path, file_path)
+                temp_path = None
+            write_journal_checkpoint(journal_path, seq)
+            _backfilled_history.discard(key)
+            if latest is not None:
+                # 以新的版本戳缓存最新数据，下次读取无需重新解析刚写入的快照
+                _cache_history_data(history_type, file_name, latest)
+    except Exception as e:
+        logger.error(f"压缩历史记录日志失败 {history_type}/{file_name}: {e}")
+        return False
+    finally:
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    logger.debug(f"已压缩历史记录日志 {history_type}/{file_name}")
+    return True
+
+
+def delete_history_data(history_type: str, file_name: str) -> bool:
+    """删除历史记录（快照与追加日志）
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        file_name: 文件名（不含扩展名）
+
+    Returns:
+        bool: 是否删除了历史记录
+    """
+    file_path = get_history_file_path(history_type, file_name)
+    journal_path = get_journal_path(file_path)
+    key = (history_type, file_name)
+    with journal_write_lock(journal_path), history_file_lock(file_path):
+        existed = file_path.exists() or journal_path.exists() or key in _pending_history
+        # 尚未执行的写入不再写盘
+        _history_generations[key] = _history_generations.get(key, 0) + 1
+        _pending_history.pop(key, None)
+        _backfilled_history.discard(key)
+        # 两种后端中的记录都删除，避免切换后端或再次导入后旧记录重新出现
+        if uses_history_database() or get_history_store_path().exists():
+            existed = get_history_store().delete(history_type, file_name) or existed
+        if file_path.exists():
+            os.remove(file_path)
+        remove_journal(journal_path)
+        _history_cache.discard(key)
+    return existed
+
+
 def get_all_history_names(history_type: str) -> List[str]:
     """获取所有历史记录名称列表
 
@@ -87,13 +578,266 @@ def get_all_history_names(history_type: str) -> List[str]:
         List[str]: 历史记录名称列表
     """
     try:
+        # 尚未写盘的新历史记录
+        names = {name for kind, name in list(_pending_history) if kind == history_type}
+        if uses_history_database() or get_history_store_path().exists():
+            # 使用 JSON 文件时也包含只在数据库中的历史记录，读取时导出到 JSON 文件
+            names.update(get_history_store().names(history_type))
         history_dir = get_path(f"data/history/{history_type}_history")
         if not history_dir.exists():
-            return []
-        history_files = list(history_dir.glob("*.json"))
-        names = [file.stem for file in history_files]
-        names.sort()
-        return names
+            return sorted(names)
+        names.update(file.stem for file in history_dir.glob("*.json"))
+        # 只有追加日志、尚未生成快照的历史记录
+        names.update(
+            file.name[: -len(JOURNAL_SUFFIX)]
+            for file in history_dir.glob(f"*{JOURNAL_SUFFIX}")
+        )
+        return sorted(names)
     except Exception as e:
         logger.error(f"获取历史记录名称列表失败: {e}")
         return []
+
+
+# ==================================================
+# 抽取记录查询函数
+# ==================================================
+def _iter_json_records(
+    history_type: str,
+    file_name: str,
+    name: Optional[str],
+    subject_name: Optional[str],
+):
+    history_data = load_history_data(history_type, file_name)
+    use_subject_index = bool(subject_name) and history_type == "roll_call"
+    if use_subject_index:
+        # load_history_data 返回的点名历史已包含科目索引
+        from app.common.history.aggregates import get_subject_records
+
+    entries = history_data.get(HISTORY_ENTRY_KEYS.get(history_type, ""), {})
+    if not isinstance(entries, dict):
+        return
+    items = [(name, entries.get(name))] if name is not None else entries.items()
+    for entry_name, entry in items:
+        if not isinstance(entry, dict):
+            continue
+        history = entry.get("history", [])
+        if not isinstance(history, list):
+            continue
+        if use_subject_index:
+            # 点名历史按科目索引直接读取该科目的记录
+            records = get_subject_records(entry, subject_name)
+            if records is not None:
+                for record in records:
+                    yield entry_name, record
+                continue
+        for record in history:
+            if subject_name and record.get("class_name", "") != subject_name:
+                continue
+            yield entry_name, record
+
+
+def _flush_journal_to_database(history_type: str, file_name: str) -> None:
+    # 数据库查询只能看到已并入快照的记录，查询前先并入尚未压缩的日志
+    compact_history_data(history_type, file_name)
+
+
+def query_history_records(
+    history_type: str,
+    file_name: str,
+    name: Optional[str] = None,
+    subject_name: Optional[str] = None,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """查询抽取记录（使用数据库时为索引查询）
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        file_name: 班级名称/奖池名称
+        name: 只查询该学生/奖品的记录，None 表示全部
+        subject_name: 只查询该课程的记录，为空表示全部
+
+    Returns:
+        List[Tuple[str, Dict[str, Any]]]: (学生/奖品名称, 记录)，同一名称的记录按时间先后排列
+    """
+    if uses_history_database():
+        _flush_journal_to_database(history_type, file_name)
+        return get_history_store().query_records(
+            history_type, file_name, name, subject_name
+        )
+    return list(_iter_json_records(history_type, file_name, name, subject_name))
+
+
+def count_history_records(
+    history_type: str,
+    file_name: str,
+    name: Optional[str] = None,
+    subject_name: Optional[str] = None,
+) -> int:
+    """统计抽取记录条数（使用数据库时为索引查询）
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        file_name: 班级名称/奖池名称
+        name: 只统计该学生/奖品的记录，None 表示全部
+        subject_name: 只统计该课程的记录，为空表示全部
+
+    Returns:
+        int: 记录条数
+    """
+    if uses_history_database():
+        _flush_journal_to_database(history_type, file_name)
+        return get_history_store().count_records(
+            history_type, file_name, name, subject_name
+        )
+    return sum(
+        1 for _ in _iter_json_records(history_type, file_name, name, subject_name)
+    )
+
+
+def count_history_records_by_name(
+    history_type: str, file_name: str, subject_name: Optional[str] = None
+) -> Dict[str, int]:
+    """按学生/奖品统计抽取次数（使用数据库时为索引查询）
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        file_name: 班级名称/奖池名称
+        subject_name: 只统计该课程的记录，为空表示全部
+
+    Returns:
+        Dict[str, int]: 名称 → 抽取次数，没有记录的名称不出现
+    """
+    if uses_history_database():
+        _flush_journal_to_database(history_type, file_name)
+        return get_history_store().count_records_by_student(
+            history_type, file_name, subject_name
+        )
+
+    counts: Dict[str, int] = {}
+    if subject_name:
+        for name, _ in _iter_json_records(history_type, file_name, None, subject_name):
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+    # 不限课程时直接使用累计次数，无需遍历记录
+    entries = load_history_data(history_type, file_name).get(
+        HISTORY_ENTRY_KEYS.get(history_type, ""), {}
+    )
+    if isinstance(entries, dict):
+        for name, entry in entries.items():
+            if isinstance(entry, dict) and entry.get("total_count"):
+                counts[name] = int(entry["total_count"])
+    return counts
+
+
+def get_history_subjects(history_type: str, file_name: str) -> List[str]:
+    """获取抽取记录中出现过的所有课程名称（使用数据库时为索引查询）
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        file_name: 班级名称/奖池名称
+
+    Returns:
+        List[str]: 排序后的课程名称列表
+    """
+    if uses_history_database():
+        _flush_journal_to_database(history_type, file_name)
+        return get_history_store().subjects(history_type, file_name)
+    return sorted(
+        {
+            record.get("class_name", "")
+            for _, record in _iter_json_records(history_type, file_name, None, None)
+            if record.get("class_name", "")
+        }
+    )
+
+
+def import_json_histories(overwrite: bool = False) -> int:
+    """把所有 JSON 历史记录文件导入数据库
+
+    Args:
+        overwrite: 数据库中已存在同名历史记录时是否覆盖
+
+    Returns:
+        int: 导入的历史记录数量
+    """
+    store = get_history_store()
+    imported = 0
+    for history_type in HISTORY_ENTRY_KEYS:
+        history_dir = get_path(f"data/history/{history_type}_history")
+        if not history_dir.exists():
+            continue
+        for file_path in sorted(history_dir.glob("*.json")):
+            with history_file_lock(file_path):
+                if store.import_json_file(
+                    history_type, file_path.stem, file_path, overwrite
+                ):
+                    imported += 1
+    if imported:
+        logger.info(f"已将 {imported} 个历史记录文件导入数据库")
+    return imported
+
+
+# ==================================================
+# 后台日志压缩
+# ==================================================
+class HistoryCompactor:
+    """在后台线程中把追加日志并入快照
+
+    日志累计到 HISTORY_JOURNAL_COMPACT_THRESHOLD 条时由 append_history_event 安排压缩，
+    压缩期间的读写通过 history_file_lock 与之互斥。
+    """
+
+    def __init__(self):
+        self._pending: set = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, history_type: str, file_name: str) -> None:
+        """安排压缩指定历史记录"""
+        with self._lock:
+            self._pending.add((history_type, file_name))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="HistoryCompactor", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                pending = list(self._pending)
+                self._pending.clear()
+                self._wakeup.clear()
+            for history_type, file_name in pending:
+                try:
+                    compact_history_data(history_type, file_name)
+                except Exception as e:
+                    logger.exception(
+                        f"压缩历史记录日志失败 {history_type}/{file_name}: {e}"
+                    )
+
+
+history_compactor = HistoryCompactor()
+
+
+def compact_all_history_data() -> int:
+    """压缩所有点名与抽奖历史记录的追加日志
+
+    Returns:
+        int: 完成压缩的历史记录数量
+    """
+    compacted = 0
+    for history_type in HISTORY_ENTRY_KEYS:
+        for file_name in get_all_history_names(history_type):
+            try:
+                if compact_history_data(history_type, file_name):
+                    compacted += 1
+            except Exception as e:
+                logger.exception(
+                    f"压缩历史记录日志失败 {history_type}/{file_name}: {e}"
+                )
+    if compacted:
+        logger.info(f"已压缩 {compacted} 个历史记录日志")
+    return compacted
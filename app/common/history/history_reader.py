@@ -6,8 +6,48 @@ from typing import Dict, List, Any, Optional, Tuple
 
 from loguru import logger
 
-from app.tools.path_utils import get_data_path, open_file, file_exists
+from app.tools.path_utils import get_data_path, open_file
 from app.common.data.list import get_gender_list, get_group_list
+from app.common.history.file_utils import (
+    count_history_records_by_name,
+    load_history_data,
+    query_history_records,
+)
+from app.common.history.sqlite_store import HISTORY_ENTRY_KEYS
+from app.common.history.aggregates import (
+    ROLL_CALL_AGGREGATES_VERSION,
+    get_rounds_missed,
+    get_student_counters,
+    get_subject_records,
+)
+
+
+def _get_records_by_name(
+    history_type: str,
+    history_data: Optional[Dict[str, Any]],
+    file_name: Optional[str],
+    subject_name: Optional[str] = None,
+    name: Optional[str] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """获取按学生/奖品名称分组的抽取记录
+
+    提供 file_name 时直接查询（使用数据库时为索引查询，无需加载整个历史记录），
+    否则从已加载的 history_data 中读取。
+    """
+    if file_name is not None:
+        records_by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for entry_name, record in query_history_records(
+            history_type, file_name, name, subject_name
+        ):
+            records_by_name.setdefault(entry_name, []).append(record)
+        return records_by_name
+
+    entries = (history_data or {}).get(HISTORY_ENTRY_KEYS[history_type], {})
+    return {
+        entry_name: entry.get("history", [])
+        for entry_name, entry in entries.items()
+        if isinstance(entry, dict) and (name is None or entry_name == name)
+    }
 
 
 # ==================================================
@@ -58,12 +98,7 @@ def get_roll_call_history_data(
         Dict[str, Any]: 历史记录数据
     """
     try:
-        history_file = get_data_path("history/roll_call_history", f"{class_name}.json")
-        if not file_exists(history_file):
-            return {}
-
-        with open_file(history_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return load_history_data("roll_call", class_name)
     except Exception as e:
         logger.error(f"获取点名历史记录数据失败: {e}")
         return {}
@@ -74,8 +109,11 @@ def filter_roll_call_history_by_subject(
 ) -> Dict[str, Any]:
     """按课程过滤点名历史记录
 
+    通过科目索引直接取出该科目的记录，耗时只与学生人数和匹配的记录数有关，
+    不扫描其他科目的记录；各学生的 history 仍为列表。
+
     Args:
-        history_data: 原始历史记录数据
+        history_data: 原始历史记录数据（不会被修改，缺少科目索引时逐条扫描）
         subject_name: 课程名称
 
     Returns:
@@ -84,18 +122,28 @@ def filter_roll_call_history_by_subject(
     if not subject_name:
         return history_data
 
+    indexed = history_data.get("aggregates_version") == ROLL_CALL_AGGREGATES_VERSION
     filtered_history_data = {"students": {}}
     for student_name, student_info in history_data.get("students", {}).items():
-        filtered_history = []
-        for record in student_info.get("history", []):
-            if record.get("class_name", "") == subject_name:
-                filtered_history.append(record)
-        if filtered_history:
-            filtered_history_data["students"][student_name] = {
+        view = get_subject_records(student_info, subject_name) if indexed else None
+        if view is not None:
+            records = list(view)
+        else:
+            records = [
+                record
+                for record in student_info.get("history", [])
+                if record.get("class_name", "") == subject_name
+            ]
+        if records:
+            student = {
                 **student_info,
-                "history": filtered_history,
-                "total_count": len(filtered_history),
+                "history": records,
+                "total_count": len(records),
+                # 过滤后的 total_rounds 为该科目的轮数，未选中轮数按全部轮数直接给出
+                "rounds_missed": get_rounds_missed(history_data, student_info),
             }
+            student.pop("last_drawn_round", None)
+            filtered_history_data["students"][student_name] = student
 
     # 添加科目统计信息
     subject_stats = history_data.get("subject_stats", {})
@@ -125,31 +173,26 @@ def get_roll_call_student_total_count(
     Returns:
         int: 总次数
     """
-    if subject_name:
-        # 如果选择了特定课程，从 subject_stats 中获取统计信息
-        student_info = history_data.get("students", {}).get(student_name, {})
-        subject_stats = student_info.get("subject_stats", {})
-        if subject_name in subject_stats:
-            return subject_stats[subject_name].get("total_count", 0)
-        return 0
-    else:
-        # 统计所有历史记录
-        return int(
-            history_data.get("students", {}).get(student_name, {}).get("total_count", 0)
-        )
+    # 选择了特定课程时使用该课程的统计，否则统计所有历史记录
+    counters = get_student_counters(
+        history_data.get("students", {}).get(student_name), subject_name
+    )
+    return int(counters.get("total_count", 0)) if counters else 0
 
 
 def get_roll_call_students_data(
     cleaned_students: List[Tuple[str, str, str, str]],
-    history_data: Dict[str, Any],
+    history_data: Optional[Dict[str, Any]],
     subject_name: Optional[str] = None,
+    class_name: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """获取学生数据列表
 
     Args:
         cleaned_students: 清理后的学生列表
-        history_data: 历史记录数据
+        history_data: 历史记录数据，提供 class_name 时不使用
         subject_name: 课程名称，如果为None则统计所有记录
+        class_name: 班级名称，提供时直接查询各学生的次数
 
     Returns:
         List[Dict[str, Any]]: 学生数据列表
@@ -160,11 +203,20 @@ def get_roll_call_students_data(
         else 0
     )
 
+    counts = (
+        count_history_records_by_name("roll_call", class_name, subject_name)
+        if class_name is not None
+        else None
+    )
+
     students_data = []
     for student_id, name, gender, group in cleaned_students:
-        total_count = get_roll_call_student_total_count(
-            history_data, name, subject_name
-        )
+        if counts is not None:
+            total_count = counts.get(name, 0)
+        else:
+            total_count = get_roll_call_student_total_count(
+                history_data, name, subject_name
+            )
         students_data.append(
             {
                 "id": str(student_id).zfill(max_id_length),
@@ -192,15 +244,17 @@ def get_roll_call_students_data(
 
 def get_roll_call_session_data(
     cleaned_students: List[Tuple[str, str, str, str]],
-    history_data: Dict[str, Any],
+    history_data: Optional[Dict[str, Any]],
     subject_name: Optional[str] = None,
+    class_name: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """获取点名会话数据列表
 
     Args:
         cleaned_students: 清理后的学生列表
-        history_data: 历史记录数据
+        history_data: 历史记录数据，提供 class_name 时不使用
         subject_name: 课程名称，如果为None则显示所有记录
+        class_name: 班级名称，提供时直接查询抽取记录
 
     Returns:
         List[Dict[str, Any]]: 会话数据列表
@@ -210,107 +264,77 @@ def get_roll_call_session_data(
         if cleaned_students
         else 0
     )
+    records_by_name = _get_records_by_name(
+        "roll_call", history_data, class_name, subject_name
+    )
 
     students_data = []
     for student_id, name, gender, group in cleaned_students:
-        time_records = (
-            history_data.get("students", {}).get(name, {}).get("history", [{}])
-        )
-        for record in time_records:
+        for record in records_by_name.get(name, []):
             draw_time = record.get("draw_time", "")
-            if draw_time:
-                # 如果选择了特定课程，只显示该课程的记录
-                if subject_name:
-                    if record.get("class_name", "") == subject_name:
-                        students_data.append(
-                            {
-                                "draw_time": draw_time,
-                                "id": str(student_id).zfill(max_id_length),
-                                "name": name,
-                                "gender": gender,
-                                "group": group,
-                                "class_name": record.get("class_name", ""),
-                                "weight": record.get("weight", ""),
-                            }
-                        )
-                else:
-                    students_data.append(
-                        {
-                            "draw_time": draw_time,
-                            "id": str(student_id).zfill(max_id_length),
-                            "name": name,
-                            "gender": gender,
-                            "group": group,
-                            "class_name": record.get("class_name", ""),
-                            "weight": record.get("weight", ""),
-                        }
-                    )
+            if not draw_time:
+                continue
+            # 如果选择了特定课程，只显示该课程的记录
+            if subject_name and record.get("class_name", "") != subject_name:
+                continue
+            students_data.append(
+                {
+                    "draw_time": draw_time,
+                    "id": str(student_id).zfill(max_id_length),
+                    "name": name,
+                    "gender": gender,
+                    "group": group,
+                    "class_name": record.get("class_name", ""),
+                    "weight": record.get("weight", ""),
+                }
+            )
     return students_data
 
 
 def get_roll_call_student_stats_data(
     cleaned_students: List[Tuple[str, str, str, str]],
-    history_data: Dict[str, Any],
+    history_data: Optional[Dict[str, Any]],
     student_name: str,
     subject_name: Optional[str] = None,
+    class_name: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """获取点名学生统计数据列表
 
     Args:
         cleaned_students: 清理后的学生列表
-        history_data: 历史记录数据
+        history_data: 历史记录数据，提供 class_name 时不使用
         student_name: 学生姓名
         subject_name: 课程名称，如果为None则显示所有记录
+        class_name: 班级名称，提供时直接查询该学生的抽取记录
 
     Returns:
         List[Dict[str, Any]]: 统计数据列表
     """
-    max_id_length = (
-        max(len(str(student[0])) for student in cleaned_students)
-        if cleaned_students
-        else 0
-    )
+    if not any(name == student_name for _, name, _, _ in cleaned_students):
+        return []
+    records = _get_records_by_name(
+        "roll_call", history_data, class_name, subject_name, student_name
+    ).get(student_name, [])
 
     students_data = []
-    for student_id, name, gender, group in cleaned_students:
-        if name == student_name:
-            time_records = (
-                history_data.get("students", {}).get(name, {}).get("history", [{}])
-            )
-            for record in time_records:
-                draw_time = record.get("draw_time", "")
-                if draw_time:
-                    # 如果选择了特定课程，只显示该课程的记录
-                    if subject_name:
-                        if record.get("class_name", "") == subject_name:
-                            students_data.append(
-                                {
-                                    "draw_time": draw_time,
-                                    "draw_method": str(record.get("draw_method", "")),
-                                    "draw_people_numbers": str(
-                                        record.get("draw_people_numbers", 0)
-                                    ),
-                                    "draw_gender": str(record.get("draw_gender", "")),
-                                    "draw_group": str(record.get("draw_group", "")),
-                                    "class_name": record.get("class_name", ""),
-                                    "weight": record.get("weight", ""),
-                                }
-                            )
-                    else:
-                        students_data.append(
-                            {
-                                "draw_time": draw_time,
-                                "draw_method": str(record.get("draw_method", "")),
-                                "draw_people_numbers": str(
-                                    record.get("draw_people_numbers", 0)
-                                ),
-                                "draw_gender": str(record.get("draw_gender", "")),
-                                "draw_group": str(record.get("draw_group", "")),
-                                "class_name": record.get("class_name", ""),
-                                "weight": record.get("weight", ""),
-                            }
-                        )
-            break
+    for record in records:
+        draw_time = record.get("draw_time", "")
+        if not draw_time:
+            continue
+        # 如果选择了特定课程，只显示该课程的记录
+        if subject_name and record.get("class_name", "") != subject_name:
+            continue
+        students_data.append(
+            {
+                "draw_time": draw_time,
+                "draw_method": str(record.get("draw_method", "")),
+                "draw_people_numbers": str(record.get("draw_people_numbers", 0)),
+                "draw_gender": str(record.get("draw_gender", "")),
+                "draw_group": str(record.get("draw_group", "")),
+                "class_name": record.get("class_name", ""),
+                "weight": record.get("weight", ""),
+            }
+        )
     return students_data
 
 
@@ -381,12 +405,7 @@ def get_lottery_history_data(
         Dict[str, Any]: 历史记录数据
     """
     try:
-        history_file = get_data_path("history/lottery_history", f"{pool_name}.json")
-        if not file_exists(history_file):
-            return {}
-
-        with open_file(history_file, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return load_history_data("lottery", pool_name)
     except Exception as e:
         logger.error(f"获取抽奖历史记录数据失败: {e}")
         return {}
@@ -394,13 +413,15 @@ def get_lottery_history_data(
 
 def get_lottery_prizes_data(
     cleaned_lotterys: List[Tuple[str, str, str]],
-    history_data: Dict[str, Any],
+    history_data: Optional[Dict[str, Any]],
+    pool_name: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """获取奖品数据列表
 
     Args:
         cleaned_lotterys: 清理后的奖品列表
-        history_data: 历史记录数据
+        history_data: 历史记录数据，提供 pool_name 时不使用
+        pool_name: 奖池名称，提供时直接查询各奖品的次数
 
     Returns:
         List[Dict[str, Any]]: 奖品数据列表
@@ -410,24 +431,27 @@ def get_lottery_prizes_data(
         if cleaned_lotterys
         else 0
     )
-    max_total_count_length = (
-        max(
-            len(
-                str(
-                    history_data.get("lotterys", {}).get(name, {}).get("total_count", 0)
-                )
+    if pool_name is not None:
+        counts = count_history_records_by_name("lottery", pool_name)
+    else:
+        counts = {
+            name: int(
+                (history_data or {})
+                .get("lotterys", {})
+                .get(name, {})
+                .get("total_count", 0)
             )
             for _, name, _ in cleaned_lotterys
-        )
+        }
+    max_total_count_length = (
+        max(len(str(counts.get(name, 0))) for _, name, _ in cleaned_lotterys)
         if cleaned_lotterys
         else 0
     )
 
     lotterys_data = []
     for lottery_id, name, weight in cleaned_lotterys:
-        total_count = int(
-            history_data.get("lotterys", {}).get(name, {}).get("total_count", 0)
-        )
+        total_count = counts.get(name, 0)
         lotterys_data.append(
             {
                 "id": str(lottery_id).zfill(max_id_length),
@@ -442,15 +466,17 @@ def get_lottery_prizes_data(
 
 def get_lottery_session_data(
     cleaned_lotterys: List[Tuple[str, str, str]],
-    history_data: Dict[str, Any],
+    history_data: Optional[Dict[str, Any]],
     subject_name: Optional[str] = None,
+    pool_name: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """获取抽奖会话数据列表
 
     Args:
         cleaned_lotterys: 清理后的奖品列表
-        history_data: 历史记录数据
+        history_data: 历史记录数据，提供 pool_name 时不使用
         subject_name: 课程名称，如果为None则显示所有记录
+        pool_name: 奖池名称，提供时直接查询抽取记录
 
     Returns:
         List[Dict[str, Any]]: 会话数据列表
@@ -463,102 +489,74 @@ def get_lottery_session_data(
 
     # 创建奖品名称到权重的映射
     lottery_weight_map = {name: weight for _, name, weight in cleaned_lotterys}
+    records_by_name = _get_records_by_name(
+        "lottery", history_data, pool_name, subject_name
+    )
 
     lotterys_data = []
     for lottery_id, name, weight in cleaned_lotterys:
-        time_records = (
-            history_data.get("lotterys", {}).get(name, {}).get("history", [{}])
-        )
-        for record in time_records:
+        for record in records_by_name.get(name, []):
             draw_time = record.get("draw_time", "")
-            if draw_time:
-                # 如果选择了特定课程，只显示该课程的记录
-                if subject_name:
-                    if record.get("class_name", "") == subject_name:
-                        lotterys_data.append(
-                            {
-                                "draw_time": draw_time,
-                                "id": str(lottery_id).zfill(max_id_length),
-                                "name": name,
-                                "class_name": record.get("class_name", ""),
-                                "weight": lottery_weight_map.get(name, ""),
-                            }
-                        )
-                else:
-                    lotterys_data.append(
-                        {
-                            "draw_time": draw_time,
-                            "id": str(lottery_id).zfill(max_id_length),
-                            "name": name,
-                            "class_name": record.get("class_name", ""),
-                            "weight": lottery_weight_map.get(name, ""),
-                        }
-                    )
+            if not draw_time:
+                continue
+            # 如果选择了特定课程，只显示该课程的记录
+            if subject_name and record.get("class_name", "") != subject_name:
+                continue
+            lotterys_data.append(
+                {
+                    "draw_time": draw_time,
+                    "id": str(lottery_id).zfill(max_id_length),
+                    "name": name,
+                    "class_name": record.get("class_name", ""),
+                    "weight": lottery_weight_map.get(name, ""),
+                }
+            )
     return lotterys_data
 
 
 def get_lottery_prize_stats_data(
     cleaned_lotterys: List[Tuple[str, str, str]],
-    history_data: Dict[str, Any],
+    history_data: Optional[Dict[str, Any]],
     lottery_name: str,
     subject_name: Optional[str] = None,
+    pool_name: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """获取抽奖奖品统计数据列表
 
     Args:
         cleaned_lotterys: 清理后的奖品列表
-        history_data: 历史记录数据
+        history_data: 历史记录数据，提供 pool_name 时不使用
         lottery_name: 奖品名称
         subject_name: 课程名称，如果为None则显示所有记录
+        pool_name: 奖池名称，提供时直接查询该奖品的抽取记录
 
     Returns:
         List[Dict[str, Any]]: 统计数据列表
     """
-    max_id_length = (
-        max(len(str(lottery[0])) for lottery in cleaned_lotterys)
-        if cleaned_lotterys
-        else 0
-    )
-
     # 创建奖品名称到权重的映射
     lottery_weight_map = {name: weight for _, name, weight in cleaned_lotterys}
+    if lottery_name not in lottery_weight_map:
+        return []
+    records = _get_records_by_name(
+        "lottery", history_data, pool_name, subject_name, lottery_name
+    ).get(lottery_name, [])
 
     lotterys_data = []
-    for lottery_id, name, weight in cleaned_lotterys:
-        if name == lottery_name:
-            time_records = (
-                history_data.get("lotterys", {}).get(name, {}).get("history", [{}])
-            )
-            for record in time_records:
-                draw_time = record.get("draw_time", "")
-                if draw_time:
-                    # 如果选择了特定课程，只显示该课程的记录
-                    if subject_name:
-                        if record.get("class_name", "") == subject_name:
-                            lotterys_data.append(
-                                {
-                                    "draw_time": draw_time,
-                                    "draw_lottery_numbers": str(
-                                        record.get("draw_lottery_numbers", 0)
-                                    ),
-                                    "draw_gender": str(record.get("draw_gender", "")),
-                                    "draw_group": str(record.get("draw_group", "")),
-                                    "class_name": record.get("class_name", ""),
-                                    "weight": lottery_weight_map.get(name, ""),
-                                }
-                            )
-                    else:
-                        lotterys_data.append(
-                            {
-                                "draw_time": draw_time,
-                                "draw_lottery_numbers": str(
-                                    record.get("draw_lottery_numbers", 0)
-                                ),
-                                "draw_gender": str(record.get("draw_gender", "")),
-                                "draw_group": str(record.get("draw_group", "")),
-                                "class_name": record.get("class_name", ""),
-                                "weight": lottery_weight_map.get(name, ""),
-                            }
-                        )
-            break
+    for record in records:
+        draw_time = record.get("draw_time", "")
+        if not draw_time:
+            continue
+        # 如果选择了特定课程，只显示该课程的记录
+        if subject_name and record.get("class_name", "") != subject_name:
+            continue
+        lotterys_data.append(
+            {
+                "draw_time": draw_time,
+                "draw_lottery_numbers": str(record.get("draw_lottery_numbers", 0)),
+                "draw_gender": str(record.get("draw_gender", "")),
+                "draw_group": str(record.get("draw_group", "")),
+                "class_name": record.get("class_name", ""),
+                "weight": lottery_weight_map[lottery_name],
+            }
+        )
     return lotterys_data
@@ -0,0 +1,321 @@
+# ==================================================
+# 导入库
+# ==================================================
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+# 日志文件后缀，与快照文件（<名称>.json）位于同一目录
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+# 检查点记录的事件类型，压缩后日志中只保留一条检查点，记录已并入快照的最大序号
+CHECKPOINT_EVENT = "checkpoint"
+
+# 快照中记录已并入的最大日志序号的键
+JOURNAL_SEQ_KEY = "journal_seq"
+
+
+# ==================================================
+# 历史记录追加日志
+# ==================================================
+# 每次抽取向日志追加一行紧凑 JSON（序号、事件类型、事件数据），写入代价与历史大小无关。
+# 读取时在快照之上按序号重放快照尚未包含的日志记录，压缩时把日志并入快照并写入检查点。
+
+_locks: Dict[str, threading.RLock] = {}
+_write_locks: Dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+
+# 每个日志文件的 (检查点序号, 最后序号)，首次使用时从日志读取
+_journal_state: Dict[str, Tuple[int, int]] = {}
+
+# 读取或写入 _journal_state 时日志文件的 (mtime_ns, 文件大小)，文件被其他途径
+# 改写（截断、删除、导入替换）后与之不一致，下次使用时重新读取日志
+_journal_stamps: Dict[str, Optional[Tuple[int, int]]] = {}
+
+# 历史记录类型 → 重放函数 (history_data, event, data)
+_replayers: Dict[str, Callable[[Dict[str, Any], str, Dict[str, Any]], None]] = {}
+
+# 历史记录类型 → 写时复制函数 (history_data, event, data) -> 新数据
+_copiers: Dict[
+    str, Callable[[Dict[str, Any], str, Dict[str, Any]], Dict[str, Any]]
+] = {}
+
+
+def get_journal_path(snapshot_path: Path) -> Path:
+    """获取快照文件对应的日志文件路径"""
+    return snapshot_path.with_name(f"{snapshot_path.stem}{JOURNAL_SUFFIX}")
+
+
+def history_file_lock(snapshot_path: Path) -> threading.RLock:
+    """获取历史记录文件（快照与日志）的读写锁"""
+    key = str(snapshot_path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.RLock()
+        return lock
+
+
+def journal_write_lock(journal_path: Path) -> threading.RLock:
+    """获取日志文件的写入锁
+
+    后台写盘线程只持有此锁追加日志行（写入与 fsync 期间不阻塞持有
+    history_file_lock 的读取与提交），改写或删除日志文件时也需持有此锁。
+    需要同时持有两把锁时，先获取本锁，再获取 history_file_lock。
+    """
+    key = str(journal_path)
+    with _locks_guard:
+        lock = _write_locks.get(key)
+        if lock is None:
+            lock = _write_locks[key] = threading.RLock()
+        return lock
+
+
+def register_journal_replayer(
+    history_type: str,
+    replayer: Callable[[Dict[str, Any], str, Dict[str, Any]], None],
+    copier: Optional[
+        Callable[[Dict[str, Any], str, Dict[str, Any]], Dict[str, Any]]
+    ] = None,
+) -> None:
+    """注册历史记录类型的日志重放函数
+
+    Args:
+        history_type: 历史记录类型 (roll_call, lottery 等)
+        replayer: 重放函数，参数为 (历史记录数据, 事件类型, 事件数据)，原地修改历史记录数据
+        copier: 写时复制函数，参数同上，返回只复制了 replayer 处理该事件时
+            会修改的容器的新数据，其余部分与原数据共享
+    """
+    _replayers[history_type] = replayer
+    if copier is not None:
+        _copiers[history_type] = copier
+    else:
+        _copiers.pop(history_type, None)
+
+
+def copy_for_journal_event(
+    history_type: str, history_data: Dict[str, Any], event: str, data: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """复制重放一条事件前需要复制的容器（写时复制）
+
+    Returns:
+        Optional[Dict[str, Any]]: 可在其上重放该事件的新数据，未注册写时复制函数时返回 None
+    """
+    copier = _copiers.get(history_type)
+    if copier is None:
+        return None
+    return copier(history_data, event, data)
+
+
+def read_journal(journal_path: Path) -> List[Dict[str, Any]]:
+    """读取日志中的全部记录
+
+    写入中断产生的不完整行会被跳过。
+
+    Returns:
+        List[Dict[str, Any]]: 按写入顺序排列的日志记录
+    """
+    try:
+        with open(journal_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+
+    entries = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning(f"跳过损坏的历史日志记录 {journal_path}:{line_number}")
+            continue
+        if isinstance(entry, dict) and isinstance(entry.get("seq"), int):
+            entries.append(entry)
+    return entries
+
+
+def _get_file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _get_journal_state(journal_path: Path) -> Tuple[int, int]:
+    key = str(journal_path)
+    stamp = _get_file_stamp(journal_path)
+    state = _journal_state.get(key)
+    if state is None or _journal_stamps.get(key) != stamp:
+        checkpoint_seq = last_seq = 0
+        for entry in read_journal(journal_path):
+            last_seq = max(last_seq, entry["seq"])
+            if entry.get("event") == CHECKPOINT_EVENT:
+                checkpoint_seq = entry["seq"]
+        if state is not None:
+            # 文件被截断或删除时已分配的序号不回退，避免与尚未写盘的记录重复
+            last_seq = max(last_seq, state[1])
+        state = _journal_state[key] = (checkpoint_seq, last_seq)
+        _journal_stamps[key] = stamp
+    return state
+
+
+def _record_journal_stamp(
+    journal_path: Path, before: Optional[Tuple[int, int]]
+) -> None:
+    # 本进程写入日志后记录新的文件戳；写入前文件已被其他途径改写时保留旧值，
+    # 下次使用时重新读取
+    key = str(journal_path)
+    if _journal_stamps.get(key) == before:
+        _journal_stamps[key] = _get_file_stamp(journal_path)
+
+
+def has_pending_journal_entries(journal_path: Path) -> bool:
+    """日志中是否有尚未压缩的记录（调用方需持有 history_file_lock）"""
+    checkpoint_seq, last_seq = _get_journal_state(journal_path)
+    return last_seq > checkpoint_seq
+
+
+def get_journal_checkpoint(journal_path: Path) -> int:
+    """获取已并入快照的最大日志序号（调用方需持有 history_file_lock）"""
+    return _get_journal_state(journal_path)[0]
+
+
+def reserve_journal_seq(journal_path: Path, applied_seq: int = 0) -> Tuple[int, int]:
+    """为下一条日志记录分配序号（调用方需持有 history_file_lock）
+
+    序号分配后即视为已写入，记录本身可以稍后由 write_journal_entry 写入；
+    在此之前压缩时，快照数据中已包含该记录，写入后按序号被跳过。
+
+    Args:
+        journal_path: 日志文件路径
+        applied_seq: 当前快照数据已包含的最大序号，新序号总是大于它，
+            快照被替换（如导入）后追加的记录不会因序号过小在重放时被跳过
+
+    Returns:
+        Tuple[int, int]: (本条记录的序号, 自上次压缩以来的记录数)
+    """
+    checkpoint_seq, last_seq = _get_journal_state(journal_path)
+    seq = max(last_seq, int(applied_seq or 0)) + 1
+    _journal_state[str(journal_path)] = (checkpoint_seq, seq)
+    return seq, seq - checkpoint_seq
+
+
+def write_journal_entry(
+    journal_path: Path, seq: int, event: str, data: Dict[str, Any]
+) -> None:
+    """把已分配序号的记录写入日志（调用方需持有 journal_write_lock）
+
+    写入失败时去掉不完整的行并抛出 OSError。
+
+    Args:
+        journal_path: 日志文件路径
+        seq: reserve_journal_seq 分配的序号
+        event: 事件类型
+        data: 事件数据
+    """
+    line = json.dumps(
+        {"seq": seq, "event": event, "data": data},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    payload = (line + "\n").encode("utf-8")
+    fd = os.open(journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        st = os.fstat(fd)
+        start = st.st_size
+        # 文件由本次写入创建时，写入前的文件戳为 None
+        before = (st.st_mtime_ns, start) if start else None
+        try:
+            written = 0
+            while written < len(payload):
+                written += os.write(fd, payload[written:])
+            os.fsync(fd)
+        except OSError:
+            # 去掉写了一半的行，重试时从新的一行开始写入
+            os.ftruncate(fd, start)
+            raise
+    finally:
+        os.close(fd)
+    _record_journal_stamp(journal_path, before)
+
+
+def write_journal_checkpoint(journal_path: Path, seq: int) -> None:
+    """用一条检查点记录替换日志中已并入快照的记录
+
+    调用方需依次持有 journal_write_lock 与 history_file_lock。
+
+    序号大于 seq 的记录（快照写入期间追加的）保留在检查点之后。
+
+    Args:
+        journal_path: 日志文件路径
+        seq: 已并入快照的最大序号
+    """
+    _, last_seq = _get_journal_state(journal_path)
+    lines = [json.dumps({"seq": seq, "event": CHECKPOINT_EVENT})]
+    lines.extend(
+        json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        for entry in read_journal(journal_path)
+        if entry["seq"] > seq and entry.get("event") != CHECKPOINT_EVENT
+    )
+    temp_path = journal_path.with_name(f"{journal_path.name}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temp_path, journal_path)
+    _journal_state[str(journal_path)] = (seq, max(seq, last_seq))
+    _journal_stamps[str(journal_path)] = _get_file_stamp(journal_path)
+
+
+def remove_journal(journal_path: Path) -> None:
+    """删除日志文件（调用方需依次持有 journal_write_lock 与 history_file_lock）"""
+    try:
+        journal_path.unlink()
+    except FileNotFoundError:
+        pass
+    _journal_state.pop(str(journal_path), None)
+    _journal_stamps.pop(str(journal_path), None)
+
+
+def replay_journal(
+    history_type: str, history_data: Dict[str, Any], entries: List[Dict[str, Any]]
+) -> int:
+    """在历史记录数据上重放快照尚未包含的日志记录
+
+    Args:
+        history_type: 历史记录类型
+        history_data: 快照数据（原地修改，并更新 journal_seq）
+        entries: 日志记录
+
+    Returns:
+        int: 重放的记录数
+    """
+    applied_seq = int(history_data.get(JOURNAL_SEQ_KEY, 0) or 0)
+    replayer = _replayers.get(history_type)
+    replayed = 0
+    for entry in entries:
+        seq = entry["seq"]
+        if seq <= applied_seq:
+            continue
+        event = entry.get("event")
+        if event != CHECKPOINT_EVENT:
+            if replayer is None:
+                logger.error(
+                    f"未注册 {history_type} 历史日志的重放函数，跳过记录 {seq}"
+                )
+            else:
+                try:
+                    replayer(history_data, event, entry.get("data") or {})
+                    replayed += 1
+                except Exception as e:
+                    logger.exception(
+                        f"重放 {history_type} 历史日志记录 {seq} 失败: {e}"
+                    )
+        applied_seq = seq
+        history_data[JOURNAL_SEQ_KEY] = seq
+    return replayed
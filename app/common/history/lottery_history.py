@@ -7,7 +7,8 @@ from typing import Dict, List, Any
 from loguru import logger
 
 from app.common.extraction.extract import _get_current_class_info
-from app.common.history.file_utils import load_history_data, save_history_data
+from app.common.history.file_utils import append_history_event
+from app.common.history.journal import register_journal_replayer
 
 
 # ==================================================
@@ -37,60 +38,104 @@ def save_lottery_history(
         # 获取当前课程信息
         current_class_info = _get_current_class_info()
 
-        history_data = load_history_data("lottery", pool_name)
-        lotterys = history_data.get("lotterys", {})
-        group_stats = history_data.get("group_stats", {})
-        gender_stats = history_data.get("gender_stats", {})
-        total_stats = history_data.get("total_stats", 0)
-
-        for student in selected_students or []:
-            name = student.get("name", "")
-            if not name:
-                continue
-            entry = lotterys.get(name)
-            if not isinstance(entry, dict):
-                entry = {
-                    "total_count": 0,
-                    "rounds_missed": 0,
-                    "last_drawn_time": "",
-                    "history": [],
-                }
-            entry["total_count"] = int(entry.get("total_count", 0)) + 1
-            entry["last_drawn_time"] = current_time
-            hist = entry.get("history", [])
-            if not isinstance(hist, list):
-                hist = []
-            hist.append(
-                {
-                    "draw_time": current_time,
-                    "draw_lottery_numbers": len(selected_students),
-                    "draw_group": group_filter,
-                    "draw_gender": gender_filter,
-                }
-            )
-            # 如果能获取到课程信息，则添加到历史记录中
-            if current_class_info:
-                hist[-1]["class_name"] = current_class_info.get("name", "")
-            entry["history"] = hist
-            lotterys[name] = entry
-
-        # 更新统计
-        if group_filter:
-            group_stats[group_filter] = int(group_stats.get(group_filter, 0)) + len(
-                selected_students or []
-            )
-        if gender_filter:
-            gender_stats[gender_filter] = int(gender_stats.get(gender_filter, 0)) + len(
-                selected_students or []
-            )
-        total_stats = int(total_stats) + len(selected_students or [])
-
-        history_data["lotterys"] = lotterys
-        history_data["group_stats"] = group_stats
-        history_data["gender_stats"] = gender_stats
-        history_data["total_stats"] = total_stats
-
-        return save_history_data("lottery", pool_name, history_data)
+        event = {
+            "time": current_time,
+            "names": [student.get("name", "") for student in selected_students or []],
+            "subject": current_class_info.get("name", "")
+            if current_class_info
+            else None,
+            "group_filter": group_filter,
+            "gender_filter": gender_filter,
+        }
+        # 只向日志追加一行，由读取与后台压缩时重放到快照中
+        return append_history_event("lottery", pool_name, "draw", event)
     except Exception as e:
         logger.exception(f"保存抽奖历史失败: {e}")
         return False
+
+
+def _replay_lottery_event(
+    history_data: Dict[str, Any], event: str, data: Dict[str, Any]
+) -> None:
+    """把一条抽奖日志记录重放到历史记录数据上"""
+    if event != "draw":
+        logger.warning(f"未知的抽奖历史日志事件: {event}")
+        return
+    current_time = data.get("time", "")
+    names = data.get("names") or []
+    subject_name = data.get("subject")
+    group_filter = data.get("group_filter")
+    gender_filter = data.get("gender_filter")
+
+    lotterys = history_data.get("lotterys", {})
+    group_stats = history_data.get("group_stats", {})
+    gender_stats = history_data.get("gender_stats", {})
+    total_stats = history_data.get("total_stats", 0)
+
+    for name in names:
+        if not name:
+            continue
+        entry = lotterys.get(name)
+        if not isinstance(entry, dict):
+            entry = {
+                "total_count": 0,
+                "rounds_missed": 0,
+                "last_drawn_time": "",
+                "history": [],
+            }
+        entry["total_count"] = int(entry.get("total_count", 0)) + 1
+        entry["last_drawn_time"] = current_time
+        hist = entry.get("history", [])
+        if not isinstance(hist, list):
+            hist = []
+        hist.append(
+            {
+                "draw_time": current_time,
+                "draw_lottery_numbers": len(names),
+                "draw_group": group_filter,
+                "draw_gender": gender_filter,
+            }
+        )
+        # 如果能获取到课程信息，则添加到历史记录中
+        if subject_name is not None:
+            hist[-1]["class_name"] = subject_name
+        entry["history"] = hist
+        lotterys[name] = entry
+
+    # 更新统计
+    if group_filter:
+        group_stats[group_filter] = int(group_stats.get(group_filter, 0)) + len(names)
+    if gender_filter:
+        gender_stats[gender_filter] = int(gender_stats.get(gender_filter, 0)) + len(
+            names
+        )
+    total_stats = int(total_stats) + len(names)
+
+    history_data["lotterys"] = lotterys
+    history_data["group_stats"] = group_stats
+    history_data["gender_stats"] = gender_stats
+    history_data["total_stats"] = total_stats
+
+
+def _copy_for_lottery_event(
+    history_data: Dict[str, Any], event: str, data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """复制重放一条抽奖日志记录时会修改的容器，其余数据与原数据共享
+
+    history 列表只追加，不复制，新旧数据共享同一列表。
+    """
+    updated = dict(history_data)
+    lotterys = updated.get("lotterys")
+    if isinstance(lotterys, dict):
+        lotterys = updated["lotterys"] = dict(lotterys)
+        for name in data.get("names") or []:
+            entry = lotterys.get(name)
+            if isinstance(entry, dict):
+                lotterys[name] = dict(entry)
+    for key in ("group_stats", "gender_stats"):
+        if isinstance(updated.get(key), dict):
+            updated[key] = dict(updated[key])
+    return updated
+
+
+register_journal_replayer("lottery", _replay_lottery_event, _copy_for_lottery_event)
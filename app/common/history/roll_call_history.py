@@ -1,6 +1,7 @@
 # ==================================================
 # 导入库
 # ==================================================
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 
@@ -8,10 +9,30 @@ from loguru import logger
 
 from app.tools.settings_access import readme_settings_async
 from app.common.data.list import get_student_list
-from app.Language.obtain_language import get_content_combo_name_async
 from app.common.extraction.extract import _get_current_class_info
-from app.common.history.file_utils import load_history_data, save_history_data
+from app.common.history.file_utils import append_history_event
+from app.common.history.journal import register_journal_replayer
 from app.common.history.weight_utils import calculate_weight
+from app.common.history.aggregates import (
+    apply_record_to_aggregates,
+    ensure_roll_call_aggregates,
+    get_all_filter_options,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class RollCallDrawResult:
+    """一次点名抽取时已确定的上下文，保存历史记录时直接复用
+
+    Attributes:
+        current_class_info: 抽取时的课程信息
+        subject_filter: 抽取时的科目过滤器
+        weights: 抽取时计算的学生权重（姓名 → next_weight），未计算权重时为 None
+    """
+
+    current_class_info: Optional[Dict]
+    subject_filter: str
+    weights: Optional[Dict[str, Any]] = None
 
 
 def _initialize_history_data(history_data: Dict[str, Any]):
@@ -26,6 +47,9 @@ def _initialize_history_data(history_data: Dict[str, Any]):
     if "total_stats" not in history_data:
         history_data["total_stats"] = 0
 
+    # 旧版本历史文件先根据完整记录构建聚合统计，之后只做增量更新
+    ensure_roll_call_aggregates(history_data)
+
 
 def _get_subject_filter() -> Tuple[Optional[Dict], str]:
     """获取当前课程信息和科目过滤器"""
@@ -64,14 +88,23 @@ def _get_subject_filter() -> Tuple[Optional[Dict], str]:
 def _update_student_history(
     history_data: Dict[str, Any],
     selected_students: List[Dict[str, Any]],
-    students_with_weight: List[Dict[str, Any]],
+    student_weights: Dict[str, Any],
     current_time: str,
     current_class_info: Optional[Dict],
     group_filter: Optional[str],
     gender_filter: Optional[str],
+    all_group: Optional[str] = None,
+    all_gender: Optional[str] = None,
 ):
-    """更新学生维度的历史记录"""
-    selected_names = [s.get("name", "") for s in selected_students]
+    """更新学生维度的历史记录
+
+    只修改被选中学生的数据；未选中轮数由 total_rounds 与 last_drawn_round 计算，
+    无需更新其他学生。
+    """
+    if all_group is None or all_gender is None:
+        all_group, all_gender = get_all_filter_options()
+    # 本轮的轮次（total_rounds 在 _update_global_stats 中递增）
+    current_round = int(history_data.get("total_rounds", 0) or 0) + 1
 
     # 更新被选中学生的历史记录
     for student in selected_students:
@@ -83,8 +116,10 @@ def _update_student_history(
             history_data["students"][student_name] = {
                 "total_count": 0,
                 "group_gender_count": 0,
+                "group_count": 0,
+                "gender_count": 0,
                 "last_drawn_time": "",
-                "rounds_missed": 0,
+                "last_drawn_round": 0,
                 "history": [],
                 "subject_stats": {},
             }
@@ -92,14 +127,13 @@ def _update_student_history(
         student_data = history_data["students"][student_name]
         student_data["total_count"] += 1
         student_data["last_drawn_time"] = current_time
-        student_data["rounds_missed"] = 0
+        student_data["last_drawn_round"] = current_round
+        apply_record_to_aggregates(
+            student_data, group_filter, gender_filter, all_group, all_gender
+        )
 
         # 获取权重
-        current_student_weight = None
-        for sw in students_with_weight:
-            if sw.get("name") == student_name:
-                current_student_weight = sw.get("next_weight", 0)
-                break
+        current_student_weight = student_weights.get(student_name)
 
         history_entry = {
             "draw_method": 1,
@@ -121,26 +155,29 @@ def _update_student_history(
                 student_data["subject_stats"][subject_name] = {
                     "total_count": 0,
                     "group_gender_count": 0,
+                    "group_count": 0,
+                    "gender_count": 0,
                 }
 
-            student_data["subject_stats"][subject_name]["total_count"] += 1
+            subject_data = student_data["subject_stats"][subject_name]
+            subject_data["total_count"] += 1
+            apply_record_to_aggregates(
+                subject_data, group_filter, gender_filter, all_group, all_gender
+            )
 
             # 更新 group_gender_count
-            all_group = get_content_combo_name_async("roll_call", "range_combobox")[0]
-            all_gender = get_content_combo_name_async("roll_call", "gender_combobox")[0]
-
             if group_filter and group_filter != all_group:
                 if gender_filter and gender_filter != all_gender:
-                    student_data["subject_stats"][subject_name][
-                        "group_gender_count"
-                    ] += 1
+                    subject_data["group_gender_count"] += 1
 
+        # history 与 offsets 列表在新旧数据之间共享，只追加；先追加记录再追加下标，
+        # 读取方看到的下标总在 history 范围内
         student_data["history"].append(history_entry)
-
-    # 更新未被选中学生的未选中次数
-    for student_name, student_data in history_data["students"].items():
-        if student_name not in selected_names:
-            student_data["rounds_missed"] += 1
+        if current_class_info:
+            # 科目索引：记录本条记录在学生 history 中的下标
+            subject_data.setdefault("offsets", []).append(
+                len(student_data["history"]) - 1
+            )
 
 
 def _update_global_stats(
@@ -205,6 +242,7 @@ def save_roll_call_history(
     selected_students: List[Dict[str, Any]],
     group_filter: Optional[str] = None,
     gender_filter: Optional[str] = None,
+    draw_result: Optional[RollCallDrawResult] = None,
 ) -> bool:
     """保存点名历史记录
 
@@ -213,41 +251,134 @@ def save_roll_call_history(
         selected_students: 被选中的学生列表
         group_filter: 小组过滤器，指定本次抽取的小组范围，None表示不限制
         gender_filter: 性别过滤器，指定本次抽取的性别范围，None表示不限制
+        draw_result: 抽取时的课程信息与权重，提供时不再重新获取课程信息；
+            其中带有权重时不再重新计算全班权重
 
     Returns:
         bool: 保存是否成功
     """
     try:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        history_data = load_history_data("roll_call", class_name)
-
-        _initialize_history_data(history_data)
-
         # 获取课程信息
-        current_class_info, subject_filter = _get_subject_filter()
+        if draw_result is not None:
+            current_class_info = draw_result.current_class_info
+            subject_filter = draw_result.subject_filter
+        else:
+            current_class_info, subject_filter = _get_subject_filter()
 
-        # 计算权重
-        students_dict_list = get_student_list(class_name)
-        students_with_weight = calculate_weight(
-            students_dict_list, class_name, subject_filter
-        )
+        # 获取权重
+        if draw_result is not None and draw_result.weights is not None:
+            student_weights = draw_result.weights
+        else:
+            students_with_weight = calculate_weight(
+                get_student_list(class_name), class_name, subject_filter
+            )
+            student_weights = {}
+            for sw in students_with_weight:
+                student_weights.setdefault(sw.get("name"), sw.get("next_weight", 0))
 
-        # 更新学生历史
-        _update_student_history(
-            history_data,
-            selected_students,
-            students_with_weight,
-            current_time,
-            current_class_info,
-            group_filter,
-            gender_filter,
+        all_group, all_gender = get_all_filter_options()
+        subject_name = (
+            current_class_info.get("name", "") if current_class_info else None
         )
-
-        # 更新全局统计
-        _update_global_stats(history_data, selected_students, current_class_info)
-
-        return save_history_data("roll_call", class_name, history_data)
+        event = {
+            "time": current_time,
+            "students": [
+                {
+                    "name": student.get("name", ""),
+                    "group": student.get("group", ""),
+                    "gender": student.get("gender", ""),
+                }
+                for student in selected_students
+            ],
+            "weights": {
+                name: student_weights.get(name)
+                for name in (s.get("name", "") for s in selected_students)
+            },
+            "subject": subject_name,
+            "group_filter": group_filter,
+            "gender_filter": gender_filter,
+            "all_group": all_group,
+            "all_gender": all_gender,
+        }
+        # 只向日志追加一行，由读取与后台压缩时重放到快照中
+        return append_history_event("roll_call", class_name, "draw", event)
 
     except Exception as e:
         logger.exception(f"保存点名历史记录失败: {e}")
         return False
+
+
+def _replay_roll_call_event(
+    history_data: Dict[str, Any], event: str, data: Dict[str, Any]
+) -> None:
+    """把一条点名日志记录重放到历史记录数据上"""
+    if event != "draw":
+        logger.warning(f"未知的点名历史日志事件: {event}")
+        return
+    subject_name = data.get("subject")
+    current_class_info = {"name": subject_name} if subject_name is not None else None
+    selected_students = data.get("students") or []
+
+    _initialize_history_data(history_data)
+    _update_student_history(
+        history_data,
+        selected_students,
+        data.get("weights") or {},
+        data.get("time", ""),
+        current_class_info,
+        data.get("group_filter"),
+        data.get("gender_filter"),
+        data.get("all_group"),
+        data.get("all_gender"),
+    )
+    _update_global_stats(history_data, selected_students, current_class_info)
+
+
+def _copy_for_roll_call_event(
+    history_data: Dict[str, Any], event: str, data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """复制重放一条点名日志记录时会修改的容器，其余数据与原数据共享
+
+    只复制被选中学生的数据与本科目计数，以及本轮涉及的全局统计；学生映射本身
+    只复制引用。history 与 offsets 列表只追加，不复制，新旧数据共享同一列表。
+    """
+    updated = dict(history_data)
+    subject_name = data.get("subject")
+
+    students = updated.get("students")
+    if isinstance(students, dict):
+        students = updated["students"] = dict(students)
+        for student in data.get("students") or []:
+            name = student.get("name", "")
+            info = students.get(name)
+            if not isinstance(info, dict):
+                continue
+            info = students[name] = dict(info)
+            subject_stats = info.get("subject_stats")
+            if subject_name is None or not isinstance(subject_stats, dict):
+                continue
+            subject_stats = info["subject_stats"] = dict(subject_stats)
+            counters = subject_stats.get(subject_name)
+            if isinstance(counters, dict):
+                subject_stats[subject_name] = dict(counters)
+
+    for key in ("group_stats", "gender_stats"):
+        if isinstance(updated.get(key), dict):
+            updated[key] = dict(updated[key])
+
+    subject_stats = updated.get("subject_stats")
+    if subject_name is not None and isinstance(subject_stats, dict):
+        subject_stats = updated["subject_stats"] = dict(subject_stats)
+        subject_stat = subject_stats.get(subject_name)
+        if isinstance(subject_stat, dict):
+            subject_stat = subject_stats[subject_name] = dict(subject_stat)
+            for key in ("group_stats", "gender_stats"):
+                if isinstance(subject_stat.get(key), dict):
+                    subject_stat[key] = dict(subject_stat[key])
+    return updated
+
+
+register_journal_replayer(
+    "roll_call", _replay_roll_call_event, _copy_for_roll_call_event
+)
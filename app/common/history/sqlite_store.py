@@ -0,0 +1,506 @@
+# ==================================================
+# 导入库
+# ==================================================
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.tools.path_utils import get_path
+from app.common.history.journal import JOURNAL_SEQ_KEY
+
+# 历史记录类型 → 存放每个名称抽取记录的键
+HISTORY_ENTRY_KEYS = {"roll_call": "students", "lottery": "lotterys"}
+
+# 快照中记录各名称已写入 draws 表的记录数的键（只存在于数据库中，load 时移除）
+STORED_DRAW_COUNTS_KEY = "stored_draw_counts"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    history_type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    revision INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (history_type, name)
+);
+CREATE TABLE IF NOT EXISTS draws (
+    id INTEGER PRIMARY KEY,
+    history_type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    student TEXT NOT NULL,
+    draw_time TEXT NOT NULL DEFAULT '',
+    subject TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_draws_student
+    ON draws (history_type, name, student, draw_time);
+CREATE INDEX IF NOT EXISTS idx_draws_subject
+    ON draws (history_type, name, subject, draw_time);
+CREATE TABLE IF NOT EXISTS json_sync (
+    history_type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    revision INTEGER NOT NULL,
+    json_mtime_ns INTEGER,
+    json_size INTEGER,
+    PRIMARY KEY (history_type, name)
+);
+"""
+
+
+# ==================================================
+# SQLite 历史记录存储
+# ==================================================
+class SQLiteHistoryStore:
+    """以 SQLite 数据库保存历史记录
+
+    每条抽取记录（原 JSON 中各学生/奖品 history 列表里的一项）保存为 draws 表中的一行，
+    按 (班级, 学生, 时间) 与 (班级, 课程, 时间) 建立索引；其余统计数据作为快照保存在
+    snapshots 表中。load / save 与 JSON 文件的内容完全一致，可以互相导入。
+    点名历史的科目索引 offsets 可由记录推出，不写入快照，load 时重新构建，
+    快照大小与记录数无关。
+    """
+
+    def __init__(self, db_path: Path):
+        """
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    # -------------------- 快照读写 --------------------
+
+    def load(self, history_type: str, name: str) -> Optional[Dict[str, Any]]:
+        """读取历史记录数据
+
+        Returns:
+            Optional[Dict[str, Any]]: 与 JSON 文件内容相同的历史记录数据，不存在时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM snapshots WHERE history_type = ? AND name = ?",
+                (history_type, name),
+            ).fetchone()
+            if row is None:
+                return None
+            draws = self._conn.execute(
+                "SELECT student, record FROM draws "
+                "WHERE history_type = ? AND name = ? ORDER BY id",
+                (history_type, name),
+            ).fetchall()
+
+        history_data = json.loads(row[0])
+        history_data.pop(STORED_DRAW_COUNTS_KEY, None)
+        entries = history_data.get(HISTORY_ENTRY_KEYS.get(history_type, ""))
+        if isinstance(entries, dict):
+            for student, record in draws:
+                entry = entries.get(student)
+                if isinstance(entry, dict):
+                    entry.setdefault("history", []).append(json.loads(record))
+            if history_type == "roll_call":
+                self._rebuild_subject_offsets(entries)
+        return history_data
+
+    @staticmethod
+    def _rebuild_subject_offsets(entries: Dict[str, Any]) -> None:
+        # 按记录的课程重新构建各学生科目统计中的 offsets（记录在 history 中的下标）
+        for entry in entries.values():
+            if not isinstance(entry, dict):
+                continue
+            subject_stats = entry.get("subject_stats")
+            if not isinstance(subject_stats, dict):
+                continue
+            for counters in subject_stats.values():
+                if isinstance(counters, dict):
+                    counters["offsets"] = []
+            for offset, record in enumerate(entry.get("history") or []):
+                subject = record.get("class_name") if isinstance(record, dict) else None
+                counters = subject_stats.get(subject) if subject is not None else None
+                if isinstance(counters, dict):
+                    counters["offsets"].append(offset)
+
+    def journal_seq(self, history_type: str, name: str) -> Optional[int]:
+        """获取快照已包含的最大日志序号，历史记录不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM snapshots WHERE history_type = ? AND name = ?",
+                (history_type, name),
+            ).fetchone()
+        if row is None:
+            return None
+        return int(json.loads(row[0]).get(JOURNAL_SEQ_KEY, 0) or 0)
+
+    def stored_draw_counts(
+        self, history_type: str, name: str
+    ) -> Optional[Dict[str, int]]:
+        """获取各名称已写入 draws 表的记录数
+
+        Returns:
+            Optional[Dict[str, int]]: 名称 → 记录数，历史记录不存在或由旧版本写入时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM snapshots WHERE history_type = ? AND name = ?",
+                (history_type, name),
+            ).fetchone()
+        if row is None:
+            return None
+        counts = json.loads(row[0]).get(STORED_DRAW_COUNTS_KEY)
+        return counts if isinstance(counts, dict) else None
+
+    def save(self, history_type: str, name: str, history_data: Dict[str, Any]) -> None:
+        """整体写入历史记录数据（替换该名称原有的全部抽取记录）"""
+        self.save_prepared(
+            history_type, name, self.prepare(history_type, name, history_data)
+        )
+
+    @staticmethod
+    def prepare(
+        history_type: str,
+        name: str,
+        history_data: Dict[str, Any],
+        stored_counts: Optional[Dict[str, int]] = None,
+        history_limits: Optional[Dict[str, int]] = None,
+    ) -> Tuple[str, List[Tuple], bool]:
+        """把历史记录数据序列化为快照与抽取记录行（不访问数据库）
+
+        Args:
+            history_type: 历史记录类型
+            name: 班级名称/奖池名称
+            history_data: 历史记录数据
+            stored_counts: stored_draw_counts 的返回值，提供时只生成各名称尚未写入的
+                记录（增量写入）；与数据不一致时改为整体写入
+            history_limits: 名称 → 只写入该名称 history 中前若干条记录（压缩时
+                限定为取数据时的长度），不提供时写入全部记录
+
+        Returns:
+            Tuple[str, List[Tuple], bool]: (快照 JSON, draws 表的行, 是否替换原有的全部记录)，
+                交给 save_prepared 写入
+        """
+        history_limits = history_limits or {}
+        snapshot = dict(history_data)
+        key = HISTORY_ENTRY_KEYS.get(history_type)
+        entries = snapshot.get(key) if key else None
+        if not isinstance(entries, dict):
+            entries = {}
+
+        # 各名称要写入的记录范围 [start, end)
+        ranges = {}
+        replace_all = stored_counts is None
+        for student, entry in entries.items():
+            history = entry.get("history") if isinstance(entry, dict) else None
+            if not isinstance(history, list):
+                continue
+            end = min(len(history), history_limits.get(student, len(history)))
+            start = 0 if replace_all else int(stored_counts.get(student, 0))
+            if start > end:
+                # 数据库中的记录多于数据中的记录，数据不是在其之上追加得到的
+                replace_all = True
+            ranges[student] = (start, end)
+        if not replace_all and any(
+            count and student not in ranges for student, count in stored_counts.items()
+        ):
+            # 数据中已没有某个名称的记录
+            replace_all = True
+        if replace_all:
+            ranges = {student: (0, end) for student, (_, end) in ranges.items()}
+
+        rows = []
+        stripped = {}
+        for student, entry in entries.items():
+            if not isinstance(entry, dict):
+                stripped[student] = entry
+                continue
+            if student in ranges:
+                start, end = ranges[student]
+                for record in entry["history"][start:end]:
+                    if not isinstance(record, dict):
+                        continue
+                    subject = record.get("class_name")
+                    rows.append(
+                        (
+                            history_type,
+                            name,
+                            student,
+                            str(record.get("draw_time", "") or ""),
+                            subject if subject else None,
+                            json.dumps(record, ensure_ascii=False),
+                        )
+                    )
+            stripped[student] = {**entry, "history": []}
+            subject_stats = entry.get("subject_stats")
+            if history_type == "roll_call" and isinstance(subject_stats, dict):
+                # offsets 在 load 时由记录重新构建
+                stripped[student]["subject_stats"] = {
+                    subject: (
+                        {k: v for k, v in counters.items() if k != "offsets"}
+                        if isinstance(counters, dict)
+                        else counters
+                    )
+                    for subject, counters in subject_stats.items()
+                }
+        if key and isinstance(snapshot.get(key), dict):
+            snapshot[key] = stripped
+        snapshot[STORED_DRAW_COUNTS_KEY] = {
+            student: end for student, (_, end) in ranges.items()
+        }
+        return json.dumps(snapshot, ensure_ascii=False), rows, replace_all
+
+    def save_prepared(
+        self, history_type: str, name: str, prepared: Tuple[str, List[Tuple], bool]
+    ) -> None:
+        """写入 prepare 的结果（增量写入时只插入新的抽取记录）"""
+        data, rows, replace_all = prepared
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT INTO snapshots (history_type, name, data, revision) "
+                "VALUES (?, ?, ?, 1) ON CONFLICT (history_type, name) "
+                "DO UPDATE SET data = excluded.data, revision = revision + 1",
+                (history_type, name, data),
+            )
+            if replace_all:
+                self._conn.execute(
+                    "DELETE FROM draws WHERE history_type = ? AND name = ?",
+                    (history_type, name),
+                )
+            self._conn.executemany(
+                "INSERT INTO draws "
+                "(history_type, name, student, draw_time, subject, record) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete(self, history_type: str, name: str) -> bool:
+        """删除历史记录
+
+        Returns:
+            bool: 是否存在并已删除
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            cursor = self._conn.execute(
+                "DELETE FROM snapshots WHERE history_type = ? AND name = ?",
+                (history_type, name),
+            )
+            self._conn.execute(
+                "DELETE FROM draws WHERE history_type = ? AND name = ?",
+                (history_type, name),
+            )
+            self._conn.execute(
+                "DELETE FROM json_sync WHERE history_type = ? AND name = ?",
+                (history_type, name),
+            )
+            return cursor.rowcount > 0
+
+    def names(self, history_type: str) -> List[str]:
+        """获取指定类型的所有历史记录名称"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM snapshots WHERE history_type = ? ORDER BY name",
+                (history_type,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def revision(self, history_type: str, name: str) -> Optional[int]:
+        """获取历史记录的修订号，每次写入后递增，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revision FROM snapshots WHERE history_type = ? AND name = ?",
+                (history_type, name),
+            ).fetchone()
+        return row[0] if row else None
+
+    # -------------------- 抽取记录查询 --------------------
+
+    @staticmethod
+    def _where(
+        history_type: str,
+        name: str,
+        student: Optional[str],
+        subject: Optional[str],
+    ) -> Tuple[str, List[Any]]:
+        clauses = ["history_type = ?", "name = ?"]
+        params: List[Any] = [history_type, name]
+        if student is not None:
+            clauses.append("student = ?")
+            params.append(student)
+        if subject:
+            clauses.append("subject = ?")
+            params.append(subject)
+        return " AND ".join(clauses), params
+
+    def query_records(
+        self,
+        history_type: str,
+        name: str,
+        student: Optional[str] = None,
+        subject: Optional[str] = None,
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """查询抽取记录
+
+        Args:
+            history_type: 历史记录类型
+            name: 班级名称/奖池名称
+            student: 只查询该学生/奖品的记录
+            subject: 只查询该课程的记录
+
+        Returns:
+            List[Tuple[str, Dict[str, Any]]]: 按写入顺序排列的 (学生/奖品名称, 记录)
+        """
+        where, params = self._where(history_type, name, student, subject)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT student, record FROM draws WHERE {where} ORDER BY id", params
+            ).fetchall()
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def count_records(
+        self,
+        history_type: str,
+        name: str,
+        student: Optional[str] = None,
+        subject: Optional[str] = None,
+    ) -> int:
+        """统计抽取记录条数"""
+        where, params = self._where(history_type, name, student, subject)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(*) FROM draws WHERE {where}", params
+            ).fetchone()
+        return int(row[0])
+
+    def count_records_by_student(
+        self, history_type: str, name: str, subject: Optional[str] = None
+    ) -> Dict[str, int]:
+        """按学生/奖品分组统计抽取记录条数"""
+        where, params = self._where(history_type, name, None, subject)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT student, COUNT(*) FROM draws WHERE {where} GROUP BY student",
+                params,
+            ).fetchall()
+        return {row[0]: int(row[1]) for row in rows}
+
+    def subjects(self, history_type: str, name: str) -> List[str]:
+        """获取抽取记录中出现过的所有课程名称"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT subject FROM draws "
+                "WHERE history_type = ? AND name = ? AND subject IS NOT NULL "
+                "ORDER BY subject",
+                (history_type, name),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # -------------------- JSON 同步 --------------------
+
+    def get_json_sync(
+        self, history_type: str, name: str
+    ) -> Optional[Tuple[int, Optional[Tuple[int, int]]]]:
+        """获取上次与 JSON 文件同步时的状态
+
+        Returns:
+            Optional[Tuple]: (同步时数据库中的修订号, 同步时 JSON 文件的 (mtime_ns, 文件大小))，
+                从未同步时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revision, json_mtime_ns, json_size FROM json_sync "
+                "WHERE history_type = ? AND name = ?",
+                (history_type, name),
+            ).fetchone()
+        if row is None:
+            return None
+        json_stamp = (row[1], row[2]) if row[1] is not None else None
+        return row[0], json_stamp
+
+    def record_json_sync(
+        self,
+        history_type: str,
+        name: str,
+        json_stamp: Optional[Tuple[int, int]],
+    ) -> None:
+        """记录数据库与 JSON 文件内容一致时的数据库修订号与 JSON 文件戳
+
+        Args:
+            history_type: 历史记录类型
+            name: 班级名称/奖池名称
+            json_stamp: JSON 文件的 (mtime_ns, 文件大小)，文件不存在时为 None
+        """
+        mtime_ns, size = json_stamp if json_stamp is not None else (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO json_sync "
+                "(history_type, name, revision, json_mtime_ns, json_size) "
+                "SELECT history_type, name, revision, ?, ? FROM snapshots "
+                "WHERE history_type = ? AND name = ? "
+                "ON CONFLICT (history_type, name) DO UPDATE SET "
+                "revision = excluded.revision, json_mtime_ns = excluded.json_mtime_ns, "
+                "json_size = excluded.json_size",
+                (mtime_ns, size, history_type, name),
+            )
+
+    # -------------------- JSON 导入 --------------------
+
+    def import_json_file(
+        self, history_type: str, name: str, json_path: Path, overwrite: bool = False
+    ) -> bool:
+        """把 JSON 历史记录文件导入数据库
+
+        Args:
+            history_type: 历史记录类型
+            name: 班级名称/奖池名称
+            json_path: JSON 文件路径
+            overwrite: 数据库中已存在时是否覆盖
+
+        Returns:
+            bool: 是否进行了导入
+        """
+        if not overwrite and self.revision(history_type, name) is not None:
+            return False
+        try:
+            st = Path(json_path).stat()
+            with open(json_path, "r", encoding="utf-8") as f:
+                history_data = json.load(f)
+        except Exception as e:
+            logger.error(f"导入历史记录文件失败 {json_path}: {e}")
+            return False
+        if not isinstance(history_data, dict):
+            return False
+        self.save(history_type, name, history_data)
+        self.record_json_sync(history_type, name, (st.st_mtime_ns, st.st_size))
+        return True
+
+
+_store: Optional[SQLiteHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store_path() -> Path:
+    """获取历史记录数据库文件路径"""
+    return get_path("data/history/history.db")
+
+
+def get_history_store() -> SQLiteHistoryStore:
+    """获取历史记录数据库（首次使用时创建）"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteHistoryStore(get_history_store_path())
+        return _store
@@ -2,7 +2,8 @@
 # 导入库
 # ==================================================
 from app.common.data.list import get_student_list, get_pool_list
-from app.common.history.file_utils import load_history_data
+from app.common.history.file_utils import count_history_records
+from app.common.history.sqlite_store import HISTORY_ENTRY_KEYS
 
 
 # ==================================================
@@ -38,21 +39,9 @@ def get_draw_sessions_history(history_type: str, class_name: str) -> int:
     Returns:
         int: 抽取会话历史记录数量
     """
-    history_data = load_history_data(history_type, class_name)
-    session_count = 0
-    if history_type == "roll_call":
-        key = "students"
-    elif history_type == "lottery":
-        key = "lotterys"
-    else:
+    if history_type not in HISTORY_ENTRY_KEYS:
         return 0
-    students_dict = history_data.get(key, {})
-    if isinstance(students_dict, dict):
-        for student_name, student_info in students_dict.items():
-            session_list = student_info.get("history", [])
-            if isinstance(session_list, list):
-                session_count += len(session_list)
-    return session_count
+    return count_history_records(history_type, class_name)
 
 
 def get_individual_statistics(
@@ -68,20 +57,6 @@ def get_individual_statistics(
     Returns:
         int: 个人统计记录数量
     """
-    history_data = load_history_data(history_type, class_name)
-    if history_type == "roll_call":
-        key = "students"
-    elif history_type == "lottery":
-        key = "lotterys"
-    else:
-        return 0
-    students_dict = history_data.get(key, {})
-    if not isinstance(students_dict, dict):
-        return 0
-    student_info = students_dict.get(students_name)
-    if not student_info:
-        return 0
-    student_history = student_info.get("history", [])
-    if not isinstance(student_history, list):
+    if history_type not in HISTORY_ENTRY_KEYS:
         return 0
-    return len(student_history)
+    return count_history_records(history_type, class_name, students_name)
@@ -0,0 +1,354 @@
+# ==================================================
+# 导入库
+# ==================================================
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_MICROSECONDS_PER_DAY = 86400 * 1_000_000
+
+
+# ==================================================
+# 向量化权重计算引擎
+# ==================================================
+class WeightEngine:
+    """向量化的公平抽取权重计算
+
+    一次性把学生的抽取次数、小组/性别计数、上次抽取时间整理为 NumPy 数组，
+    再用数组运算计算各项因子。所有运算顺序与逐个学生计算时一致，
+    得到的 next_weight 与 weight_details 完全相同。
+    """
+
+    def __init__(
+        self,
+        settings: Dict[str, Any],
+        group_stats: Dict[str, Any],
+        gender_stats: Dict[str, Any],
+        is_cold_start: bool,
+        now: Optional[datetime] = None,
+    ):
+        """
+        Args:
+            settings: 权重设置（_load_weight_settings 的返回值）
+            group_stats: 小组抽取统计
+            gender_stats: 性别抽取统计
+            is_cold_start: 是否处于冷启动阶段
+            now: 当前时间，默认为 datetime.now()
+        """
+        self.settings = settings
+        self.group_stats = group_stats
+        self.gender_stats = gender_stats
+        self.is_cold_start = is_cold_start
+        self.now = now if now is not None else datetime.now()
+
+    # ---------- 因子计算 ----------
+
+    def _frequency_factors(
+        self, total_counts: np.ndarray, max_total_count
+    ) -> np.ndarray:
+        settings = self.settings
+        if not settings["fair_draw_enabled"]:
+            return np.zeros(len(total_counts))
+
+        max_count = float(max_total_count)
+        func_type = settings["frequency_function"]
+
+        if func_type == 0:  # 线性
+            factors = (max_count - total_counts + 1) / (max_count + 1)
+        elif func_type == 2:  # 指数
+            if max_total_count == 0:
+                factors = np.ones(len(total_counts))
+            else:
+                # math.exp 与 np.exp 的末位可能不同，按不同的次数逐个计算以保证结果一致
+                unique_counts, inverse = np.unique(total_counts, return_inverse=True)
+                unique_factors = np.array(
+                    [
+                        math.exp((max_total_count - count) / max_total_count)
+                        for count in unique_counts.tolist()
+                    ]
+                )
+                factors = unique_factors[inverse]
+        else:  # 平方根（默认）
+            factors = np.sqrt(max_count + 1) / np.sqrt(total_counts + 1)
+
+        if self.is_cold_start:
+            factors = np.minimum(0.8 + (factors * 0.2), factors)
+
+        return factors * settings["frequency_weight"]
+
+    @staticmethod
+    def _encode(values: List[Any]) -> Tuple[List[Any], np.ndarray]:
+        """将取值列表编码为 (不重复取值, 各项编码)"""
+        index: Dict[Any, int] = {}
+        codes = np.empty(len(values), dtype=np.intp)
+        for i, value in enumerate(values):
+            codes[i] = index.setdefault(value, len(index))
+        return list(index), codes
+
+    @staticmethod
+    def _balance_factors(
+        enabled: bool,
+        item_values: List[Any],
+        item_codes: np.ndarray,
+        item_stats: Dict[str, Any],
+        counts: np.ndarray,
+        all_counts: np.ndarray,
+        weight,
+    ) -> np.ndarray:
+        """小组/性别平衡因子"""
+        if not enabled:
+            return np.zeros(len(counts))
+
+        valid_items = [v for v in item_stats.values() if v > 0]
+        if len(valid_items) > 3:
+            history_values = np.array(
+                [max(item_stats.get(value, 0), 0) for value in item_values],
+                dtype=float,
+            )
+            per_item = (1.0 / (history_values * 0.2 + 1)) * weight
+            return per_item[item_codes]
+
+        max_count = all_counts.max() if len(all_counts) else 0
+        if max_count == 0:
+            return np.full(len(counts), 0.2 * weight)
+
+        scaled = weight * (1.0 - (counts / max_count))
+        return np.where(counts == 0, 0.5 * weight, scaled)
+
+    def _drawn_offsets(self, last_drawn_times: List[Any]) -> Tuple[np.ndarray, ...]:
+        """计算每个学生距上次抽取的时间差（微秒）
+
+        Returns:
+            (是否有有效时间, 时间差微秒数)
+        """
+        now_us = (self.now - _EPOCH) // _MICROSECOND
+        parsed: Dict[Any, Optional[int]] = {}
+        valid = np.zeros(len(last_drawn_times), dtype=bool)
+        offsets = np.zeros(len(last_drawn_times), dtype=np.int64)
+
+        for i, value in enumerate(last_drawn_times):
+            if not value:
+                continue
+            if value not in parsed:
+                try:
+                    last_time = datetime.fromisoformat(value)
+                    parsed[value] = now_us - (last_time - _EPOCH) // _MICROSECOND
+                except Exception as e:
+                    logger.exception(f"Error parsing last drawn time: {e}")
+                    parsed[value] = None
+            offset = parsed[value]
+            if offset is not None:
+                valid[i] = True
+                offsets[i] = offset
+
+        return valid, offsets
+
+    def _time_factors(self, valid: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        settings = self.settings
+        if not settings["fair_draw_time_enabled"]:
+            return np.zeros(len(offsets))
+
+        days_diff = offsets // _MICROSECONDS_PER_DAY
+        factors = np.minimum(1.0, days_diff / 30.0) * settings["time_weight"]
+        return np.where(valid, factors, 0.0)
+
+    def _shield_status(
+        self, valid: np.ndarray, offsets: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        settings = self.settings
+        if not settings["shield_enabled"]:
+            return np.zeros(len(offsets), dtype=bool), np.zeros(len(offsets))
+
+        unit = settings["shield_time_unit"]
+        value = settings["shield_time"]
+        if unit == 0:
+            duration = timedelta(seconds=value)
+        elif unit == 1:
+            duration = timedelta(minutes=value)
+        else:
+            duration = timedelta(hours=value)
+
+        duration_us = duration // _MICROSECOND
+        shielded = valid & (offsets < duration_us)
+        remaining = (duration_us - offsets) / 1_000_000
+        return shielded, remaining
+
+    # ---------- 对外接口 ----------
+
+    def compute_weights(
+        self,
+        total_counts: np.ndarray,
+        group_values: List[Any],
+        group_codes: np.ndarray,
+        group_counts: np.ndarray,
+        gender_values: List[Any],
+        gender_codes: np.ndarray,
+        gender_counts: np.ndarray,
+        valid: np.ndarray,
+        offsets: np.ndarray,
+    ) -> np.ndarray:
+        """直接由数组计算全部学生的最终权重（用于模拟等批量场景）
+
+        与 compute 使用相同的因子计算，但不生成 weight_details，
+        截断与舍入也使用数组运算，末位可能与 compute 的结果略有不同。
+
+        Args:
+            total_counts: 各学生的总抽取次数
+            group_values: 不重复的小组取值
+            group_codes: 各学生的小组编码（group_values 中的下标）
+            group_counts: 各学生的小组抽取次数
+            gender_values: 不重复的性别取值
+            gender_codes: 各学生的性别编码（gender_values 中的下标）
+            gender_counts: 各学生的性别抽取次数
+            valid: 各学生是否有上次抽取时间
+            offsets: 各学生距上次抽取的时间差（微秒）
+
+        Returns:
+            np.ndarray: 各学生的权重
+        """
+        settings = self.settings
+        max_total_count = total_counts.max() if len(total_counts) else 0
+
+        totals = (
+            0
+            + settings["base_weight"]
+            + self._frequency_factors(total_counts, max_total_count)
+            + self._balance_factors(
+                settings["fair_draw_group_enabled"],
+                group_values,
+                group_codes,
+                self.group_stats,
+                group_counts,
+                group_counts,
+                settings["group_weight"],
+            )
+            + self._balance_factors(
+                settings["fair_draw_gender_enabled"],
+                gender_values,
+                gender_codes,
+                self.gender_stats,
+                gender_counts,
+                gender_counts,
+                settings["gender_weight"],
+            )
+            + self._time_factors(valid, offsets)
+        )
+
+        min_weight = settings["min_weight"] / 10
+        shielded, _ = self._shield_status(valid, offsets)
+        totals = np.where(shielded, min_weight, totals)
+        return np.round(np.clip(totals, min_weight, settings["max_weight"]), 2)
+
+    def compute(
+        self, students_data: List[Dict[str, Any]], weight_data: Dict[Any, dict]
+    ) -> List[Dict[str, Any]]:
+        """计算并写入每个学生的 next_weight 与 weight_details
+
+        Args:
+            students_data: 学生数据列表（原地修改）
+            weight_data: 以学生ID为键的历史统计（_process_history_for_weights 的返回值）
+
+        Returns:
+            List[Dict[str, Any]]: 更新后的学生数据列表
+        """
+        settings = self.settings
+
+        all_total_counts = [data["total_count"] for data in weight_data.values()]
+        max_total_count = max(all_total_counts) if all_total_counts else 0
+
+        students = []
+        records = []
+        for student in students_data:
+            student_id = student.get("id", student.get("name", ""))
+            if student_id not in weight_data:
+                continue
+            students.append(student)
+            records.append(weight_data[student_id])
+
+        if not students:
+            return students_data
+
+        # 小组/性别计数的最大值取自全部统计数据
+        all_group_counts = np.array(
+            [d["group_count"] for d in weight_data.values()], dtype=float
+        )
+        all_gender_counts = np.array(
+            [d["gender_count"] for d in weight_data.values()], dtype=float
+        )
+
+        total_counts = np.array([r["total_count"] for r in records], dtype=float)
+        group_counts = np.array([r["group_count"] for r in records], dtype=float)
+        gender_counts = np.array([r["gender_count"] for r in records], dtype=float)
+
+        group_values, group_codes = self._encode([s.get("group", "") for s in students])
+        gender_values, gender_codes = self._encode(
+            [s.get("gender", "") for s in students]
+        )
+
+        frequency = self._frequency_factors(total_counts, max_total_count)
+        group_balance = self._balance_factors(
+            settings["fair_draw_group_enabled"],
+            group_values,
+            group_codes,
+            self.group_stats,
+            group_counts,
+            all_group_counts,
+            settings["group_weight"],
+        )
+        gender_balance = self._balance_factors(
+            settings["fair_draw_gender_enabled"],
+            gender_values,
+            gender_codes,
+            self.gender_stats,
+            gender_counts,
+            all_gender_counts,
+            settings["gender_weight"],
+        )
+
+        valid, offsets = self._drawn_offsets([r["last_drawn_time"] for r in records])
+        time_factor = self._time_factors(valid, offsets)
+        shielded, shield_remaining = self._shield_status(valid, offsets)
+
+        totals = (
+            0
+            + settings["base_weight"]
+            + frequency
+            + group_balance
+            + gender_balance
+            + time_factor
+        )
+
+        min_weight = settings["min_weight"]
+        max_weight = settings["max_weight"]
+        for i, student in enumerate(students):
+            is_shielded = bool(shielded[i])
+            total_weight = min_weight / 10 if is_shielded else float(totals[i])
+            # 使用内置 min/max/round，保持与逐个计算时相同的返回类型与舍入方式
+            total_weight = max(min_weight / 10, min(max_weight, total_weight))
+            total_weight = round(total_weight, 2)
+
+            remaining = float(shield_remaining[i]) if is_shielded else 0
+
+            student["next_weight"] = total_weight
+            student["weight_details"] = {
+                "base_weight": settings["base_weight"],
+                "frequency_penalty": float(frequency[i]),
+                "group_balance": float(group_balance[i]),
+                "gender_balance": float(gender_balance[i]),
+                "time_factor": float(time_factor[i]),
+                "total_weight": total_weight,
+                "is_cold_start": self.is_cold_start,
+                "total_count": records[i]["total_count"],
+                "max_total_count": max_total_count,
+                "frequency_function": settings["frequency_function"],
+                "is_shielded": is_shielded,
+                "shield_remaining": round(remaining, 2),
+                "shield_enabled": settings["shield_enabled"],
+            }
+
+        return students_data
@@ -10,19 +10,26 @@ from app.common.data.list import (
     get_class_name_list,
     get_group_list,
     get_gender_list,
+    get_pool_version,
+    get_roster_version,
+    invalidate_roster_cache,
 )
-from app.common.history import save_lottery_history
+from app.common.history import get_history_version, save_lottery_history
 from app.common.display.result_display import ResultDisplayUtils
 from app.common.lottery.lottery_utils import LotteryUtils
 from app.common.roll_call.roll_call_utils import RollCallUtils
 from app.common.music.music_player import music_player
 from app.common.voice.voice import TTSHandler
 from app.common.extraction.extract import _is_non_class_time
+from app.common.extraction.frame_buffer import AnimationFrameBuffer
+from app.common.extraction.precompute import DrawPrecomputer
 from app.common.safety.verify_ops import require_and_run
 from app.page_building.another_window import create_remaining_list_window
 from app.tools.path_utils import get_data_path
 from app.tools.personalised import load_custom_font
 from app.tools.config import (
+    get_drawn_prize_record_version,
+    get_drawn_record_version,
     record_drawn_prize,
     reset_drawn_prize_record,
 )
@@ -36,7 +43,8 @@ from app.Language.obtain_language import (
     get_content_name_async,
     get_content_pushbutton_name_async,
 )
-from app.tools.variable import APP_INIT_DELAY
+from app.tools.variable import APP_INIT_DELAY, ANIMATION_FRAME_BUFFER_SIZE
+from app.tools.draw_timing import DrawTrace
 from app.tools.config import track_event
 
 system_random = SystemRandom()
@@ -82,6 +90,10 @@ class LotteryManager(QObject):
         self._render_settings_cache = None
         self._notification_settings_cache_pool = None
         self._notification_settings_cache = None
+        self._precomputer = DrawPrecomputer("lottery", LotteryManager._precompute_stamp)
+        self._frame_buffer = AnimationFrameBuffer(
+            ANIMATION_FRAME_BUFFER_SIZE, "lottery"
+        )
 
     def _format_prize_student_text(self, prize_name, group_name, student_name, mode):
         prize_name = str(prize_name or "")
@@ -137,6 +149,8 @@ class LotteryManager(QObject):
         加载抽奖池数据（用于动画缓存）
         """
         try:
+            self._precomputer.invalidate()
+            self._frame_buffer.stop()
             self.current_pool_name = pool_name
             self.current_class_name = class_name
             self.current_group_filter = group_filter
@@ -351,44 +365,48 @@ class LotteryManager(QObject):
         gender_filter: str = "",
         parent=None,
     ):
-        result = self.draw_final_items(count)
-        if isinstance(result, dict) and result.get("reset_required"):
-            reset_drawn_prize_record(parent, self.current_pool_name)
-            if (
-                result.get("reset_scope") == "students"
-                and self.enable_student_assignment
-                and self.current_class_name
-            ):
-                RollCallUtils.reset_drawn_records(
-                    parent,
-                    self.current_class_name,
-                    self.current_gender_filter,
-                    self.current_group_filter,
-                )
-            return {"reset_required": True, "pool_name": self.current_pool_name}
+        with DrawTrace("lottery_finalize") as trace:
+            result = self.draw_final_items(count)
+            trace.mark("draw")
+            if isinstance(result, dict) and result.get("reset_required"):
+                reset_drawn_prize_record(parent, self.current_pool_name)
+                if (
+                    result.get("reset_scope") == "students"
+                    and self.enable_student_assignment
+                    and self.current_class_name
+                ):
+                    RollCallUtils.reset_drawn_records(
+                        parent,
+                        self.current_class_name,
+                        self.current_gender_filter,
+                        self.current_group_filter,
+                    )
+                trace.mark("reset")
+                return {"reset_required": True, "pool_name": self.current_pool_name}
 
-        selected_items_dict = (
-            (result or {}).get("selected_prizes_dict")
-            or (result or {}).get("selected_students_dict")
-            or []
-        )
+            selected_items_dict = (
+                (result or {}).get("selected_prizes_dict")
+                or (result or {}).get("selected_students_dict")
+                or []
+            )
 
-        threshold = LotteryUtils._get_prize_draw_threshold(self.current_pool_name)
-        save_temp = (
-            threshold is not None
-            or LotteryUtils._get_prize_draw_type(self.current_pool_name) == 1
-        )
+            threshold = LotteryUtils._get_prize_draw_threshold(self.current_pool_name)
+            save_temp = (
+                threshold is not None
+                or LotteryUtils._get_prize_draw_type(self.current_pool_name) == 1
+            )
 
-        self.save_result(
-            selected_items_dict,
-            group_filter=group_filter,
-            gender_filter=gender_filter,
-            save_temp=save_temp,
-        )
+            self.save_result(
+                selected_items_dict,
+                group_filter=group_filter,
+                gender_filter=gender_filter,
+                save_temp=save_temp,
+            )
+            trace.mark("save")
 
-        result = dict(result or {})
-        result["save_temp"] = save_temp
-        return result
+            result = dict(result or {})
+            result["save_temp"] = save_temp
+            return result
 
     def reset_all_records(self, *, parent=None):
         reset_drawn_prize_record(parent, self.current_pool_name)
@@ -440,7 +458,7 @@ class LotteryManager(QObject):
             except Exception:
                 show_random = 0
 
-            from app.common.data.list import get_group_members
+            from app.common.data.list import get_group_members_view
 
             prizes_with_students = []
             for prize in selected_prizes:
@@ -460,7 +478,7 @@ class LotteryManager(QObject):
                     group_name = raw_group if include_group else ""
 
                     if include_name and raw_group:
-                        group_members = get_group_members(
+                        group_members = get_group_members_view(
                             self.current_class_name, raw_group
                         )
                         if group_members:
@@ -497,10 +515,119 @@ class LotteryManager(QObject):
         except Exception:
             return []
 
+    def _build_precompute_key(self, count):
+        try:
+            count = int(count or 0)
+        except Exception:
+            count = 0
+        return (
+            self.current_pool_name,
+            self.current_class_name if self.enable_student_assignment else None,
+            self.current_group_filter,
+            self.current_gender_filter,
+            self.current_group_index,
+            self.current_gender_index,
+            count,
+        )
+
+    @staticmethod
+    def _precompute_stamp(key):
+        """预计算结果依赖的奖池、已抽取记录以及分配学生时的名单与历史记录版本"""
+        pool_name, class_name, group_filter, gender_filter = key[:4]
+        stamp = (
+            get_pool_version(pool_name),
+            get_drawn_prize_record_version(pool_name),
+        )
+        if class_name:
+            stamp += (
+                get_roster_version(class_name),
+                get_drawn_record_version(class_name, gender_filter, group_filter),
+                get_history_version("roll_call", class_name),
+            )
+        return stamp
+
+    def start_precompute_final(self, count):
+        """在动画播放期间于后台预先计算最终抽取结果"""
+        try:
+            count = int(count or 0)
+        except Exception:
+            count = 0
+        if count <= 0 or not self.current_pool_name:
+            return
+        self._precomputer.start(
+            self._build_precompute_key(count),
+            lambda: self._compute_final_items(count),
+        )
+
+    def build_animation_frame(self, count):
+        """
+        生成一帧动画显示数据
+
+        Returns:
+            tuple: (selected_prizes, ipc_selected_students, prizes)
+        """
+        prizes = self.get_random_items(count)
+        ipc_selected_students = []
+        for p in prizes or []:
+            if not isinstance(p, dict):
+                continue
+            try:
+                sid = int(p.get("student_id", 0) or 0)
+            except Exception:
+                sid = 0
+            ipc_selected_students.append(
+                {
+                    "student_id": sid,
+                    "student_name": str(p.get("ipc_student_name", "") or ""),
+                    "display_text": str(
+                        p.get("ipc_display_text", p.get("name", "")) or ""
+                    ),
+                    "exists": bool(p.get("exist", True)),
+                    "group_name": str(p.get("ipc_group_name", "") or ""),
+                    "lottery_name": str(
+                        p.get("ipc_lottery_name", p.get("name", "")) or ""
+                    ),
+                }
+            )
+        selected_prizes = []
+        for p in prizes:
+            try:
+                display_num = int(p.get("student_id", 0) or 0)
+            except Exception:
+                display_num = 0
+            if not display_num:
+                try:
+                    display_num = int(p.get("id", 0) or 0)
+                except Exception:
+                    display_num = 0
+            selected_prizes.append((display_num, p["name"], p.get("exist", True)))
+
+        return selected_prizes, ipc_selected_students, prizes
+
+    def start_frame_producer(self, count):
+        """在工作线程中预生成动画帧"""
+        self._frame_buffer.start(count, lambda: self.build_animation_frame(count))
+
+    def stop_frame_producer(self):
+        self._frame_buffer.stop()
+
+    def next_animation_frame(self, count):
+        """取出一帧动画显示数据，缓冲区暂无可用帧时同步生成"""
+        frame = self._frame_buffer.next_frame(count)
+        if frame is None:
+            frame = self.build_animation_frame(count)
+        return frame
+
     def draw_final_items(self, count):
         """
         执行最终抽取
         """
+        precomputed = self._precomputer.take(self._build_precompute_key(count))
+        if precomputed:
+            return precomputed
+        return self._compute_final_items(count)
+
+    def _compute_final_items(self, count):
         result = LotteryUtils.draw_random_prizes(self.current_pool_name, count)
         if not isinstance(result, dict):
             return {
@@ -567,7 +694,7 @@ class LotteryManager(QObject):
             show_random = 0
 
         include_group = show_random in (0, 1, 2, 5, 6, 7, 8, 9)
-        from app.common.data.list import get_group_members
+        from app.common.data.list import get_group_members_view
 
         for idx, prize in enumerate(selected_prizes_dict):
             if not isinstance(prize, dict):
@@ -602,7 +729,7 @@ class LotteryManager(QObject):
                     group_name = raw_group if include_group else ""
 
                     if include_name and raw_group:
-                        group_members = get_group_members(
+                        group_members = get_group_members_view(
                             self.current_class_name, raw_group
                         )
                         if group_members:
@@ -751,6 +878,9 @@ def start_lottery_draw(widget):
     autoplay_count = plan.autoplay_count if plan else 0
     animation_interval = plan.animation_interval if plan else 0
     animation_music = plan.animation_music if plan else None
+    if animation in [0, 1]:
+        manager.start_precompute_final(widget.current_count)
+        manager.start_frame_producer(_get_animation_display_count(widget))
 
     if animation == 0:
         if animation_music:
@@ -936,6 +1066,7 @@ def reset_count(widget):
 def stop_animation(widget):
     if hasattr(widget, "animation_timer") and widget.animation_timer.isActive():
         widget.animation_timer.stop()
+    widget.manager.stop_frame_producer()
     widget.start_button.setText(
         get_content_pushbutton_name_async("lottery", "start_button")
     )
@@ -1124,51 +1255,23 @@ def play_voice_result(widget):
         logger.exception(f"播放语音失败: {e}", exc_info=True)
 
 
+def _get_animation_display_count(widget):
+    display_count = widget.current_count
+    try:
+        remaining_count = int(getattr(widget, "remaining_count", 0) or 0)
+    except Exception:
+        remaining_count = 0
+    if remaining_count > 0:
+        display_count = min(display_count, remaining_count)
+    return display_count
+
+
 def draw_random(widget):
     if widget.is_animating:
-        display_count = widget.current_count
-        try:
-            remaining_count = int(getattr(widget, "remaining_count", 0) or 0)
-        except Exception:
-            remaining_count = 0
-        if remaining_count > 0:
-            display_count = min(display_count, remaining_count)
-
-        prizes = widget.manager.get_random_items(display_count)
-        ipc_selected_students = []
-        for p in prizes or []:
-            if not isinstance(p, dict):
-                continue
-            try:
-                sid = int(p.get("student_id", 0) or 0)
-            except Exception:
-                sid = 0
-            ipc_selected_students.append(
-                {
-                    "student_id": sid,
-                    "student_name": str(p.get("ipc_student_name", "") or ""),
-                    "display_text": str(
-                        p.get("ipc_display_text", p.get("name", "")) or ""
-                    ),
-                    "exists": bool(p.get("exist", True)),
-                    "group_name": str(p.get("ipc_group_name", "") or ""),
-                    "lottery_name": str(
-                        p.get("ipc_lottery_name", p.get("name", "")) or ""
-                    ),
-                }
-            )
-        selected_prizes = []
-        for p in prizes:
-            try:
-                display_num = int(p.get("student_id", 0) or 0)
-            except Exception:
-                display_num = 0
-            if not display_num:
-                try:
-                    display_num = int(p.get("id", 0) or 0)
-                except Exception:
-                    display_num = 0
-            selected_prizes.append((display_num, p["name"], p.get("exist", True)))
+        display_count = _get_animation_display_count(widget)
+        selected_prizes, ipc_selected_students, prizes = (
+            widget.manager.next_animation_frame(display_count)
+        )
 
         display_result_animated(
             widget,
@@ -1450,6 +1553,7 @@ def setup_file_watcher(widget):
 
 def on_directory_changed(widget, path):
     try:
+        invalidate_roster_cache(path)
         widget._sync_watcher_files()
         QTimer.singleShot(500, widget.refresh_pool_list)
     except Exception as e:
@@ -1458,6 +1562,7 @@ def on_directory_changed(widget, path):
 
 def on_file_changed(widget, path):
     try:
+        invalidate_roster_cache(path)
         QTimer.singleShot(500, widget.refresh_pool_list)
     except Exception as e:
         logger.exception(f"处理文件变化事件失败: {e}")
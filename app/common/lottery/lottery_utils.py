@@ -1,23 +1,28 @@
 # ==================================================
 # 抽奖工具类
 # ==================================================
-from random import SystemRandom
-
 from app.common.data.list import (
     get_group_list,
     get_student_list,
-    filter_students_data,
+    filter_class_students,
     get_pool_list,
 )
 from app.common.roll_call.roll_call_utils import RollCallUtils
 from app.common.history import calculate_weight
 from app.common.behind_scenes.behind_scenes_utils import BehindScenesUtils
+from app.common.fair_draw.draw_rng import get_draw_rng
+from app.common.fair_draw.weighted_sampler import (
+    CountedWeightedSampler,
+    WeightedSampler,
+    weighted_sample_indices,
+)
 from app.tools.config import (
     calculate_remaining_count,
     read_drawn_record,
     read_drawn_record_simple,
     reset_drawn_record,
 )
+from app.tools.draw_timing import DrawTrace
 from app.tools.settings_access import readme_settings_async
 from app.tools.list_specific_settings_access import (
     read_lottery_setting,
@@ -26,8 +31,6 @@ from app.tools.list_specific_settings_access import (
 
 from app.Language.obtain_language import get_any_position_value
 
-system_random = SystemRandom()
-
 
 class LotteryUtils:
     """抽奖工具类，提供通用的抽奖相关功能"""
@@ -153,10 +156,8 @@ class LotteryUtils:
         Returns:
             dict: 包含抽取结果的字典
         """
-        data = get_student_list(class_name)
-
-        students_data = filter_students_data(
-            data, group_index, group_filter, gender_index, gender_filter
+        students_data = filter_class_students(
+            class_name, group_index, group_filter, gender_index, gender_filter
         )
 
         if group_index == 1:
@@ -200,7 +201,7 @@ class LotteryUtils:
                     for g in students_dict_list
                 ]
                 while len(selected_groups) < draw_count and all_groups:
-                    selected_groups.append(system_random.choice(all_groups))
+                    selected_groups.append(get_draw_rng().choice(all_groups))
 
             return {
                 "selected_students": selected_groups,
@@ -314,23 +315,13 @@ class LotteryUtils:
                     pick_candidates = selected_students_dict
                     pick_weights = [1.0] * len(selected_students_dict)
 
+                sampler = WeightedSampler(pick_weights, get_draw_rng())
                 for _ in range(remaining_to_draw):
                     if not pick_candidates:
                         break
-                    total_weight = sum(pick_weights)
-                    if total_weight <= 0:
-                        random_index = system_random.randint(
-                            0, len(pick_candidates) - 1
-                        )
-                    else:
-                        rand_value = system_random.uniform(0, total_weight)
-                        cumulative_weight = 0
-                        random_index = 0
-                        for i, weight in enumerate(pick_weights):
-                            cumulative_weight += weight
-                            if rand_value <= cumulative_weight:
-                                random_index = i
-                                break
+                    random_index = sampler.sample()
+                    if random_index is None:
+                        break
 
                     selected_student = pick_candidates[random_index]
                     student_id = selected_student.get("id", "")
@@ -340,23 +331,11 @@ class LotteryUtils:
                     selected_students_dict.append(selected_student)
             else:
                 remaining_to_draw = min(remaining_to_draw, len(students_with_weight))
+                sampler = WeightedSampler(weights, get_draw_rng())
                 for _ in range(remaining_to_draw):
-                    if not students_with_weight:
+                    random_index = sampler.pop()
+                    if random_index is None:
                         break
-                    total_weight = sum(weights)
-                    if total_weight <= 0:
-                        random_index = system_random.randint(
-                            0, len(students_with_weight) - 1
-                        )
-                    else:
-                        rand_value = system_random.uniform(0, total_weight)
-                        cumulative_weight = 0
-                        random_index = 0
-                        for i, weight in enumerate(weights):
-                            cumulative_weight += weight
-                            if rand_value <= cumulative_weight:
-                                random_index = i
-                                break
 
                     selected_student = students_with_weight[random_index]
                     student_id = selected_student.get("id", "")
@@ -365,9 +344,6 @@ class LotteryUtils:
                     selected_students.append((student_id, random_name, exist))
                     selected_students_dict.append(selected_student)
 
-                    students_with_weight.pop(random_index)
-                    weights.pop(random_index)
-
         return {
             "selected_students": selected_students,
             "class_name": class_name,
@@ -448,167 +424,150 @@ class LotteryUtils:
     def draw_random_prizes(pool_name: str, current_count: int):
         """按权重抽取奖品"""
         try:
-            items = get_pool_list(pool_name)
-            if not items:
-                return {
-                    "selected_prizes": [],
-                    "pool_name": pool_name,
-                    "selected_prizes_dict": [],
-                }
-            draw = int(current_count or 0)
-            if draw <= 0:
-                return {
-                    "selected_prizes": [],
-                    "pool_name": pool_name,
-                    "selected_prizes_dict": [],
-                }
-            draw_type = LotteryUtils._get_prize_draw_type(pool_name)
-            drawn_records = read_drawn_record_simple(pool_name)
-            drawn_counts = {name: cnt for name, cnt in drawn_records}
+            with DrawTrace("lottery") as trace:
+                items = get_pool_list(pool_name)
+                if not items:
+                    return {
+                        "selected_prizes": [],
+                        "pool_name": pool_name,
+                        "selected_prizes_dict": [],
+                    }
+                draw = int(current_count or 0)
+                if draw <= 0:
+                    return {
+                        "selected_prizes": [],
+                        "pool_name": pool_name,
+                        "selected_prizes_dict": [],
+                    }
+                draw_type = LotteryUtils._get_prize_draw_type(pool_name)
+                drawn_records = read_drawn_record_simple(pool_name)
+                drawn_counts = {name: cnt for name, cnt in drawn_records}
+                trace.mark("pool")
 
-            if draw_type == 1:
-                candidates = []
-                remaining_map = {}
-                for item in items:
-                    if not item.get("exist", True):
-                        continue
-                    name = str(item.get("name", "") or "")
-                    try:
-                        base_limit = int(item.get("count", 1) or 0)
-                    except Exception:
-                        base_limit = 1
-                    if base_limit <= 0:
-                        continue
-                    drawn = 0
-                    try:
-                        drawn = int(drawn_counts.get(name, 0) or 0)
-                    except Exception:
+                if draw_type == 1:
+                    candidates = []
+                    remaining_map = {}
+                    for item in items:
+                        if not item.get("exist", True):
+                            continue
+                        name = str(item.get("name", "") or "")
+                        try:
+                            base_limit = int(item.get("count", 1) or 0)
+                        except Exception:
+                            base_limit = 1
+                        if base_limit <= 0:
+                            continue
                         drawn = 0
-                    remaining = base_limit - drawn
-                    if remaining > 0:
-                        candidates.append(item)
-                        remaining_map[name] = remaining
-
-                if not candidates:
-                    return {"reset_required": True}
-                items = candidates
-            else:
-                threshold = LotteryUtils._get_prize_draw_threshold(pool_name)
-                if threshold is not None:
-                    available = []
-                    for i in items:
-                        name = i.get("name", "")
-                        cnt = int(drawn_counts.get(name, 0))
-                        if cnt < threshold and i.get("exist", True):
-                            available.append(i)
-                    items = available
-                    if not items:
+                        try:
+                            drawn = int(drawn_counts.get(name, 0) or 0)
+                        except Exception:
+                            drawn = 0
+                        remaining = base_limit - drawn
+                        if remaining > 0:
+                            candidates.append(item)
+                            remaining_map[name] = remaining
+
+                    if not candidates:
                         return {"reset_required": True}
-
-            # 应用内幕设置
-            items, behind_scenes_weights = (
-                BehindScenesUtils.apply_probability_weights_to_items(
-                    items, 1, pool_name
-                )
-            )
-
-            # 检查是否有必中奖品
-            guaranteed_items = BehindScenesUtils.ensure_guaranteed_selection(
-                items, behind_scenes_weights, pool_name
-            )
-            bs_weights = list(behind_scenes_weights or [])
-            selected = []
-            selected_dict = []
-            guaranteed_names = set()
-            if guaranteed_items is not None:
-                for item in guaranteed_items:
-                    if len(selected_dict) >= draw:
-                        break
-                    selected.append(
-                        (item.get("id"), item.get("name"), item.get("exist", True))
+                    items = candidates
+                else:
+                    threshold = LotteryUtils._get_prize_draw_threshold(pool_name)
+                    if threshold is not None:
+                        available = []
+                        for i in items:
+                            name = i.get("name", "")
+                            cnt = int(drawn_counts.get(name, 0))
+                            if cnt < threshold and i.get("exist", True):
+                                available.append(i)
+                        items = available
+                        if not items:
+                            return {"reset_required": True}
+
+                trace.mark("filter")
+
+                # 应用内幕设置
+                items, behind_scenes_weights = (
+                    BehindScenesUtils.apply_probability_weights_to_items(
+                        items, 1, pool_name
                     )
-                    selected_dict.append(item)
-                    guaranteed_names.add(str(item.get("name", "") or ""))
+                )
 
-            # 准备权重
-            weights = []
-            remaining_counts = []
-            for i, item in enumerate(items):
-                base_weight = float(item.get("weight", 1))
-                behind_scenes_weight = behind_scenes_weights[i]
-                name = str(item.get("name", "") or "")
-                remaining = 1
-                if draw_type == 1:
-                    remaining = int(remaining_map.get(name, 1) or 1)
-                remaining_counts.append(remaining)
-                weights.append(base_weight * behind_scenes_weight * max(0, remaining))
+                # 检查是否有必中奖品
+                guaranteed_items = BehindScenesUtils.ensure_guaranteed_selection(
+                    items, behind_scenes_weights, pool_name
+                )
+                trace.mark("behind_scenes")
+                selected = []
+                selected_dict = []
+                guaranteed_names = set()
+                if guaranteed_items is not None:
+                    for item in guaranteed_items:
+                        if len(selected_dict) >= draw:
+                            break
+                        selected.append(
+                            (item.get("id"), item.get("name"), item.get("exist", True))
+                        )
+                        selected_dict.append(item)
+                        guaranteed_names.add(str(item.get("name", "") or ""))
 
-            if guaranteed_names:
-                filtered_items = []
-                filtered_weights = []
-                filtered_remaining = []
-                filtered_bs_weights = []
+                # 准备权重：单件权重 = 基础权重 × 内幕权重
+                unit_weights = []
+                remaining_counts = []
                 for i, item in enumerate(items):
+                    base_weight = float(item.get("weight", 1))
+                    behind_scenes_weight = behind_scenes_weights[i]
                     name = str(item.get("name", "") or "")
-                    if name in guaranteed_names:
-                        if draw_type == 1:
-                            remaining_counts[i] = max(0, remaining_counts[i] - 1)
-                        continue
-                    filtered_items.append(item)
-                    filtered_weights.append(weights[i])
-                    filtered_remaining.append(remaining_counts[i])
-                    filtered_bs_weights.append(
-                        bs_weights[i] if i < len(bs_weights) else 1.0
+                    remaining = 1
+                    if draw_type == 1:
+                        remaining = int(remaining_map.get(name, 1) or 1)
+                    remaining_counts.append(remaining)
+                    unit_weights.append(base_weight * behind_scenes_weight)
+
+                if guaranteed_names:
+                    filtered_items = []
+                    filtered_unit_weights = []
+                    filtered_remaining = []
+                    for i, item in enumerate(items):
+                        name = str(item.get("name", "") or "")
+                        if name in guaranteed_names:
+                            continue
+                        filtered_items.append(item)
+                        filtered_unit_weights.append(unit_weights[i])
+                        filtered_remaining.append(remaining_counts[i])
+                    items = filtered_items
+                    unit_weights = filtered_unit_weights
+                    remaining_counts = filtered_remaining
+
+                trace.mark("weights")
+
+                remaining_to_draw = max(0, draw - len(selected_dict))
+                if draw_type == 1:
+                    # 按剩余数量抽取：抽中概率与 单件权重 × 剩余数量 成正比，抽中后扣减
+                    sampler = CountedWeightedSampler(
+                        unit_weights, remaining_counts, get_draw_rng()
                     )
-                items = filtered_items
-                weights = filtered_weights
-                remaining_counts = filtered_remaining
-                bs_weights = filtered_bs_weights
-
-            remaining_to_draw = draw - len(selected_dict)
-            for _ in range(max(0, remaining_to_draw)):
-                if not items:
-                    break
-                total_weight = sum(weights)
-                if total_weight <= 0:
-                    idx = system_random.randint(0, len(items) - 1)
+                    drawn_indices = sampler.draw_many(remaining_to_draw)
                 else:
-                    rv = system_random.uniform(0, total_weight)
-                    cum = 0
-                    idx = 0
-                    for i, w in enumerate(weights):
-                        cum += w
-                        if rv <= cum:
-                            idx = i
-                            break
-                chosen = items[idx]
-                selected.append(
-                    (chosen.get("id"), chosen.get("name"), chosen.get("exist", True))
-                )
-                selected_dict.append(chosen)
-                if draw_type == 1:
-                    remaining_counts[idx] = max(0, int(remaining_counts[idx] or 0) - 1)
-                    if remaining_counts[idx] <= 0:
-                        items.pop(idx)
-                        weights.pop(idx)
-                        remaining_counts.pop(idx)
-                        bs_weights.pop(idx)
-                    else:
-                        base_weight = float(chosen.get("weight", 1))
-                        weights[idx] = (
-                            base_weight
-                            * float(bs_weights[idx] or 1.0)
-                            * remaining_counts[idx]
+                    drawn_indices = weighted_sample_indices(
+                        unit_weights, remaining_to_draw, get_draw_rng()
+                    )
+
+                for idx in drawn_indices:
+                    chosen = items[idx]
+                    selected.append(
+                        (
+                            chosen.get("id"),
+                            chosen.get("name"),
+                            chosen.get("exist", True),
                         )
-                else:
-                    items.pop(idx)
-                    weights.pop(idx)
-                    bs_weights.pop(idx)
-            return {
-                "selected_prizes": selected,
-                "pool_name": pool_name,
-                "selected_prizes_dict": selected_dict,
-            }
+                    )
+                    selected_dict.append(chosen)
+                trace.mark("draw")
+                return {
+                    "selected_prizes": selected,
+                    "pool_name": pool_name,
+                    "selected_prizes_dict": selected_dict,
+                }
         except Exception:
             return {
                 "selected_prizes": [],
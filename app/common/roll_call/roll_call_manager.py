@@ -4,32 +4,35 @@ from PySide6.QtCore import (
     QTimer,
     QEasingCurve,
     QFileSystemWatcher,
-    QThreadPool,
-    QRunnable,
 )
 from PySide6.QtGui import QFont
+from collections.abc import Mapping
 from dataclasses import dataclass
 from loguru import logger
 from random import SystemRandom
 
 from app.common.data.list import (
-    get_student_list,
-    filter_students_data,
+    get_student_list_view,
+    filter_class_students,
     get_group_list,
     get_gender_list,
     get_class_name_list,
+    get_roster_version,
+    invalidate_roster_cache,
 )
 from app.common.display.result_display import ResultDisplayUtils
-from app.common.history import calculate_weight
+from app.common.history import calculate_weight, get_history_version
 from app.common.roll_call.roll_call_utils import RollCallUtils
 from app.common.music.music_player import music_player
 from app.common.behind_scenes.behind_scenes_utils import BehindScenesUtils
 from app.common.voice.voice import TTSHandler
 from app.common.extraction.extract import _is_non_class_time
+from app.common.extraction.frame_buffer import AnimationFrameBuffer
+from app.common.extraction.precompute import DrawPrecomputer
 from app.common.safety.verify_ops import require_and_run
 from app.page_building.another_window import create_remaining_list_window
-from app.tools.config import remove_record
-from app.tools.settings_access import readme_settings_async
+from app.tools.config import get_drawn_record_version, remove_record
+from app.tools.settings_access import readme_settings_async, get_settings_group
 from app.tools.list_specific_settings_access import read_roll_call_setting
 from app.tools.personalised import load_custom_font
 from app.Language.obtain_language import (
@@ -37,7 +40,8 @@ from app.Language.obtain_language import (
     get_content_combo_name_async,
 )
 from app.tools.path_utils import get_data_path
-from app.tools.variable import APP_INIT_DELAY
+from app.tools.variable import APP_INIT_DELAY, ANIMATION_FRAME_BUFFER_SIZE
+from app.tools.draw_timing import DrawTrace
 from app.tools.config import track_event
 
 system_random = SystemRandom()
@@ -83,9 +87,12 @@ class RollCallManager(QObject):
         self.current_group_index = 0
         self.current_gender_index = 0
         self.half_repeat = 0
-        self._precomputed_result = None
-        self._precompute_key = None
-        self._precompute_running = False
+        self._precomputer = DrawPrecomputer(
+            "roll_call", RollCallManager._precompute_stamp
+        )
+        self._frame_buffer = AnimationFrameBuffer(
+            ANIMATION_FRAME_BUFFER_SIZE, "roll_call"
+        )
 
     def build_draw_context(
         self,
@@ -152,25 +159,33 @@ class RollCallManager(QObject):
         )
 
     def finalize_draw(self, count: int, *, parent=None):
-        result = self.draw_final_students(count)
-        if isinstance(result, dict) and result.get("reset_required"):
-            RollCallUtils.reset_drawn_records(
-                parent,
-                self.current_class_name,
-                self.current_gender_filter,
-                self.current_group_filter,
+        with DrawTrace("roll_call_finalize") as trace:
+            result = self.draw_final_students(count)
+            trace.mark("draw")
+            if isinstance(result, dict) and result.get("reset_required"):
+                RollCallUtils.reset_drawn_records(
+                    parent,
+                    self.current_class_name,
+                    self.current_gender_filter,
+                    self.current_group_filter,
+                )
+                trace.mark("reset")
+                return {"reset_required": True, "class_name": self.current_class_name}
+
+            selected_students = (result or {}).get("selected_students") or []
+            selected_students_dict = (result or {}).get("selected_students_dict") or []
+            self.save_result(
+                selected_students,
+                selected_students_dict,
+                (result or {}).get("draw_result"),
             )
-            return {"reset_required": True, "class_name": self.current_class_name}
+            trace.mark("save")
 
-        selected_students = (result or {}).get("selected_students") or []
-        selected_students_dict = (result or {}).get("selected_students_dict") or []
-        self.save_result(selected_students, selected_students_dict)
-
-        result = dict(result or {})
-        result["should_update_remaining"] = bool(
-            self.half_repeat and self.half_repeat > 0
-        )
-        return result
+            result = dict(result or {})
+            result["should_update_remaining"] = bool(
+                self.half_repeat and self.half_repeat > 0
+            )
+            return result
 
     def reset_records_with_notification(self, *, parent=None):
         RollCallUtils.reset_drawn_records(
@@ -193,9 +208,8 @@ class RollCallManager(QObject):
         加载学生数据
         """
         try:
-            self._precomputed_result = None
-            self._precompute_key = None
-            self._precompute_running = False
+            self._precomputer.invalidate()
+            self._frame_buffer.stop()
             self.current_class_name = class_name
             self.current_group_filter = group_filter
             self.current_gender_filter = gender_filter
@@ -203,16 +217,16 @@ class RollCallManager(QObject):
             self.current_gender_index = gender_index
             self.half_repeat = half_repeat
 
-            record_key = f"{class_name}_{gender_filter}_{group_filter}"
-            if record_key in RollCallUtils._drawn_record_cache:
-                del RollCallUtils._drawn_record_cache[record_key]
+            RollCallUtils.invalidate_drawn_record_cache(
+                class_name, gender_filter, group_filter
+            )
 
-            # 获取原始学生列表
-            raw_students = get_student_list(class_name)
+            # 获取原始学生列表（只读视图）
+            raw_students = get_student_list_view(class_name)
 
             tags_by_id = {}
             for s in raw_students or []:
-                if not isinstance(s, dict):
+                if not isinstance(s, Mapping):
                     continue
                 try:
                     sid = int(s.get("id", 0) or 0)
@@ -220,12 +234,12 @@ class RollCallManager(QObject):
                     sid = 0
                 if sid <= 0:
                     continue
-                tags_by_id[sid] = s.get("tags") or []
+                tags_by_id[sid] = list(s.get("tags") or [])
             self.tags_by_id = tags_by_id
 
             # 过滤数据
-            self.students = filter_students_data(
-                raw_students, group_index, group_filter, gender_index, gender_filter
+            self.students = filter_class_students(
+                class_name, group_index, group_filter, gender_index, gender_filter
             )
 
             # 计算权重
@@ -282,6 +296,56 @@ class RollCallManager(QObject):
 
         return selected
 
+    def build_animation_frame(self, count):
+        """
+        生成一帧动画显示数据
+
+        Returns:
+            tuple: (selected_students, selected_students_dict)，小组模式下
+                selected_students 已按显示设置渲染为小组显示内容，selected_students_dict 为 None
+        """
+        students = self.get_random_students(count)
+        selected_students = []
+        selected_students_dict = []
+        for s in students:
+            exist = s[4] if len(s) > 4 else True
+            selected_students.append((s[0], s[1], exist))
+            try:
+                sid = int(s[0] or 0)
+            except Exception:
+                sid = 0
+            selected_students_dict.append(
+                {
+                    "id": sid,
+                    "name": s[1],
+                    "exist": exist,
+                    "tags": (self.tags_by_id or {}).get(sid, []),
+                }
+            )
+
+        if self.current_group_index == 1:
+            show_random = get_settings_group("roll_call_settings").get("show_random")
+            selected_students = RollCallUtils.render_group_display_students(
+                self.current_class_name, selected_students, show_random or 0
+            )
+            selected_students_dict = None
+
+        return selected_students, selected_students_dict
+
+    def start_frame_producer(self, count):
+        """在工作线程中预生成动画帧"""
+        self._frame_buffer.start(count, lambda: self.build_animation_frame(count))
+
+    def stop_frame_producer(self):
+        self._frame_buffer.stop()
+
+    def next_animation_frame(self, count):
+        """取出一帧动画显示数据，缓冲区暂无可用帧时同步生成"""
+        frame = self._frame_buffer.next_frame(count)
+        if frame is None:
+            frame = self.build_animation_frame(count)
+        return frame
+
     def draw_final_students(self, count):
         """
         执行最终抽取
@@ -301,7 +365,7 @@ class RollCallManager(QObject):
         )
         return result
 
-    def save_result(self, selected_students, selected_students_dict):
+    def save_result(self, selected_students, selected_students_dict, draw_result=None):
         """
         保存抽取结果
         """
@@ -312,6 +376,7 @@ class RollCallManager(QObject):
             self.current_gender_filter,
             self.current_group_filter,
             self.half_repeat,
+            draw_result,
         )
 
     def _build_precompute_key(self, count):
@@ -329,6 +394,16 @@ class RollCallManager(QObject):
             count,
         )
 
+    @staticmethod
+    def _precompute_stamp(key):
+        """预计算结果依赖的名单、已抽取记录与历史记录版本"""
+        class_name, group_filter, gender_filter = key[0], key[1], key[2]
+        return (
+            get_roster_version(class_name),
+            get_drawn_record_version(class_name, gender_filter, group_filter),
+            get_history_version("roll_call", class_name),
+        )
+
     def start_precompute_final(self, count):
         try:
             count = int(count or 0)
@@ -336,12 +411,6 @@ class RollCallManager(QObject):
             count = 0
         if count <= 0 or not self.current_class_name:
             return
-        key = self._build_precompute_key(count)
-        if self._precompute_running and self._precompute_key == key:
-            return
-        self._precompute_key = key
-        self._precomputed_result = None
-        self._precompute_running = True
 
         class_name = self.current_class_name
         group_index = self.current_group_index
@@ -349,24 +418,6 @@ class RollCallManager(QObject):
         gender_index = self.current_gender_index
         gender_filter = self.current_gender_filter
         half_repeat = self.half_repeat
-        draw_count = count
-
-        class _Signals(QObject):
-            loaded = Signal(object, object)
-
-        class _Loader(QRunnable):
-            def __init__(self, fn, signals, key):
-                super().__init__()
-                self.fn = fn
-                self.signals = signals
-                self.key = key
-
-            def run(self):
-                try:
-                    result = self.fn()
-                    self.signals.loaded.emit(self.key, result)
-                except Exception as e:
-                    logger.exception(f"预计算最终抽取结果失败: {e}")
 
         def _collect():
             return RollCallUtils.draw_random_students(
@@ -375,29 +426,14 @@ class RollCallManager(QObject):
                 group_filter,
                 gender_index,
                 gender_filter,
-                draw_count,
+                count,
                 half_repeat,
             )
 
-        signals = _Signals()
-        signals.loaded.connect(self._on_precompute_loaded)
-        runnable = _Loader(_collect, signals, key)
-        QThreadPool.globalInstance().start(runnable)
-
-    def _on_precompute_loaded(self, key, result):
-        if key != self._precompute_key:
-            return
-        self._precomputed_result = result
-        self._precompute_running = False
+        self._precomputer.start(self._build_precompute_key(count), _collect)
 
     def take_precomputed_result(self, count):
-        key = self._build_precompute_key(count)
-        if self._precomputed_result and self._precompute_key == key:
-            result = self._precomputed_result
-            self._precomputed_result = None
-            self._precompute_running = False
-            return result
-        return None
+        return self._precomputer.take(self._build_precompute_key(count))
 
     def reset_records(self):
         """重置抽取记录"""
@@ -447,6 +483,7 @@ def start_roll_call_draw(widget):
     animation_music = plan.animation_music if plan else None
     if animation in [0, 1]:
         manager.start_precompute_final(widget.current_count)
+        manager.start_frame_producer(_get_animation_display_count(widget))
 
     if animation == 0:
         if animation_music:
@@ -566,6 +603,7 @@ def stop_animation(widget):
     is_quick_draw = hasattr(widget, "is_quick_draw") and widget.is_quick_draw
     if hasattr(widget, "animation_timer") and widget.animation_timer.isActive():
         widget.animation_timer.stop()
+    widget.manager.stop_frame_producer()
     widget.start_button.setText(
         get_content_pushbutton_name_async("roll_call", "start_button")
     )
@@ -697,34 +735,23 @@ def play_voice_result(widget):
         logger.exception(f"播放语音失败: {e}", exc_info=True)
 
 
+def _get_animation_display_count(widget):
+    display_count = widget.current_count
+    try:
+        remaining_count = int(getattr(widget, "remaining_count", 0) or 0)
+    except Exception:
+        remaining_count = 0
+    if remaining_count > 0:
+        display_count = min(display_count, remaining_count)
+    return display_count
+
+
 def draw_random(widget):
     if widget.is_animating:
-        display_count = widget.current_count
-        try:
-            remaining_count = int(getattr(widget, "remaining_count", 0) or 0)
-        except Exception:
-            remaining_count = 0
-        if remaining_count > 0:
-            display_count = min(display_count, remaining_count)
-
-        students = widget.manager.get_random_students(display_count)
-        selected_students = []
-        selected_students_dict = []
-        for s in students:
-            exist = s[4] if len(s) > 4 else True
-            selected_students.append((s[0], s[1], exist))
-            try:
-                sid = int(s[0] or 0)
-            except Exception:
-                sid = 0
-            selected_students_dict.append(
-                {
-                    "id": sid,
-                    "name": s[1],
-                    "exist": exist,
-                    "tags": (widget.manager.tags_by_id or {}).get(sid, []),
-                }
-            )
+        display_count = _get_animation_display_count(widget)
+        selected_students, selected_students_dict = widget.manager.next_animation_frame(
+            display_count
+        )
 
         display_result_animated(
             widget,
@@ -732,6 +759,7 @@ def draw_random(widget):
             widget.manager.current_class_name,
             draw_count=display_count,
             selected_students_dict=selected_students_dict,
+            group_rendered=True,
         )
 
 
@@ -761,14 +789,19 @@ def display_result(
 
 
 def display_result_animated(
-    widget, selected_students, class_name, draw_count=None, selected_students_dict=None
+    widget,
+    selected_students,
+    class_name,
+    draw_count=None,
+    selected_students_dict=None,
+    group_rendered=False,
 ):
     group_index = widget.range_combobox.currentIndex()
     display_dict = RollCallUtils.create_display_settings("roll_call_settings")
     if draw_count is None:
         draw_count = widget.current_count
 
-    if group_index == 1:
+    if group_index == 1 and not group_rendered:
         selected_students = RollCallUtils.render_group_display_students(
             class_name, selected_students, display_dict.get("show_random", 0)
         )
@@ -985,6 +1018,8 @@ def setup_file_watcher(widget):
 
 def on_directory_changed(widget, path):
     try:
+        invalidate_roster_cache(path)
+        RollCallUtils.invalidate_caches()
         QTimer.singleShot(500, lambda: refresh_class_list(widget))
     except Exception as e:
         logger.exception(f"处理文件夹变化事件失败: {e}")
@@ -992,6 +1027,8 @@ def on_directory_changed(widget, path):
 
 def on_file_changed(widget, path):
     try:
+        invalidate_roster_cache(path)
+        RollCallUtils.invalidate_caches()
         QTimer.singleShot(500, lambda: refresh_class_list(widget))
     except Exception as e:
         logger.exception(f"处理文件变化事件失败: {e}")
@@ -1,22 +1,44 @@
 # ==================================================
 # 点名工具类
 # ==================================================
-from random import SystemRandom
-
-from app.common.data.list import get_group_list, get_student_list, filter_students_data
+from collections.abc import Mapping
+
+from app.common.data.list import (
+    get_group_list,
+    get_group_members_view,
+    get_student_list_view,
+    get_roster_version,
+    filter_class_students,
+)
 from app.common.history import calculate_weight
 from app.common.fair_draw.avg_gap_protection import apply_avg_gap_protection
+from app.common.fair_draw.draw_rng import get_draw_rng
+from app.common.fair_draw.weighted_sampler import (
+    GroupedWeightedSampler,
+    WeightedSampler,
+)
 from app.common.behind_scenes.behind_scenes_utils import BehindScenesUtils
 from app.tools.config import (
     calculate_remaining_count,
+    get_drawn_record_version,
     read_drawn_record,
     reset_drawn_record,
     record_drawn_student,
 )
-from app.tools.settings_access import readme_settings_async, get_safe_font_size
+from app.tools.settings_access import (
+    readme_settings_async,
+    get_safe_font_size,
+    get_settings_group,
+)
 from app.tools.list_specific_settings_access import read_roll_call_setting
+from app.tools.lru_cache import VersionedLRUCache
+from app.tools.draw_timing import DrawTrace
+from app.tools.variable import (
+    CANDIDATE_CACHE_MAX_ENTRIES,
+    DRAWN_RECORD_CACHE_MAX_ENTRIES,
+)
 from app.common.display.result_display import ResultDisplayUtils
-from app.common.history import save_roll_call_history
+from app.common.history import RollCallDrawResult, save_roll_call_history
 from app.common.extraction.extract import (
     _get_current_class_info,
     _is_non_class_time,
@@ -25,15 +47,75 @@ from app.common.extraction.extract import (
 
 from app.Language.obtain_language import get_any_position_value
 
-system_random = SystemRandom()
-
 
 class RollCallUtils:
     """点名工具类，提供通用的点名相关功能"""
 
-    _student_data_cache = {}
-    _drawn_record_cache = {}
-    _behind_scenes_cache = {}
+    # 候选人缓存：键为过滤条件元组，版本戳为名单文件版本
+    _candidate_cache = VersionedLRUCache(
+        CANDIDATE_CACHE_MAX_ENTRIES, "roll_call_candidates"
+    )
+    # 已抽取记录缓存：键为 (班级, 性别, 小组)，版本戳为记录文件版本
+    _drawn_record_cache = VersionedLRUCache(
+        DRAWN_RECORD_CACHE_MAX_ENTRIES, "roll_call_drawn_records"
+    )
+
+    @staticmethod
+    def invalidate_candidate_cache(class_name=None):
+        """使候选人缓存失效
+
+        Args:
+            class_name: 班级名称，为 None 时清除全部
+        """
+        if class_name is None:
+            RollCallUtils._candidate_cache.invalidate()
+        else:
+            RollCallUtils._candidate_cache.invalidate(lambda key: key[0] == class_name)
+
+    @staticmethod
+    def invalidate_drawn_record_cache(
+        class_name=None, gender_filter=None, group_filter=None
+    ):
+        """使已抽取记录缓存失效
+
+        Args:
+            class_name: 班级名称，为 None 时清除全部
+            gender_filter: 性别过滤器
+            group_filter: 小组过滤器
+        """
+        if class_name is None:
+            RollCallUtils._drawn_record_cache.invalidate()
+        else:
+            RollCallUtils._drawn_record_cache.discard(
+                (class_name, gender_filter, group_filter)
+            )
+
+    @staticmethod
+    def invalidate_caches(class_name=None):
+        """使候选人缓存与已抽取记录缓存失效
+
+        Args:
+            class_name: 班级名称，为 None 时清除全部
+        """
+        RollCallUtils.invalidate_candidate_cache(class_name)
+        if class_name is None:
+            RollCallUtils._drawn_record_cache.invalidate()
+        else:
+            RollCallUtils._drawn_record_cache.invalidate(
+                lambda key: key[0] == class_name
+            )
+
+    @staticmethod
+    def get_cache_stats():
+        """获取点名缓存的命中统计
+
+        Returns:
+            dict: 各缓存的大小、命中/未命中次数等信息
+        """
+        return {
+            "candidates": RollCallUtils._candidate_cache.stats(),
+            "drawn_records": RollCallUtils._drawn_record_cache.stats(),
+        }
 
     @staticmethod
     def get_total_count(list_combobox_text, range_combobox_index, range_combobox_text):
@@ -49,12 +131,12 @@ class RollCallUtils:
             int: 总人数
         """
         if range_combobox_index == 0:  # 全班
-            students = get_student_list(list_combobox_text)
+            students = get_student_list_view(list_combobox_text)
             total_count = len([s for s in students if s.get("exist", True)])
         elif range_combobox_index == 1:  # 小组模式 - 计算小组数量
             total_count = len(get_group_list(list_combobox_text))
         else:  # 特定小组 - 计算该小组的学生数量
-            students = get_student_list(list_combobox_text)
+            students = get_student_list_view(list_combobox_text)
             total_count = len(
                 [
                     s
@@ -156,17 +238,15 @@ class RollCallUtils:
         class_name, group_index, group_filter, gender_index, gender_filter
     ):
         """获取并过滤候选人列表"""
-        cache_key = (
-            f"{class_name}_{group_index}_{group_filter}_{gender_index}_{gender_filter}"
-        )
+        cache_key = (class_name, group_index, group_filter, gender_index, gender_filter)
 
-        if cache_key not in RollCallUtils._student_data_cache:
-            # 使用 get_student_list 获取处理好的学生列表（List[Dict]），而不是直接加载原始JSON
-            raw_students = get_student_list(class_name)
+        def build_candidates():
+            # 使用 get_student_list_view 获取处理好的只读学生列表，而不是直接加载原始JSON
+            raw_students = get_student_list_view(class_name)
 
             tags_by_id = {}
             for s in raw_students or []:
-                if not isinstance(s, dict):
+                if not isinstance(s, Mapping):
                     continue
                 try:
                     sid = int(s.get("id", 0) or 0)
@@ -174,28 +254,39 @@ class RollCallUtils:
                     sid = 0
                 if sid <= 0:
                     continue
-                tags_by_id[sid] = s.get("tags") or []
+                tags_by_id[sid] = tuple(s.get("tags") or [])
 
-            students_data = filter_students_data(
-                raw_students, group_index, group_filter, gender_index, gender_filter
+            students_data = filter_class_students(
+                class_name, group_index, group_filter, gender_index, gender_filter
+            )
+            return tuple(
+                (
+                    student_tuple[0],
+                    student_tuple[1],
+                    student_tuple[2],
+                    student_tuple[3],
+                    student_tuple[4],
+                    tags_by_id.get(student_tuple[0], ()),
+                )
+                for student_tuple in students_data or []
             )
 
-            students_dict_list = []
-            for student_tuple in students_data or []:
-                student_id = student_tuple[0]
-                student_dict = {
-                    "id": student_id,
-                    "name": student_tuple[1],
-                    "gender": student_tuple[2],
-                    "group": student_tuple[3],
-                    "exist": student_tuple[4],
-                    "tags": tags_by_id.get(student_id, []),
-                }
-                students_dict_list.append(student_dict)
+        cached = RollCallUtils._candidate_cache.get_or_create(
+            cache_key, get_roster_version(class_name), build_candidates
+        )
 
-            RollCallUtils._student_data_cache[cache_key] = students_dict_list
-        else:
-            students_dict_list = RollCallUtils._student_data_cache[cache_key]
+        # 每次返回新的字典，避免调用方（如权重计算）修改缓存内容
+        students_dict_list = [
+            {
+                "id": student_id,
+                "name": name,
+                "gender": gender,
+                "group": group,
+                "exist": exist,
+                "tags": list(tags),
+            }
+            for student_id, name, gender, group, exist, tags in cached
+        ]
 
         if group_index == 1:
             students_dict_list = sorted(
@@ -212,12 +303,11 @@ class RollCallUtils:
         if half_repeat <= 0:
             return students_dict_list
 
-        record_key = f"{class_name}_{gender_filter}_{group_filter}"
-        if record_key not in RollCallUtils._drawn_record_cache:
-            drawn_records = read_drawn_record(class_name, gender_filter, group_filter)
-            RollCallUtils._drawn_record_cache[record_key] = drawn_records
-        else:
-            drawn_records = RollCallUtils._drawn_record_cache[record_key]
+        drawn_records = RollCallUtils._drawn_record_cache.get_or_create(
+            (class_name, gender_filter, group_filter),
+            get_drawn_record_version(class_name, gender_filter, group_filter),
+            lambda: tuple(read_drawn_record(class_name, gender_filter, group_filter)),
+        )
 
         drawn_counts = {name: count for name, count in drawn_records}
 
@@ -229,6 +319,38 @@ class RollCallUtils:
 
         return filtered_list
 
+    @staticmethod
+    def _get_subject_context():
+        """获取当前课程信息和科目过滤器
+
+        Returns:
+            tuple: (课程信息, 科目名称)，未启用科目过滤或无课程时分别为 None 和空字符串
+        """
+        current_class_info = None
+        subject_history_filter_enabled = (
+            readme_settings_async("linkage_settings", "subject_history_filter_enabled")
+            or False
+        )
+
+        if subject_history_filter_enabled:
+            data_source = readme_settings_async("linkage_settings", "data_source")
+            if data_source == 2:
+                from app.common.IPC_URL.csharp_ipc_handler import CSharpIPCHandler
+
+                current_class_info = (
+                    CSharpIPCHandler.instance().get_current_class_info()
+                )
+            elif data_source == 1:
+                current_class_info = _get_current_class_info()
+
+            if not current_class_info and _is_non_class_time():
+                current_class_info = _get_break_assignment_class_info()
+
+        subject_filter = (
+            current_class_info.get("name", "") if current_class_info else ""
+        )
+        return current_class_info, subject_filter
+
     @staticmethod
     def _perform_weighted_draw(candidates, count, weights=None):
         """执行加权或随机抽取"""
@@ -236,29 +358,17 @@ class RollCallUtils:
         selected_candidates = []
         selected_candidates_dict = []
 
-        # Create a copy to avoid modifying the original list if it's used elsewhere
-        candidates = list(candidates)
-
-        # If weights are provided, ensure they match the candidates length
+        # 未提供权重时所有候选权重相同
         current_weights = list(weights) if weights else [1.0] * len(candidates)
+        if len(current_weights) < len(candidates):
+            current_weights.extend([1.0] * (len(candidates) - len(current_weights)))
 
+        sampler = WeightedSampler(current_weights[: len(candidates)], get_draw_rng())
         for _ in range(draw_count):
-            if not candidates:
+            random_index = sampler.pop()
+            if random_index is None:
                 break
 
-            total_weight = sum(current_weights)
-            if total_weight <= 0:
-                random_index = system_random.randint(0, len(candidates) - 1)
-            else:
-                rand_value = system_random.uniform(0, total_weight)
-                cumulative_weight = 0
-                random_index = 0
-                for i, weight in enumerate(current_weights):
-                    cumulative_weight += weight
-                    if rand_value <= cumulative_weight:
-                        random_index = i
-                        break
-
             selected_candidate = candidates[random_index]
 
             # Extract basic info tuple
@@ -271,9 +381,6 @@ class RollCallUtils:
             selected_candidates.append(info_tuple)
             selected_candidates_dict.append(selected_candidate)
 
-            candidates.pop(random_index)
-            current_weights.pop(random_index)
-
         return selected_candidates, selected_candidates_dict
 
     @staticmethod
@@ -289,126 +396,138 @@ class RollCallUtils:
         """
         抽取随机学生
         """
-        # 1. 获取候选人
-        students_dict_list = RollCallUtils._get_filtered_candidates(
-            class_name, group_index, group_filter, gender_index, gender_filter
-        )
-
-        # 2. 应用历史记录过滤
-        students_dict_list = RollCallUtils._apply_history_filter(
-            students_dict_list, half_repeat, class_name, gender_filter, group_filter
-        )
-
-        if not students_dict_list:
-            return {"reset_required": True}
+        with DrawTrace("roll_call") as trace:
+            # 1. 获取候选人
+            students_dict_list = RollCallUtils._get_filtered_candidates(
+                class_name, group_index, group_filter, gender_index, gender_filter
+            )
+            trace.mark("candidates")
 
-        # 3. 如果是小组模式，直接抽取小组
-        if group_index == 1:
-            draw_type = read_roll_call_setting(class_name, "draw_type")
-            selected_groups = RollCallUtils.draw_random_groups(
-                students_dict_list, current_count, draw_type
+            # 2. 应用历史记录过滤
+            students_dict_list = RollCallUtils._apply_history_filter(
+                students_dict_list, half_repeat, class_name, gender_filter, group_filter
             )
-            show_random = read_roll_call_setting(class_name, "show_random")
-            selected_groups, ipc_selected_students = (
-                RollCallUtils.render_group_display_students_and_ipc(
-                    class_name, selected_groups, show_random
+            trace.mark("history_filter")
+
+            if not students_dict_list:
+                return {"reset_required": True}
+
+            # 3. 如果是小组模式，直接抽取小组（及组内显示的成员）
+            if group_index == 1:
+                draw_type = read_roll_call_setting(class_name, "draw_type")
+                show_random = read_roll_call_setting(class_name, "show_random")
+                selected_groups, selected_members = (
+                    RollCallUtils.draw_random_groups_with_members(
+                        class_name,
+                        students_dict_list,
+                        current_count,
+                        draw_type,
+                        bool(show_random),
+                    )
                 )
-            )
-            return {
-                "selected_students": selected_groups,
-                "class_name": class_name,
-                "selected_students_dict": [],
-                "ipc_selected_students": ipc_selected_students,
-                "group_filter": group_filter,
-                "gender_filter": gender_filter,
-            }
-
-        # 4. 获取当前课程信息（用于科目过滤）
-        current_class_info = None
-        subject_history_filter_enabled = (
-            readme_settings_async("linkage_settings", "subject_history_filter_enabled")
-            or False
-        )
+                selected_groups, ipc_selected_students = (
+                    RollCallUtils.render_group_display_students_and_ipc(
+                        class_name, selected_groups, show_random, selected_members
+                    )
+                )
+                trace.mark("group_draw")
+                return {
+                    "selected_students": selected_groups,
+                    "class_name": class_name,
+                    "selected_students_dict": [],
+                    "ipc_selected_students": ipc_selected_students,
+                    "group_filter": group_filter,
+                    "gender_filter": gender_filter,
+                }
 
-        if subject_history_filter_enabled:
-            data_source = readme_settings_async("linkage_settings", "data_source")
-            if data_source == 2:
-                from app.common.IPC_URL.csharp_ipc_handler import CSharpIPCHandler
+            # 4. 获取当前课程信息（用于科目过滤）
+            current_class_info, subject_filter = RollCallUtils._get_subject_context()
+            trace.mark("subject")
+
+            # 5. 应用平均间隔保护
+            students_dict_list = apply_avg_gap_protection(
+                students_dict_list,
+                current_count,
+                class_name,
+                "roll_call",
+                subject_filter,
+            )
+            trace.mark("avg_gap")
 
-                current_class_info = (
-                    CSharpIPCHandler.instance().get_current_class_info()
+            # 6. 应用内幕权重
+            students_dict_list, behind_scenes_weights = (
+                BehindScenesUtils.apply_probability_weights(
+                    students_dict_list, 0, class_name
                 )
-            elif data_source == 1:
-                current_class_info = _get_current_class_info()
-
-            if not current_class_info and _is_non_class_time():
-                current_class_info = _get_break_assignment_class_info()
+            )
+            trace.mark("behind_scenes")
 
-        subject_filter = (
-            current_class_info.get("name", "") if current_class_info else ""
-        )
+            # 7. 检查必中人员
+            guaranteed_students = BehindScenesUtils.ensure_guaranteed_selection(
+                students_dict_list, behind_scenes_weights, class_name
+            )
+            trace.mark("guaranteed")
+            if guaranteed_students is not None:
+                selected_students = [
+                    (s.get("id", ""), s.get("name", ""), s.get("exist", True))
+                    for s in guaranteed_students
+                ]
+                return {
+                    "selected_students": selected_students,
+                    "class_name": class_name,
+                    "selected_students_dict": guaranteed_students,
+                    "group_filter": group_filter,
+                    "gender_filter": gender_filter,
+                    "draw_result": RollCallDrawResult(
+                        current_class_info, subject_filter
+                    ),
+                }
 
-        # 5. 应用平均间隔保护
-        students_dict_list = apply_avg_gap_protection(
-            students_dict_list, current_count, class_name, "roll_call", subject_filter
-        )
+            # 8. 计算最终权重
+            draw_type = read_roll_call_setting(class_name, "draw_type")
+            weights = []
+            student_weights = None
+            if draw_type == 1:
+                students_with_weight = calculate_weight(
+                    students_dict_list, class_name, subject_filter
+                )
+                # 重新对齐权重列表（students_with_weight 和 behind_scenes_weights 应该是一一对应的）
+                for i, student in enumerate(students_with_weight):
+                    base_weight = student.get("weight", 1.0)
+                    bs_weight = (
+                        behind_scenes_weights[i]
+                        if i < len(behind_scenes_weights)
+                        else 1.0
+                    )
+                    weights.append(base_weight * bs_weight)
+                candidates = students_with_weight
+                student_weights = {}
+                for student in students_with_weight:
+                    student_weights.setdefault(
+                        student.get("name"), student.get("next_weight", 0)
+                    )
+            else:
+                candidates = students_dict_list
+                weights = behind_scenes_weights
+            trace.mark("weights")
 
-        # 6. 应用内幕权重
-        students_dict_list, behind_scenes_weights = (
-            BehindScenesUtils.apply_probability_weights(
-                students_dict_list, 0, class_name
+            # 9. 执行抽取
+            selected_students, selected_students_dict = (
+                RollCallUtils._perform_weighted_draw(candidates, current_count, weights)
             )
-        )
+            trace.mark("draw")
 
-        # 7. 检查必中人员
-        guaranteed_students = BehindScenesUtils.ensure_guaranteed_selection(
-            students_dict_list, behind_scenes_weights, class_name
-        )
-        if guaranteed_students is not None:
-            selected_students = [
-                (s.get("id", ""), s.get("name", ""), s.get("exist", True))
-                for s in guaranteed_students
-            ]
             return {
                 "selected_students": selected_students,
                 "class_name": class_name,
-                "selected_students_dict": guaranteed_students,
+                "selected_students_dict": selected_students_dict,
                 "group_filter": group_filter,
                 "gender_filter": gender_filter,
+                "draw_result": RollCallDrawResult(
+                    current_class_info, subject_filter, student_weights
+                ),
             }
 
-        # 8. 计算最终权重
-        draw_type = read_roll_call_setting(class_name, "draw_type")
-        weights = []
-        if draw_type == 1:
-            students_with_weight = calculate_weight(
-                students_dict_list, class_name, subject_filter
-            )
-            # 重新对齐权重列表（students_with_weight 和 behind_scenes_weights 应该是一一对应的）
-            for i, student in enumerate(students_with_weight):
-                base_weight = student.get("weight", 1.0)
-                bs_weight = (
-                    behind_scenes_weights[i] if i < len(behind_scenes_weights) else 1.0
-                )
-                weights.append(base_weight * bs_weight)
-            candidates = students_with_weight
-        else:
-            candidates = students_dict_list
-            weights = behind_scenes_weights
-
-        # 9. 执行抽取
-        selected_students, selected_students_dict = (
-            RollCallUtils._perform_weighted_draw(candidates, current_count, weights)
-        )
-
-        return {
-            "selected_students": selected_students,
-            "class_name": class_name,
-            "selected_students_dict": selected_students_dict,
-            "group_filter": group_filter,
-            "gender_filter": gender_filter,
-        }
-
     @staticmethod
     def draw_random_groups(students_dict_list, current_count, draw_type):
         """
@@ -429,6 +548,81 @@ class RollCallUtils:
 
         return selected_groups
 
+    @staticmethod
+    def draw_random_groups_with_members(
+        class_name, groups_dict_list, current_count, draw_type, pick_member
+    ):
+        """
+        两级抽取：先抽取小组，再在组内抽取一名成员
+
+        公平抽取模式（draw_type == 1）下，成员权重取自历史记录计算的公平权重，
+        小组默认等概率抽取，启用 group_proportional_draw 设置后按组内成员权重之和抽取；
+        随机模式下小组与成员均等概率抽取。
+
+        Args:
+            class_name: 班级名称
+            groups_dict_list: 候选小组字典列表（_get_filtered_candidates 的返回值）
+            current_count: 抽取小组数量
+            draw_type: 抽取模式（0=随机, 1=公平）
+            pick_member: 是否需要组内成员（不需要且为随机模式时不读取成员）
+
+        Returns:
+            tuple: (选中的小组列表 [(None, 小组名, exist)], 小组名 → 选中成员姓名)
+        """
+        if draw_type != 1 and not pick_member:
+            return (
+                RollCallUtils.draw_random_groups(
+                    groups_dict_list, current_count, draw_type
+                ),
+                {},
+            )
+
+        members_by_group = [
+            [dict(member) for member in get_group_members_view(class_name, g["name"])]
+            for g in groups_dict_list
+        ]
+
+        # 为 None 时小组按组内成员权重之和抽取
+        group_weights = None
+        if draw_type == 1:
+            _, subject_filter = RollCallUtils._get_subject_context()
+            calculate_weight(
+                [member for members in members_by_group for member in members],
+                class_name,
+                subject_filter,
+            )
+            member_weights = [
+                [member.get("next_weight", 1.0) for member in members]
+                for members in members_by_group
+            ]
+            if not readme_settings_async(
+                "fair_draw_settings", "group_proportional_draw"
+            ):
+                group_weights = [1.0] * len(groups_dict_list)
+        else:
+            member_weights = [[1.0] * len(members) for members in members_by_group]
+            group_weights = [1.0] * len(groups_dict_list)
+
+        sampler = GroupedWeightedSampler(member_weights, group_weights, get_draw_rng())
+        selected_groups = []
+        selected_members = {}
+        for _ in range(min(current_count, len(groups_dict_list))):
+            drawn = sampler.draw()
+            if drawn is None:
+                break
+            group, member = drawn
+            group_dict = groups_dict_list[group]
+            group_name = group_dict.get("name", "")
+            selected_groups.append(
+                (group_dict.get("id", ""), group_name, group_dict.get("exist", True))
+            )
+            if pick_member and member is not None:
+                selected_members[group_name] = members_by_group[group][member].get(
+                    "name", ""
+                )
+
+        return selected_groups, selected_members
+
     @staticmethod
     def render_group_display_students(class_name, selected_students, show_random):
         rendered, _ = RollCallUtils.render_group_display_students_and_ipc(
@@ -438,17 +632,27 @@ class RollCallUtils:
 
     @staticmethod
     def render_group_display_students_and_ipc(
-        class_name, selected_students, show_random
+        class_name, selected_students, show_random, selected_members=None
     ):
+        """
+        生成小组模式的显示内容与 IPC 数据
+
+        Args:
+            class_name: 班级名称
+            selected_students: 选中的小组列表
+            show_random: 是否显示组内随机成员
+            selected_members: 已抽取的组内成员（小组名 → 成员姓名），
+                未提供的小组在组内等概率选取成员
+        """
         try:
             show_random = int(show_random or 0)
         except Exception:
             show_random = 0
 
         try:
-            from app.common.data.list import get_group_members
+            from app.common.data.list import get_group_members_view
         except Exception:
-            get_group_members = None
+            get_group_members_view = None
 
         rendered = []
         ipc_selected_students = []
@@ -476,20 +680,22 @@ class RollCallUtils:
 
             group_name = name
             selected_name = ""
-            if (
+            if show_random > 0 and selected_members and group_name in selected_members:
+                selected_name = str(selected_members[group_name] or "").strip()
+            elif (
                 show_random > 0
-                and get_group_members is not None
+                and get_group_members_view is not None
                 and class_name
                 and group_name
             ):
                 try:
-                    group_members = get_group_members(class_name, group_name) or []
+                    group_members = get_group_members_view(class_name, group_name)
                 except Exception:
                     group_members = []
 
                 if group_members:
                     try:
-                        selected_member = system_random.choice(group_members)
+                        selected_member = get_draw_rng().choice(group_members)
                     except Exception:
                         selected_member = None
                     selected_name = str(
@@ -587,9 +793,9 @@ class RollCallUtils:
             group_filter: 小组过滤器
         """
         reset_drawn_record(window, class_name, gender_filter, group_filter)
-        record_key = f"{class_name}_{gender_filter}_{group_filter}"
-        if record_key in RollCallUtils._drawn_record_cache:
-            del RollCallUtils._drawn_record_cache[record_key]
+        RollCallUtils.invalidate_drawn_record_cache(
+            class_name, gender_filter, group_filter
+        )
 
     @staticmethod
     def update_start_button_state(button, total_count):
@@ -619,51 +825,32 @@ class RollCallUtils:
         Returns:
             dict: 显示设置字典
         """
-        if display_settings:
-            font_size = display_settings.get(
-                "font_size", get_safe_font_size(settings_group, "font_size")
-            )
-            animation_color = display_settings.get(
-                "animation_color_theme",
-                readme_settings_async(settings_group, "animation_color_theme"),
-            )
-            display_format = display_settings.get(
-                "display_format",
-                readme_settings_async(settings_group, "display_format"),
-            )
-            display_style = display_settings.get(
-                "display_style",
-                readme_settings_async(settings_group, "display_style"),
-            )
-            show_student_image = display_settings.get(
-                "student_image",
-                readme_settings_async(settings_group, "student_image"),
-            )
-            image_position = display_settings.get(
-                "student_image_position",
-                readme_settings_async(settings_group, "student_image_position"),
-            )
-            show_random = display_settings.get(
-                "show_random",
-                readme_settings_async(settings_group, "show_random"),
-            )
-            show_tags = display_settings.get(
-                "show_tags",
-                readme_settings_async(settings_group, "show_tags"),
-            )
+        group_settings = get_settings_group(settings_group)
+        display_settings = display_settings or {}
+
+        if "font_size" in display_settings:
+            font_size = display_settings["font_size"]
         else:
             font_size = get_safe_font_size(settings_group, "font_size")
-            animation_color = readme_settings_async(
-                settings_group, "animation_color_theme"
-            )
-            display_format = readme_settings_async(settings_group, "display_format")
-            display_style = readme_settings_async(settings_group, "display_style")
-            show_student_image = readme_settings_async(settings_group, "student_image")
-            image_position = readme_settings_async(
-                settings_group, "student_image_position"
-            )
-            show_random = readme_settings_async(settings_group, "show_random")
-            show_tags = readme_settings_async(settings_group, "show_tags")
+        animation_color = display_settings.get(
+            "animation_color_theme", group_settings.get("animation_color_theme")
+        )
+        display_format = display_settings.get(
+            "display_format", group_settings.get("display_format")
+        )
+        display_style = display_settings.get(
+            "display_style", group_settings.get("display_style")
+        )
+        show_student_image = display_settings.get(
+            "student_image", group_settings.get("student_image")
+        )
+        image_position = display_settings.get(
+            "student_image_position", group_settings.get("student_image_position")
+        )
+        show_random = display_settings.get(
+            "show_random", group_settings.get("show_random")
+        )
+        show_tags = display_settings.get("show_tags", group_settings.get("show_tags"))
 
         return {
             "font_size": font_size,
@@ -739,6 +926,7 @@ class RollCallUtils:
         gender_filter,
         group_filter,
         half_repeat,
+        draw_result=None,
     ):
         """
         记录已抽取的学生
@@ -750,6 +938,7 @@ class RollCallUtils:
             gender_filter: 性别过滤器
             group_filter: 小组过滤器
             half_repeat: 半重复设置
+            draw_result: 抽取结果中的 draw_result（课程信息与权重），用于保存历史记录
         """
         if half_repeat > 0:
             record_drawn_student(
@@ -758,9 +947,9 @@ class RollCallUtils:
                 group=group_filter,
                 student_name=selected_students,
             )
-            record_key = f"{class_name}_{gender_filter}_{group_filter}"
-            if record_key in RollCallUtils._drawn_record_cache:
-                del RollCallUtils._drawn_record_cache[record_key]
+            RollCallUtils.invalidate_drawn_record_cache(
+                class_name, gender_filter, group_filter
+            )
 
         if selected_students_dict:
             save_roll_call_history(
@@ -768,6 +957,7 @@ class RollCallUtils:
                 selected_students=selected_students_dict,
                 group_filter=group_filter,
                 gender_filter=gender_filter,
+                draw_result=draw_result,
             )
 
     @staticmethod
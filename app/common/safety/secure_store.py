@@ -217,6 +217,19 @@ def read_behind_scenes_settings() -> dict:
     return {}
 
 
+def get_behind_scenes_version():
+    """获取内幕设置文件的版本戳，设置写入后版本戳随之变化
+
+    Returns:
+        Optional[Tuple[int, int]]: (修改时间纳秒, 文件大小)，文件不存在时返回 None
+    """
+    try:
+        st = os.stat(get_settings_path("behind_scenes.json"))
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
 def write_behind_scenes_settings(d: dict) -> None:
     """写入内幕设置数据
 
@@ -1,3 +1,5 @@
+import threading
+
 from PySide6.QtCore import QTimer
 from loguru import logger
 
@@ -12,7 +14,12 @@ from app.core.font_manager import (
 )
 from app.core.window_manager import WindowManager
 from app.core.utils import safe_execute
-from app.common.history.file_utils import load_history_data, get_all_history_names
+from app.common.history.file_utils import (
+    load_history_data,
+    get_all_history_names,
+    compact_all_history_data,
+)
+from app.common.history.aggregates import migrate_roll_call_aggregates
 
 
 def calculate_total_draw_counts():
@@ -80,6 +87,8 @@ class AppInitializer:
         self._clear_restart_record()
         self._check_updates()
         self._warmup_face_detector_devices()
+        self._migrate_history_aggregates()
+        self._compact_history_journals()
         self._create_main_window()
 
     def _load_theme(self) -> None:
@@ -135,6 +144,34 @@ class AppInitializer:
             ),
         )
 
+    def _migrate_history_aggregates(self) -> None:
+        """在后台为旧版本点名历史文件构建聚合统计"""
+        QTimer.singleShot(
+            APP_INIT_DELAY,
+            lambda: threading.Thread(
+                target=lambda: safe_execute(
+                    migrate_roll_call_aggregates,
+                    error_message="迁移点名历史聚合统计失败",
+                ),
+                name="HistoryAggregatesMigration",
+                daemon=True,
+            ).start(),
+        )
+
+    def _compact_history_journals(self) -> None:
+        """在后台把上次运行遗留的历史记录追加日志并入快照"""
+        QTimer.singleShot(
+            APP_INIT_DELAY,
+            lambda: threading.Thread(
+                target=lambda: safe_execute(
+                    compact_all_history_data,
+                    error_message="压缩历史记录日志失败",
+                ),
+                name="HistoryJournalCompaction",
+                daemon=True,
+            ).start(),
+        )
+
     def _create_main_window(self) -> None:
         """创建主窗口实例（但不自动显示）"""
         guide_completed = readme_settings_async("basic_settings", "guide_completed")
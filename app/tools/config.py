@@ -1,9 +1,13 @@
 import os
 import json
 import shutil
+import itertools
+import threading
 import zipfile
 import re
-from typing import Optional, Union, Callable
+from typing import Optional, Union, Callable, Tuple
+from collections.abc import Mapping
+from functools import partial
 from loguru import logger
 from pathlib import Path
 from datetime import datetime
@@ -31,8 +35,13 @@ from app.tools.path_utils import (
     get_path,
 )
 from app.tools.personalised import get_theme_icon
-from app.tools.settings_access import readme_settings_async
-from app.common.data.list import get_student_list, get_group_list
+from app.tools.history_writer import history_writer
+from app.tools.settings_access import (
+    readme_settings_async,
+    flush_settings,
+    invalidate_settings_cache,
+)
+from app.common.data.list import get_student_list_view, get_group_list
 from app.tools.variable import (
     SPECIAL_VERSION,
     LOG_DIR,
@@ -905,9 +914,12 @@ def import_settings(parent: Optional[QWidget] = None) -> None:
             )
 
             if dialog.exec():
+                # 先写入尚未落盘的修改，避免其在导入后覆盖导入的设置
+                flush_settings()
                 settings_path = get_settings_path()
                 with open(settings_path, "w", encoding="utf-8") as f:
                     json.dump(imported_settings, f, ensure_ascii=False, indent=4)
+                invalidate_settings_cache()
 
                 success_dialog = MessageBox(
                     get_any_position_value_async(
@@ -1925,11 +1937,92 @@ def _get_roll_call_record_file_path(class_name: str, gender: str, group: str):
     )
 
 
+# 尚未写盘的已抽取记录：键为记录文件路径，值为 [记录字典, 修订号]。
+# 记录先在内存中更新，再由后台写盘线程写入文件，最新的记录写入后移除；
+# 写入失败时保留，由写盘线程重试
+_pending_drawn_records: dict = {}
+_drawn_records_lock = threading.RLock()
+_drawn_record_revisions = itertools.count(1)
+# 删除记录文件时递增，删除前提交但尚未执行的写入不再写盘
+_drawn_record_generations: dict = {}
+
+
+def _commit_drawn_records(file_path: Path, drawn_records: dict) -> None:
+    """把已抽取记录应用到内存并提交后台写盘（调用方需持有 _drawn_records_lock）
+
+    Args:
+        file_path: 记录文件路径
+        drawn_records: 更新后的完整记录字典（提交后不再修改）
+    """
+    key = str(file_path)
+    _pending_drawn_records[key] = [drawn_records, next(_drawn_record_revisions)]
+    history_writer.submit(
+        f"drawn_records/{file_path.name}",
+        partial(_write_drawn_records, file_path, _drawn_record_generations.get(key, 0)),
+    )
+
+
+def _write_drawn_records(file_path: Path, generation: int) -> None:
+    """把最新的已抽取记录写入文件（在后台写盘线程中执行）
+
+    写文件时不持有 _drawn_records_lock，抽取时的读写不会等待磁盘 I/O。
+    写入失败时抛出异常并保留内存中的记录，由写盘线程重试。
+    """
+    key = str(file_path)
+    with _drawn_records_lock:
+        if _drawn_record_generations.get(key, 0) != generation:
+            # 提交后记录已被清除
+            return
+        entry = _pending_drawn_records.get(key)
+        if entry is None:
+            # 已由之前的任务写入
+            return
+        drawn_records = entry[0]
+
+    _save_drawn_records(file_path, drawn_records)
+
+    with _drawn_records_lock:
+        if _drawn_record_generations.get(key, 0) != generation:
+            # 写入期间记录被清除，删除刚写入的文件（之后提交的记录由后续任务写入）
+            file_path.unlink(missing_ok=True)
+        elif _pending_drawn_records.get(key) is entry:
+            # 写入期间没有新的记录
+            del _pending_drawn_records[key]
+
+
+def _discard_pending_drawn_records(match: Callable[[Path], bool]) -> list:
+    """丢弃尚未写盘的已抽取记录（调用方需持有 _drawn_records_lock）
+
+    Args:
+        match: 判断记录文件路径是否需要丢弃
+
+    Returns:
+        被丢弃记录的文件路径列表
+    """
+    discarded = []
+    for key in list(_pending_drawn_records):
+        path = Path(key)
+        if match(path):
+            del _pending_drawn_records[key]
+            _drawn_record_generations[key] = _drawn_record_generations.get(key, 0) + 1
+            discarded.append(path)
+    return discarded
+
+
+def _get_drawn_records_version(file_path: Path) -> Optional[Tuple]:
+    entry = _pending_drawn_records.get(str(file_path))
+    if entry is not None:
+        return ("pending", entry[1])
+    return _get_file_version(file_path)
+
+
 def record_drawn_student(
     class_name: str, gender: str, group: str, student_name
 ) -> None:
     """记录已抽取的学生名称和次数
 
+    记录立即对读取可见，文件由后台写盘线程写入。
+
     Args:
         class_name: 班级名称
         gender: 性别
@@ -1939,27 +2032,30 @@ def record_drawn_student(
     file_path = _get_roll_call_record_file_path(class_name, gender, group)
     file_path.parent.mkdir(parents=True, exist_ok=True)
 
-    drawn_records = _load_drawn_records(file_path)
     students_to_add = _extract_student_names(student_name)
 
     updated_students = []
-    for name in students_to_add:
-        if name in drawn_records:
-            drawn_records[name] += 1
-            updated_students.append(f"{name}(第{drawn_records[name]}次)")
-        else:
-            drawn_records[name] = 1
-            updated_students.append(f"{name}(第1次)")
+    with _drawn_records_lock:
+        drawn_records = _load_drawn_records(file_path)
+        for name in students_to_add:
+            if name in drawn_records:
+                drawn_records[name] += 1
+                updated_students.append(f"{name}(第{drawn_records[name]}次)")
+            else:
+                drawn_records[name] = 1
+                updated_students.append(f"{name}(第1次)")
+
+        if updated_students:
+            _commit_drawn_records(file_path, drawn_records)
 
     if updated_students:
-        _save_drawn_records(file_path, drawn_records)
         logger.debug(f"已记录学生/小组: {', '.join(updated_students)}")
     else:
         logger.debug("没有新的学生需要记录")
 
 
 def _load_drawn_records(file_path: str) -> dict:
-    """从文件加载已抽取的学生记录
+    """从文件加载已抽取的学生记录（有尚未写盘的记录时返回其副本）
 
     Args:
         file_path: 记录文件路径
@@ -1967,6 +2063,11 @@ def _load_drawn_records(file_path: str) -> dict:
     Returns:
         已抽取的学生记录字典，键为学生名称，值为抽取次数
     """
+    with _drawn_records_lock:
+        entry = _pending_drawn_records.get(str(file_path))
+        if entry is not None:
+            return dict(entry[0])
+
     if not os.path.exists(file_path):
         return {}
 
@@ -2034,17 +2135,28 @@ def _extract_student_names(student_name) -> list:
 
 
 def _save_drawn_records(file_path: str, drawn_records: dict) -> None:
-    """保存已抽取的学生记录到文件
+    """保存已抽取的学生记录到文件（先写入临时文件再替换，写入中断不会损坏原文件）
 
     Args:
         file_path: 记录文件路径
         drawn_records: 已抽取的学生记录字典
+
+    Raises:
+        OSError: 写入失败
     """
+    temp_path = f"{file_path}.tmp"
     try:
-        with open(file_path, "w", encoding="utf-8") as file:
+        with open(temp_path, "w", encoding="utf-8") as file:
             json.dump(drawn_records, file, ensure_ascii=False, indent=2)
-    except IOError as e:
-        logger.exception(f"保存已抽取记录失败: {e}")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
 
 
 def read_drawn_record(class_name: str, gender: str, group: str) -> list:
@@ -2063,6 +2175,33 @@ def read_drawn_record(class_name: str, gender: str, group: str) -> list:
     return list(drawn_records.items())
 
 
+def _get_file_version(file_path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def get_drawn_record_version(
+    class_name: str, gender: str, group: str
+) -> Optional[Tuple]:
+    """获取已抽取记录文件的版本戳，记录写入或清除时版本戳随之变化
+
+    Args:
+        class_name: 班级名称
+        gender: 性别
+        group: 分组
+
+    Returns:
+        Optional[Tuple]: (mtime_ns, 文件大小)，有尚未写盘的记录时为 ("pending", 修订号)，
+            记录文件不存在时返回 None
+    """
+    return _get_drawn_records_version(
+        _get_roll_call_record_file_path(class_name, gender, group)
+    )
+
+
 def remove_record(class_name: str, gender: str, group: str, _prefix: str = "0") -> None:
     """清除已抽取记录
 
@@ -2085,23 +2224,29 @@ def remove_record(class_name: str, gender: str, group: str, _prefix: str = "0")
     if not temp_dir.exists():
         return
 
-    file_paths = []
-    if prefix == "restart":
-        file_paths = list(temp_dir.glob("roll_call_record__*.json"))
-    elif class_name and gender and group:
-        if prefix in ["all", "until"]:
-            file_paths = [_get_roll_call_record_file_path(class_name, gender, group)]
-
-    if not file_paths:
-        return
+    with _drawn_records_lock:
+        file_paths = []
+        if prefix == "restart":
+            _discard_pending_drawn_records(
+                lambda path: path.name.startswith("roll_call_record__")
+            )
+            file_paths = list(temp_dir.glob("roll_call_record__*.json"))
+        elif class_name and gender and group:
+            if prefix in ["all", "until"]:
+                record_path = _get_roll_call_record_file_path(class_name, gender, group)
+                _discard_pending_drawn_records(lambda path: path == record_path)
+                file_paths = [record_path]
+
+        if not file_paths:
+            return
 
-    try:
-        for file_path in file_paths:
-            if file_path.exists() and file_path.is_file():
-                file_path.unlink(missing_ok=True)
-                logger.info(f"已删除记录文件: {file_path.name}")
-    except OSError as e:
-        logger.exception(f"删除记录文件失败: {e}")
+        try:
+            for file_path in file_paths:
+                if file_path.exists() and file_path.is_file():
+                    file_path.unlink(missing_ok=True)
+                    logger.info(f"已删除记录文件: {file_path.name}")
+        except OSError as e:
+            logger.exception(f"删除记录文件失败: {e}")
 
 
 def reset_drawn_record(self, class_name: str, gender: str, group: str) -> None:
@@ -2145,17 +2290,19 @@ def clear_temp_draw_records() -> int:
     if not temp_dir.exists():
         return 0
 
-    file_paths = list(temp_dir.glob("roll_call_record__*.json")) + list(
-        temp_dir.glob("lottery_prize_record__*.json")
-    )
     deleted_count = 0
-    for file_path in file_paths:
-        try:
-            if file_path.exists() and file_path.is_file():
-                file_path.unlink(missing_ok=True)
-                deleted_count += 1
-        except OSError as e:
-            logger.exception(f"删除记录文件失败: {e}")
+    with _drawn_records_lock:
+        _discard_pending_drawn_records(lambda path: True)
+        file_paths = list(temp_dir.glob("roll_call_record__*.json")) + list(
+            temp_dir.glob("lottery_prize_record__*.json")
+        )
+        for file_path in file_paths:
+            try:
+                if file_path.exists() and file_path.is_file():
+                    file_path.unlink(missing_ok=True)
+                    deleted_count += 1
+            except OSError as e:
+                logger.exception(f"删除记录文件失败: {e}")
     if deleted_count:
         logger.info(f"已清除 {deleted_count} 个抽取临时记录文件")
     return deleted_count
@@ -2205,12 +2352,12 @@ def calculate_remaining_count(
                     excluded_count += 1
             return max(0, len(group_list) - excluded_count)
         else:
-            student_list = get_student_list(class_name)
+            student_list = get_student_list_view(class_name)
             excluded_count = 0
             for student in student_list:
                 student_name = (
                     student["name"]
-                    if isinstance(student, dict) and "name" in student
+                    if isinstance(student, Mapping) and "name" in student
                     else student
                 )
                 if (
@@ -2230,8 +2377,21 @@ def _get_lottery_prize_record_file_path(pool_name: str):
     )
 
 
+def get_drawn_prize_record_version(pool_name: str) -> Optional[Tuple]:
+    """获取已抽取奖品记录文件的版本戳
+
+    Args:
+        pool_name: 奖池名称
+
+    Returns:
+        Optional[Tuple]: (mtime_ns, 文件大小)，有尚未写盘的记录时为 ("pending", 修订号)，
+            记录文件不存在时返回 None
+    """
+    return _get_drawn_records_version(_get_lottery_prize_record_file_path(pool_name))
+
+
 def record_drawn_prize(pool_name: str, prize_names) -> None:
-    """记录已抽取的奖品
+    """记录已抽取的奖品（记录立即对读取可见，文件由后台写盘线程写入）
 
     Args:
         pool_name: 奖池名称
@@ -2239,14 +2399,15 @@ def record_drawn_prize(pool_name: str, prize_names) -> None:
     """
     file_path = _get_lottery_prize_record_file_path(pool_name)
     file_path.parent.mkdir(parents=True, exist_ok=True)
-    drawn_records = _load_drawn_records(file_path)
     names = _extract_student_names(prize_names)
-    for name in names:
-        if name in drawn_records:
-            drawn_records[name] += 1
-        else:
-            drawn_records[name] = 1
-    _save_drawn_records(file_path, drawn_records)
+    with _drawn_records_lock:
+        drawn_records = _load_drawn_records(file_path)
+        for name in names:
+            if name in drawn_records:
+                drawn_records[name] += 1
+            else:
+                drawn_records[name] = 1
+        _commit_drawn_records(file_path, drawn_records)
 
 
 def read_drawn_record_simple(pool_name: str) -> list:
@@ -2259,6 +2420,10 @@ def read_drawn_record_simple(pool_name: str) -> list:
         已抽取记录列表，每个元素为(名称, 次数)元组
     """
     file_path = _get_lottery_prize_record_file_path(pool_name)
+    with _drawn_records_lock:
+        entry = _pending_drawn_records.get(str(file_path))
+        if entry is not None:
+            return list(entry[0].items())
     if file_path.exists():
         try:
             with open(file_path, "r", encoding="utf-8") as file:
@@ -2290,11 +2455,13 @@ def delete_drawn_prize_record_files(pool_name: str) -> bool:
     """
     try:
         file_path = _get_lottery_prize_record_file_path(pool_name)
-        if file_path.exists() and file_path.is_file():
-            try:
-                file_path.unlink(missing_ok=True)
-            except OSError as e:
-                logger.error(f"删除文件{file_path}失败: {e}")
+        with _drawn_records_lock:
+            _discard_pending_drawn_records(lambda path: path == file_path)
+            if file_path.exists() and file_path.is_file():
+                try:
+                    file_path.unlink(missing_ok=True)
+                except OSError as e:
+                    logger.error(f"删除文件{file_path}失败: {e}")
         return True
     except Exception as e:
         logger.exception(f"重置奖池抽取记录失败: {e}")
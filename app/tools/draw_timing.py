@@ -0,0 +1,223 @@
+"""
+抽取流程分阶段耗时统计
+每次抽取按阶段记录耗时（单调时钟，纳秒），样本保存在环形缓冲区中，可按分位数汇总
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.tools.variable import DRAW_TIMING_BUFFER_SIZE
+
+# 每次抽取总耗时的阶段名
+TOTAL_STAGE = "total"
+
+# 汇总时计算的分位数
+PERCENTILES = (50, 90, 99)
+
+
+def nearest_rank_percentile(sorted_values: List[int], percentile: float) -> int:
+    """最近秩法计算分位数（sorted_values 非空且已排序）"""
+    rank = math.ceil(percentile / 100 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def ns_to_ms(value: float) -> float:
+    """纳秒转换为毫秒（保留 3 位小数）"""
+    return round(value / 1_000_000, 3)
+
+
+class DrawTimingRecorder:
+    """抽取耗时记录器
+
+    每个流程（如 roll_call、lottery）各自保留最近 capacity 次抽取的分阶段耗时。
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity: 每个流程保留的样本数
+        """
+        self.capacity = max(1, int(capacity))
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+
+    def record(
+        self,
+        pipeline: str,
+        stages: List[Tuple[str, int]],
+        total_ns: int,
+        failed: bool = False,
+    ) -> None:
+        """记录一次抽取
+
+        Args:
+            pipeline: 流程名称
+            stages: 按执行顺序排列的 (阶段名, 耗时纳秒)
+            total_ns: 总耗时（纳秒）
+            failed: 抽取过程中是否抛出异常
+        """
+        sample = {
+            "time": time.time(),
+            "stages": list(stages),
+            "total_ns": int(total_ns),
+            "failed": failed,
+        }
+        with self._lock:
+            buffer = self._samples.get(pipeline)
+            if buffer is None:
+                buffer = self._samples[pipeline] = deque(maxlen=self.capacity)
+            buffer.append(sample)
+
+    def pipelines(self) -> List[str]:
+        """已记录过的流程名称"""
+        with self._lock:
+            return list(self._samples)
+
+    def samples(self, pipeline: str) -> List[Dict[str, Any]]:
+        """获取流程的全部样本（从旧到新）"""
+        with self._lock:
+            return [
+                {**sample, "stages": list(sample["stages"])}
+                for sample in self._samples.get(pipeline, ())
+            ]
+
+    def clear(self, pipeline: Optional[str] = None) -> None:
+        """清除样本
+
+        Args:
+            pipeline: 流程名称，为 None 时清除全部
+        """
+        with self._lock:
+            if pipeline is None:
+                self._samples.clear()
+            else:
+                self._samples.pop(pipeline, None)
+
+    @staticmethod
+    def _summarize(values: List[int]) -> Dict[str, Any]:
+        values = sorted(values)
+        summary = {
+            "count": len(values),
+            "mean_ms": ns_to_ms(sum(values) / len(values)),
+        }
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}_ms"] = ns_to_ms(
+                nearest_rank_percentile(values, percentile)
+            )
+        summary["max_ms"] = ns_to_ms(values[-1])
+        return summary
+
+    def stats(self, pipeline: Optional[str] = None) -> Dict[str, Any]:
+        """按阶段汇总耗时
+
+        Args:
+            pipeline: 流程名称，为 None 时汇总全部流程
+
+        Returns:
+            Dict[str, Any]: 流程名称到汇总结果的映射，汇总结果包含样本数、
+                各阶段（按首次出现顺序，最后为 total）的平均值、分位数与最大值（毫秒）
+                以及最近一次抽取的各阶段耗时
+        """
+        names = [pipeline] if pipeline is not None else self.pipelines()
+        result = {}
+        for name in names:
+            samples = self.samples(name)
+            if not samples:
+                continue
+
+            stage_values: Dict[str, List[int]] = {}
+            for sample in samples:
+                for stage, elapsed in sample["stages"]:
+                    stage_values.setdefault(stage, []).append(elapsed)
+            stage_values[TOTAL_STAGE] = [sample["total_ns"] for sample in samples]
+
+            last = samples[-1]
+            result[name] = {
+                "count": len(samples),
+                "capacity": self.capacity,
+                "failed": sum(1 for sample in samples if sample["failed"]),
+                "stages": {
+                    stage: self._summarize(values)
+                    for stage, values in stage_values.items()
+                },
+                "last": {
+                    **{stage: ns_to_ms(elapsed) for stage, elapsed in last["stages"]},
+                    TOTAL_STAGE: ns_to_ms(last["total_ns"]),
+                },
+            }
+        return result
+
+
+draw_timing = DrawTimingRecorder(DRAW_TIMING_BUFFER_SIZE)
+
+
+class DrawTrace:
+    """单次抽取的分阶段计时
+
+    用法：
+        with DrawTrace("roll_call") as trace:
+            ...
+            trace.mark("candidates")  # 记录上一个标记点到此处的耗时
+            ...
+
+    离开 with 块（包括提前 return 或异常）时写入记录器。
+    """
+
+    __slots__ = ("pipeline", "recorder", "stages", "_start", "_last", "_finished")
+
+    def __init__(self, pipeline: str, recorder: Optional[DrawTimingRecorder] = None):
+        """
+        Args:
+            pipeline: 流程名称
+            recorder: 耗时记录器，默认为全局 draw_timing
+        """
+        self.pipeline = pipeline
+        self.recorder = recorder if recorder is not None else draw_timing
+        self.stages: List[Tuple[str, int]] = []
+        self._start = self._last = time.perf_counter_ns()
+        self._finished = False
+
+    def mark(self, stage: str) -> None:
+        """结束一个阶段，记录自上一个标记点以来的耗时"""
+        now = time.perf_counter_ns()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def finish(self, failed: bool = False) -> None:
+        """写入本次抽取的耗时（重复调用无效）"""
+        if self._finished:
+            return
+        self._finished = True
+        total = time.perf_counter_ns() - self._start
+        self.recorder.record(self.pipeline, self.stages, total, failed)
+
+    def __enter__(self) -> "DrawTrace":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.finish(failed=exc_type is not None)
+
+
+def get_draw_timing_stats(pipeline: Optional[str] = None) -> Dict[str, Any]:
+    """获取抽取流程分阶段耗时统计
+
+    Args:
+        pipeline: 流程名称（roll_call、roll_call_finalize、lottery、lottery_finalize），
+            为 None 时返回全部流程
+
+    Returns:
+        Dict[str, Any]: 见 DrawTimingRecorder.stats
+    """
+    return draw_timing.stats(pipeline)
+
+
+def reset_draw_timing_stats(pipeline: Optional[str] = None) -> None:
+    """清除抽取耗时样本
+
+    Args:
+        pipeline: 流程名称，为 None 时清除全部
+    """
+    draw_timing.clear(pipeline)
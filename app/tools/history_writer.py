@@ -0,0 +1,212 @@
+"""
+历史记录后台写入
+抽取结果先应用到内存中的数据，写盘任务交给单个后台线程按提交顺序依次执行；
+退出前调用 flush_history_writes 写完队列中剩余的任务
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+from app.tools.draw_timing import (
+    PERCENTILES,
+    nearest_rank_percentile,
+    ns_to_ms,
+)
+from app.tools.variable import (
+    HISTORY_WRITER_FLUSH_TIMEOUT_S,
+    HISTORY_WRITER_LATENCY_BUFFER_SIZE,
+)
+
+
+class HistoryWriter:
+    """历史记录写盘线程
+
+    任务按 submit 的顺序在同一线程中执行，前一个任务完成后才执行下一个，
+    因此同一文件的多次写入总是按抽取顺序落盘。
+    失败的任务（抛出异常）记录错误日志后保留，在下次 submit 或 flush 时排在新任务之前重试；
+    任务需自行保证重试时仍按顺序写入（例如每次都写出该文件全部尚未写入的内容）。
+    """
+
+    def __init__(self, capacity: int = HISTORY_WRITER_LATENCY_BUFFER_SIZE):
+        """
+        Args:
+            capacity: 保留的提交耗时样本数
+        """
+        self._condition = threading.Condition()
+        self._queue: deque = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._submitted = 0
+        self._finished = 0
+        self._failed = 0
+        self._max_depth = 0
+        # 等待重试的失败任务 (名称, 任务)
+        self._retry: deque = deque()
+        # (提交到写盘完成的耗时, 任务本身的执行耗时)，单位纳秒
+        self._latencies: deque = deque(maxlen=max(1, int(capacity)))
+
+    def submit(self, name: str, task: Callable[[], Any]) -> int:
+        """提交写盘任务
+
+        Args:
+            name: 任务名称（用于日志）
+            task: 在写盘线程中执行的函数
+
+        Returns:
+            int: 任务序号，从 1 开始递增
+        """
+        with self._condition:
+            self._requeue_failed()
+            self._submitted += 1
+            self._queue.append((name, task, time.perf_counter_ns()))
+            self._max_depth = max(self._max_depth, self._pending_count())
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="HistoryWriter", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify_all()
+            return self._submitted
+
+    def _requeue_failed(self) -> None:
+        # 把失败的任务重新放回队列（调用方需持有 _condition）
+        while self._retry:
+            name, task = self._retry.popleft()
+            self._submitted += 1
+            self._queue.append((name, task, time.perf_counter_ns()))
+
+    def _pending_count(self) -> int:
+        # 尚未完成的任务数（包括正在执行的任务，调用方需持有 _condition）
+        return self._submitted - self._finished
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                name, task, submitted_ns = self._queue.popleft()
+
+            started_ns = time.perf_counter_ns()
+            failed = False
+            try:
+                task()
+            except Exception as e:
+                failed = True
+                logger.exception(f"历史记录写入失败 {name}: {e}")
+            finished_ns = time.perf_counter_ns()
+
+            with self._condition:
+                self._finished += 1
+                if failed:
+                    self._failed += 1
+                    self._retry.append((name, task))
+                self._latencies.append(
+                    (finished_ns - submitted_ns, finished_ns - started_ns)
+                )
+                self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """重试失败的任务，并等待调用时已提交的任务全部执行完
+
+        Args:
+            timeout: 最长等待秒数，为 None 时一直等待
+
+        Returns:
+            bool: 是否在超时前全部写入成功（仍有失败的任务时返回 False）
+        """
+        if threading.current_thread() is self._thread:
+            # 在写盘线程中等待自己会死锁，此时之前的任务必然已经完成
+            return True
+        with self._condition:
+            if self._retry:
+                self._requeue_failed()
+                self._condition.notify_all()
+            target = self._submitted
+            done = self._condition.wait_for(
+                lambda: self._finished >= target, timeout=timeout
+            )
+            return done and not self._retry
+
+    def queue_depth(self) -> int:
+        """尚未完成的写盘任务数"""
+        with self._condition:
+            return self._pending_count()
+
+    def failed_count(self) -> int:
+        """等待重试的失败任务数"""
+        with self._condition:
+            return len(self._retry)
+
+    @staticmethod
+    def _summarize(values) -> Dict[str, Any]:
+        values = sorted(values)
+        if not values:
+            return {"count": 0}
+        summary = {
+            "count": len(values),
+            "mean_ms": ns_to_ms(sum(values) / len(values)),
+        }
+        for percentile in PERCENTILES:
+            summary[f"p{percentile}_ms"] = ns_to_ms(
+                nearest_rank_percentile(values, percentile)
+            )
+        summary["max_ms"] = ns_to_ms(values[-1])
+        return summary
+
+    def stats(self) -> Dict[str, Any]:
+        """汇总写盘统计
+
+        Returns:
+            Dict[str, Any]: 当前与最大队列深度、已提交/已完成/失败（含重试）任务数、
+                等待重试的任务数，
+                以及最近任务从提交到写盘完成的耗时（commit_latency）
+                与写盘本身的耗时（write_time）的平均值、分位数与最大值（毫秒）
+        """
+        with self._condition:
+            latencies = list(self._latencies)
+            return {
+                "queue_depth": self._pending_count(),
+                "max_queue_depth": self._max_depth,
+                "submitted": self._submitted,
+                "committed": self._finished - self._failed,
+                "failed": self._failed,
+                "retry_pending": len(self._retry),
+                "commit_latency": self._summarize(commit for commit, _ in latencies),
+                "write_time": self._summarize(write for _, write in latencies),
+            }
+
+
+history_writer = HistoryWriter()
+
+
+def flush_history_writes(
+    timeout: Optional[float] = HISTORY_WRITER_FLUSH_TIMEOUT_S,
+) -> bool:
+    """等待尚未写盘的历史记录与已抽取记录全部写入（退出前调用）
+
+    Args:
+        timeout: 最长等待秒数，为 None 时一直等待
+
+    Returns:
+        bool: 是否全部写入
+    """
+    if history_writer.flush(timeout):
+        return True
+    logger.error(
+        f"历史记录写入未完成：{history_writer.queue_depth()} 个任务等待中，"
+        f"{history_writer.failed_count()} 个任务写入失败"
+    )
+    return False
+
+
+def get_history_writer_stats() -> Dict[str, Any]:
+    """获取历史记录后台写入统计（见 HistoryWriter.stats）"""
+    return history_writer.stats()
+
+
+# 兜底：正常解释器退出时写完剩余任务（os._exit 不会触发，需显式调用 flush_history_writes）
+atexit.register(flush_history_writes)
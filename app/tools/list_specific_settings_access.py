@@ -1,9 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import copy
+import threading
+from typing import Any, Dict, Optional, Tuple
 
 from app.tools.settings_access import readme_settings_async, update_settings
 from app.tools.settings_access import get_safe_font_size
+from app.tools.settings_access import get_settings_group, get_settings_signals
+
+
+# (基础设置组, 列表设置组, 列表名) -> (版本, 合并后的设置视图)
+_overlay_cache: Dict[Tuple[str, str, str], Tuple[Tuple, Dict[str, Any]]] = {}
+_overlay_lock = threading.Lock()
 
 
 def _safe_dict(value: Any) -> Dict[str, Any]:
@@ -14,6 +22,51 @@ def _get_overrides_map(settings_group: str) -> Dict[str, Any]:
     return _safe_dict(readme_settings_async(settings_group, "overrides", {}))
 
 
+def invalidate_list_specific_cache(settings_group: Optional[str] = None) -> None:
+    """清除列表专属设置的合并视图缓存
+
+    Args:
+        settings_group: 只清除涉及该设置组的缓存，为 None 时全部清除
+    """
+    with _overlay_lock:
+        if settings_group is None:
+            _overlay_cache.clear()
+            return
+        for cache_key in list(_overlay_cache):
+            if settings_group in cache_key[:2]:
+                _overlay_cache.pop(cache_key, None)
+
+
+def _on_setting_changed(first_level_key: str, second_level_key: str, value: Any):
+    invalidate_list_specific_cache(first_level_key)
+
+
+get_settings_signals().settingChanged.connect(_on_setting_changed)
+
+
+def _get_resolved_overlay(
+    base_settings_group: str, list_settings_group: str, list_name: str
+) -> Dict[str, Any]:
+    """获取列表的合并设置视图（全局设置 + 列表覆盖项），设置组版本变化时重新计算"""
+    base_settings = get_settings_group(base_settings_group)
+    list_settings = get_settings_group(list_settings_group)
+    version = (base_settings.version, list_settings.version)
+    cache_key = (base_settings_group, list_settings_group, list_name)
+
+    with _overlay_lock:
+        cached = _overlay_cache.get(cache_key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    overlay = {key: base_settings[key] for key in base_settings}
+    overrides = _safe_dict(list_settings.get("overrides"))
+    overlay.update(_safe_dict(overrides.get(list_name)))
+
+    with _overlay_lock:
+        _overlay_cache[cache_key] = (version, overlay)
+    return overlay
+
+
 def get_list_specific_setting(
     base_settings_group: str,
     list_settings_group: str,
@@ -24,12 +77,11 @@ def get_list_specific_setting(
     if not list_name:
         return readme_settings_async(base_settings_group, key, default)
 
-    overrides = _get_overrides_map(list_settings_group)
-    list_overrides = _safe_dict(overrides.get(list_name))
-    if key in list_overrides:
-        return list_overrides.get(key)
-
-    return readme_settings_async(base_settings_group, key, default)
+    overlay = _get_resolved_overlay(base_settings_group, list_settings_group, list_name)
+    value = overlay.get(key)
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
 
 
 def set_list_specific_setting(
@@ -43,6 +95,7 @@ def set_list_specific_setting(
     list_overrides[key] = value
     overrides[list_name] = list_overrides
     update_settings(list_settings_group, "overrides", overrides)
+    invalidate_list_specific_cache(list_settings_group)
 
 
 def set_list_specific_setting_with_global_fallback(
@@ -72,6 +125,7 @@ def set_list_specific_setting_with_global_fallback(
         overrides.pop(list_name, None)
 
     update_settings(list_settings_group, "overrides", overrides)
+    invalidate_list_specific_cache(list_settings_group)
 
 
 def clear_list_specific_overrides(list_settings_group: str, list_name: str) -> None:
@@ -83,6 +137,7 @@ def clear_list_specific_overrides(list_settings_group: str, list_name: str) -> N
         return
     overrides.pop(list_name, None)
     update_settings(list_settings_group, "overrides", overrides)
+    invalidate_list_specific_cache(list_settings_group)
 
 
 def get_safe_font_size_list_specific(
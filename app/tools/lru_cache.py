@@ -0,0 +1,129 @@
+"""
+带版本戳的有界 LRU 缓存
+用于缓存由文件内容派生的数据，文件变化（版本戳变化）时自动失效
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class VersionedLRUCache:
+    """带版本戳的有界 LRU 缓存
+
+    每个条目保存写入时的版本戳，读取时版本戳不一致视为未命中并丢弃；
+    条目数超过上限时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, max_entries: int, name: str = ""):
+        """
+        Args:
+            max_entries: 最大条目数
+            name: 缓存名称（用于统计信息）
+        """
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: Any = None, default: Any = None) -> Any:
+        """读取缓存
+
+        Args:
+            key: 缓存键
+            version: 当前版本戳
+            default: 未命中时的返回值
+
+        Returns:
+            Any: 缓存值，未命中或版本不一致时返回 default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, version: Any = None) -> None:
+        """写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            version: 数据对应的版本戳
+        """
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(
+        self, key: Hashable, version: Any, factory: Callable[[], Any]
+    ) -> Any:
+        """读取缓存，未命中时调用 factory 生成并写入
+
+        Args:
+            key: 缓存键
+            version: 当前版本戳
+            factory: 生成缓存值的函数
+
+        Returns:
+            Any: 缓存值
+        """
+        missing = object()
+        value = self.get(key, version, missing)
+        if value is missing:
+            value = factory()
+            self.put(key, value, version)
+        return value
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """使缓存失效
+
+        Args:
+            predicate: 判断键是否需要失效的函数，为 None 时清除全部
+
+        Returns:
+            int: 被清除的条目数
+        """
+        with self._lock:
+            if predicate is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def discard(self, key: Hashable) -> None:
+        """移除单个条目"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
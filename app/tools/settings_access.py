@@ -7,16 +7,360 @@ from PySide6.QtWidgets import *
 from PySide6.QtCore import *
 from PySide6.QtNetwork import *
 
+import os
+import copy
+import atexit
 import json
 import asyncio
+import tempfile
+import threading
 import uuid
+import dataclasses
+from collections.abc import Iterable, Iterator, Mapping
 from loguru import logger
-from typing import Any
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
 
 from app.tools.variable import *
 from app.tools.path_utils import *
 from app.tools.settings_default import *
 
+_ViewT = TypeVar("_ViewT")
+
+
+# ==================================================
+# 设置缓存
+# ==================================================
+class SettingsStore:
+    """进程级设置缓存
+
+    设置文件只解析一次，读取直接命中内存字典；
+    仅当文件的 mtime/大小 发生变化（被外部改写）或本进程写入时才更新。
+    写入先落到内存，短时间窗口内的多次修改合并后由后台线程一次性原子写盘。
+    """
+
+    def __init__(self, write_delay_ms: int = SETTINGS_WRITE_DELAY_MS):
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._data: dict = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._loaded = False
+        self._load_failed = False
+        self._pending: Dict[Tuple[str, str], Any] = {}
+        self._flush_timer: Optional[threading.Timer] = None
+        self._write_delay = max(0, write_delay_ms) / 1000
+        self._generation = 0
+        self._group_versions: Dict[str, int] = {}
+        self._group_snapshots: Dict[str, "SettingsSnapshot"] = {}
+
+    @staticmethod
+    def _stat(path) -> Optional[Tuple[int, int]]:
+        """获取文件的 (mtime_ns, size)，文件不存在时返回 None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _reload(self, path, stamp: Optional[Tuple[int, int]]) -> None:
+        """从磁盘重新解析设置文件，并重新应用尚未写盘的修改"""
+        self._data = {}
+        self._load_failed = False
+        self._generation += 1
+        self._group_snapshots.clear()
+        if stamp is not None:
+            try:
+                with open_file(path, "r", encoding="utf-8") as f:
+                    content = f.read()
+                if not content or not content.strip():
+                    logger.warning(f"设置文件为空: {path}")
+                    self._load_failed = True
+                else:
+                    data = json.loads(content)
+                    if isinstance(data, dict):
+                        self._data = data
+                    else:
+                        self._load_failed = True
+            except Exception as e:
+                logger.exception(f"读取设置文件失败: {e}")
+                self._load_failed = True
+        for (first_level_key, second_level_key), value in self._pending.items():
+            self._apply(first_level_key, second_level_key, value)
+        self._stamp = stamp
+        self._loaded = True
+
+    def _ensure_fresh(self) -> None:
+        """校验文件戳，文件变化时重新加载（调用方需持有锁）"""
+        path = get_settings_path()
+        stamp = self._stat(path)
+        if not self._loaded or stamp != self._stamp:
+            self._reload(path, stamp)
+
+    def _apply(self, first_level_key: str, second_level_key: str, value: Any) -> None:
+        """将修改应用到内存文档（调用方需持有锁）"""
+        group = self._data.get(first_level_key)
+        if not isinstance(group, dict):
+            group = {}
+            self._data[first_level_key] = group
+        group[second_level_key] = value
+        self._group_versions[first_level_key] = (
+            self._group_versions.get(first_level_key, 0) + 1
+        )
+        self._group_snapshots.pop(first_level_key, None)
+
+    def group_version(self, first_level_key: str) -> Tuple[int, int]:
+        """获取设置分组的版本号，分组内任一设置变化或文件重新加载后版本号都会改变"""
+        with self._lock:
+            self._ensure_fresh()
+            return (self._generation, self._group_versions.get(first_level_key, 0))
+
+    def get_group(self, first_level_key: str) -> "SettingsSnapshot":
+        """获取整个设置分组（已合并默认值）的只读快照，版本未变时复用缓存"""
+        with self._lock:
+            self._ensure_fresh()
+            snapshot = self._group_snapshots.get(first_level_key)
+            if snapshot is not None:
+                return snapshot
+
+            values = {}
+            defaults = get_default_settings().get(first_level_key, {})
+            for second_level_key, setting_info in defaults.items():
+                if isinstance(setting_info, dict) and "default_value" in setting_info:
+                    values[second_level_key] = setting_info["default_value"]
+                else:
+                    values[second_level_key] = setting_info
+            group = self._data.get(first_level_key)
+            if isinstance(group, dict):
+                values.update(group)
+
+            snapshot = SettingsSnapshot(
+                first_level_key,
+                (self._generation, self._group_versions.get(first_level_key, 0)),
+                copy.deepcopy(values),
+            )
+            self._group_snapshots[first_level_key] = snapshot
+            return snapshot
+
+    def get(self, first_level_key: str, second_level_key: str) -> Tuple[bool, Any]:
+        """读取设置值
+
+        Returns:
+            Tuple[bool, Any]: (是否存在于设置文件中, 设置值的副本)
+        """
+        with self._lock:
+            self._ensure_fresh()
+            group = self._data.get(first_level_key)
+            if not isinstance(group, dict) or second_level_key not in group:
+                return False, None
+            value = group[second_level_key]
+        # 可变对象返回副本，避免调用方修改污染缓存
+        if isinstance(value, (dict, list)):
+            return True, copy.deepcopy(value)
+        return True, value
+
+    def set(self, first_level_key: str, second_level_key: str, value: Any) -> None:
+        """写入设置值，实际写盘由后台线程延迟合并执行"""
+        with self._lock:
+            self._ensure_fresh()
+            if self._load_failed:
+                raise ValueError(f"设置文件无法解析，拒绝覆盖: {get_settings_path()}")
+            value = copy.deepcopy(value)
+            self._apply(first_level_key, second_level_key, value)
+            self._pending[(first_level_key, second_level_key)] = value
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """安排一次延迟写盘，窗口内的后续修改会合并到同一次写入（调用方需持有锁）"""
+        if self._flush_timer is not None:
+            return
+        timer = threading.Timer(self._write_delay, self.flush)
+        timer.daemon = True
+        self._flush_timer = timer
+        timer.start()
+
+    def has_pending_changes(self) -> bool:
+        """是否存在尚未写盘的修改"""
+        with self._lock:
+            return bool(self._pending)
+
+    def flush(self) -> bool:
+        """将尚未写盘的修改原子写入设置文件
+
+        Returns:
+            bool: 写入是否成功（无待写入修改时返回 True）
+        """
+        with self._write_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._pending:
+                    return True
+                self._ensure_fresh()
+                if self._load_failed:
+                    logger.error("设置文件无法解析，放弃写入缓存中的修改")
+                    self._pending.clear()
+                    return False
+                pending = self._pending
+                self._pending = {}
+                payload = json.dumps(self._data, ensure_ascii=False, indent=4)
+
+            path = get_settings_path()
+            try:
+                ensure_dir(path.parent)
+                replaced = self._write_atomic(path, payload)
+            except Exception as e:
+                logger.exception(f"设置写入失败: {e}")
+                with self._lock:
+                    for key, value in pending.items():
+                        self._pending.setdefault(key, value)
+                    self._schedule_flush()
+                return False
+
+            with self._lock:
+                if replaced:
+                    self._stamp = self._stat(path)
+            return True
+
+    def _write_atomic(self, path, payload: str) -> bool:
+        """先写入同目录临时文件再替换，避免写入中断导致设置文件损坏
+
+        Returns:
+            bool: 是否通过替换写入（False 表示降级为直接覆盖写入）
+        """
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent)
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                os.replace(tmp_path, path)
+                return True
+            except PermissionError:
+                # Windows 下目标文件被占用时替换会失败，降级为直接覆盖写入；
+                # 持有锁写入，避免其他线程读到写了一半的文件；
+                # 覆盖写入后文件戳不一定变化，下次读取时强制重新加载
+                with self._lock:
+                    with open_file(path, "w", encoding="utf-8") as f:
+                        f.write(payload)
+                    self._loaded = False
+                    self._stamp = None
+                return False
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def invalidate(self) -> None:
+        """丢弃缓存，下次读取时重新解析设置文件"""
+        with self._lock:
+            self._loaded = False
+            self._stamp = None
+            self._data = {}
+            self._group_snapshots.clear()
+
+
+class SettingsSnapshot(Mapping):
+    """设置分组的只读快照
+
+    包含分组内所有设置项（文件中的值覆盖默认值），读取容器类型的值时返回副本。
+    通过 version / is_stale() 判断快照是否已过期。
+    """
+
+    __slots__ = ("group", "version", "_values")
+
+    def __init__(self, group: str, version: Tuple[int, int], values: Dict[str, Any]):
+        self.group = group
+        self.version = version
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._values[key]
+        if isinstance(value, (dict, list)):
+            return copy.deepcopy(value)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"SettingsSnapshot({self.group!r}, version={self.version})"
+
+    def is_stale(self) -> bool:
+        """快照对应的设置分组是否已发生变化"""
+        return _settings_store.group_version(self.group) != self.version
+
+
+_settings_store = SettingsStore()
+
+
+def get_settings_store() -> SettingsStore:
+    """获取全局设置缓存实例"""
+    return _settings_store
+
+
+def invalidate_settings_cache() -> None:
+    """使设置缓存失效（外部直接改写设置文件后调用）"""
+    _settings_store.invalidate()
+
+
+def get_settings_group(
+    first_level_key: str, keys: Optional[Iterable[str]] = None
+) -> SettingsSnapshot:
+    """一次性读取整个设置分组
+
+    Args:
+        first_level_key: 第一层的键（设置分组名）
+        keys: 只保留的第二层键，为 None 时返回整个分组
+
+    Returns:
+        SettingsSnapshot: 已合并默认值的只读快照
+    """
+    snapshot = _settings_store.get_group(first_level_key)
+    if keys is None:
+        return snapshot
+    values = {key: snapshot._values[key] for key in keys if key in snapshot._values}
+    return SettingsSnapshot(first_level_key, snapshot.version, values)
+
+
+def get_settings_view(first_level_key: str, view_type: Type[_ViewT]) -> _ViewT:
+    """将设置分组读取为类型化视图
+
+    view_type 为 dataclass，字段名对应第二层的键；
+    分组中不存在或值为 None 的字段使用 dataclass 中定义的默认值。
+
+    Args:
+        first_level_key: 第一层的键（设置分组名）
+        view_type: 视图 dataclass 类型
+
+    Returns:
+        view_type 的实例
+    """
+    snapshot = _settings_store.get_group(first_level_key)
+    kwargs = {}
+    for field in dataclasses.fields(view_type):
+        value = snapshot.get(field.name)
+        if value is not None:
+            kwargs[field.name] = value
+    return view_type(**kwargs)
+
+
+def flush_settings() -> bool:
+    """立即将尚未写盘的设置修改写入设置文件（退出前或外部改写设置文件前调用）
+
+    Returns:
+        bool: 写入是否成功
+    """
+    return _settings_store.flush()
+
+
+# 兜底：正常解释器退出时写入剩余修改（os._exit 不会触发，需显式调用 flush_settings）
+atexit.register(flush_settings)
+
 
 # ==================================================
 # 设置访问函数
@@ -43,21 +387,10 @@ class SettingsReaderWorker(QObject):
             self.finished.emit(default_value)
 
     def _read_setting_value(self):
-        """从设置文件或默认设置中读取值"""
-        settings_path = get_settings_path()
-        if file_exists(settings_path):
-            try:
-                with open_file(settings_path, "r", encoding="utf-8") as f:
-                    settings_data = json.load(f)
-                    if (
-                        self.first_level_key in settings_data
-                        and self.second_level_key in settings_data[self.first_level_key]
-                    ):
-                        return settings_data[self.first_level_key][
-                            self.second_level_key
-                        ]
-            except (json.JSONDecodeError, KeyError):
-                pass
+        """从设置缓存或默认设置中读取值"""
+        found, value = _settings_store.get(self.first_level_key, self.second_level_key)
+        if found:
+            return value
         return self._get_default_value()
 
     def _get_default_value(self):
@@ -143,21 +476,10 @@ def readme_settings(first_level_key: str, second_level_key: str):
         返回设置值
     """
     try:
-        settings_path = get_settings_path()
-        if file_exists(settings_path):
-            with open_file(settings_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                if not content or not content.strip():
-                    logger.warning(f"设置文件为空: {settings_path}")
-                else:
-                    settings_data = json.loads(content)
-                    if (
-                        first_level_key in settings_data
-                        and second_level_key in settings_data[first_level_key]
-                    ):
-                        value = settings_data[first_level_key][second_level_key]
-                        # logger.debug(f"从设置文件读取: {first_level_key}.{second_level_key} = {value}")
-                        return value
+        found, value = _settings_store.get(first_level_key, second_level_key)
+        if found:
+            # logger.debug(f"从设置缓存读取: {first_level_key}.{second_level_key} = {value}")
+            return value
 
         default_setting = _get_default_setting(first_level_key, second_level_key)
         if isinstance(default_setting, dict) and "default_value" in default_setting:
@@ -221,28 +543,8 @@ def update_settings(first_level_key: str, second_level_key: str, value: Any):
         bool: 更新是否成功
     """
     try:
-        # 获取设置文件路径
-        settings_path = get_settings_path()
-
-        # 确保设置目录存在
-        ensure_dir(settings_path.parent)
-
-        # 读取现有设置
-        settings_data = {}
-        if file_exists(settings_path):
-            with open_file(settings_path, "r", encoding="utf-8") as f:
-                settings_data = json.load(f)
-
-        # 更新设置
-        if first_level_key not in settings_data:
-            settings_data[first_level_key] = {}
-
-        # 直接保存值，不保存嵌套结构
-        settings_data[first_level_key][second_level_key] = value
-
-        # 写入设置文件
-        with open_file(settings_path, "w", encoding="utf-8") as f:
-            json.dump(settings_data, f, ensure_ascii=False, indent=4)
+        # 更新内存中的设置，写盘由后台线程合并执行
+        _settings_store.set(first_level_key, second_level_key, value)
 
         if not (
             first_level_key == "user_info"
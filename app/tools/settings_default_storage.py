@@ -378,6 +378,7 @@ DEFAULT_SETTINGS = {
         "select_weight": {"default_value": False},
         "show_lottery_history": {"default_value": True},
         "select_pool_name": {"default_value": 0},
+        "history_storage_backend": {"default_value": 0},
     },
     "roll_call_history_table": {
         "select_class_name": {"default_value": 0},
@@ -402,6 +403,7 @@ DEFAULT_SETTINGS = {
         "fair_draw_group": {"default_value": True},
         "fair_draw_gender": {"default_value": True},
         "fair_draw_time": {"default_value": False},
+        "group_proportional_draw": {"default_value": False},
         "base_weight": {"default_value": 1.00},
         "min_weight": {"default_value": 0.50},
         "max_weight": {"default_value": 5.00},
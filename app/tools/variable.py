@@ -96,6 +96,7 @@ DONATION_URL = "https://afdian.com/a/lzy0983"  # 捐赠链接
 # -------------------- 文件系统配置 --------------------
 DEFAULT_SETTINGS_FILENAME = "settings.json"  # 默认设置文件名
 DEFAULT_FILE_ENCODING = "utf-8"  # 默认文件编码
+SETTINGS_WRITE_DELAY_MS = 300  # 设置修改合并写盘的延迟窗口（毫秒）
 
 # -------------------- 路径常量 --------------------
 # 日志路径
@@ -310,6 +311,22 @@ FONT_APPLY_DELAY = 0  # 字体应用延迟时间(毫秒)
 APPLY_DELAY = 0  # 应用延迟时间(毫秒)
 EXIT_CODE_RESTART = 1000  # 重启应用程序的退出代码
 
+# -------------------- 抽取缓存配置 --------------------
+CANDIDATE_CACHE_MAX_ENTRIES = 64  # 候选人缓存最大条目数
+DRAWN_RECORD_CACHE_MAX_ENTRIES = 64  # 已抽取记录缓存最大条目数
+HISTORY_DATA_CACHE_MAX_ENTRIES = 16  # 历史记录数据缓存最大条目数（班级/奖池数）
+
+# -------------------- 抽取耗时统计配置 --------------------
+DRAW_TIMING_BUFFER_SIZE = 256  # 每个抽取流程保留的耗时样本数（环形缓冲区容量）
+
+# -------------------- 抽取动画配置 --------------------
+ANIMATION_FRAME_BUFFER_SIZE = 8  # 动画期间预生成的帧数
+
+# -------------------- 历史记录日志配置 --------------------
+HISTORY_JOURNAL_COMPACT_THRESHOLD = 50  # 追加日志累计多少条后在后台并入快照
+HISTORY_WRITER_LATENCY_BUFFER_SIZE = 256  # 后台写盘线程保留的提交耗时样本数
+HISTORY_WRITER_FLUSH_TIMEOUT_S = 10  # 退出时等待剩余写盘任务的最长秒数
+
 # -------------------- 设置页面预热配置 --------------------
 SETTINGS_WARMUP_INTERVAL_MS = 800  # 后台预热设置页面的默认时间间隔（毫秒）
 SETTINGS_WARMUP_MAX_PRELOAD = 1  # 后台预热设置页面的默认最大预热页数
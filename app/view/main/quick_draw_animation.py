@@ -51,6 +51,7 @@ class QuickDrawAnimation(QObject):
         self.final_ipc_selected_students = None
         self.final_group_filter = None
         self.final_gender_filter = None
+        self.final_draw_result = None
         self.active_class_name = None
 
     def _get_default_filters(self):
@@ -143,6 +144,7 @@ class QuickDrawAnimation(QObject):
         self.final_ipc_selected_students = result.get("ipc_selected_students")
         self.final_group_filter = result["group_filter"]
         self.final_gender_filter = result["gender_filter"]
+        self.final_draw_result = result.get("draw_result")
 
     def _sync_final_result_to_widget(self):
         self.roll_call_widget.final_selected_students = self.final_selected_students
@@ -391,6 +393,7 @@ class QuickDrawAnimation(QObject):
 
             self.final_selected_students = self._build_selected_students(students)
             self.final_selected_students_dict = []
+            self.final_draw_result = None
             tags_by_id = getattr(self.roll_call_widget.manager, "tags_by_id", {}) or {}
             for s in students or []:
                 try:
@@ -587,6 +590,7 @@ class QuickDrawAnimation(QObject):
                 gender_filter=self.final_gender_filter,
                 group_filter=self.final_group_filter,
                 half_repeat=half_repeat,
+                draw_result=self.final_draw_result,
             )
 
         except Exception as e:
@@ -1,8 +1,6 @@
 # ==================================================
 # 导入库
 # ==================================================
-import json
-
 from loguru import logger
 from PySide6.QtWidgets import *
 from PySide6.QtGui import *
@@ -19,7 +17,6 @@ from app.Language.obtain_language import *
 from app.common.history import *
 from app.common.history.history_reader import (
     get_lottery_pool_list,
-    get_lottery_history_data,
     get_lottery_prizes_data,
     get_lottery_session_data,
     get_lottery_prize_stats_data,
@@ -394,9 +391,9 @@ class lottery_history_table(GroupHeaderCardWidget):
             # 如果是第一次加载（current_row == 0），获取并排序数据
             if self.current_row == 0:
                 cleaned_lotterys = get_lottery_pool_list(self.current_pool_name)
-                history_data = get_lottery_history_data(self.current_pool_name)
-
-                lotterys_data = get_lottery_prizes_data(cleaned_lotterys, history_data)
+                lotterys_data = get_lottery_prizes_data(
+                    cleaned_lotterys, None, pool_name=self.current_pool_name
+                )
 
                 format_weight, _, _ = format_weight_for_display(lotterys_data, "weight")
 
@@ -462,10 +459,11 @@ class lottery_history_table(GroupHeaderCardWidget):
             # 如果是第一次加载（current_row == 0），获取并排序数据
             if self.current_row == 0:
                 cleaned_lotterys = get_lottery_pool_list(self.current_pool_name)
-                history_data = get_lottery_history_data(self.current_pool_name)
-
                 lotterys_data = get_lottery_session_data(
-                    cleaned_lotterys, history_data, self.current_subject
+                    cleaned_lotterys,
+                    None,
+                    self.current_subject,
+                    pool_name=self.current_pool_name,
                 )
 
                 self.has_class_record = any(
@@ -552,10 +550,12 @@ class lottery_history_table(GroupHeaderCardWidget):
             # 如果是第一次加载（current_row == 0），获取并排序数据
             if self.current_row == 0:
                 cleaned_lotterys = get_lottery_pool_list(self.current_pool_name)
-                history_data = get_lottery_history_data(self.current_pool_name)
-
                 lotterys_data = get_lottery_prize_stats_data(
-                    cleaned_lotterys, history_data, lottery_name, self.current_subject
+                    cleaned_lotterys,
+                    None,
+                    lottery_name,
+                    self.current_subject,
+                    pool_name=self.current_pool_name,
                 )
 
                 self.has_class_record = any(
@@ -917,28 +917,14 @@ class lottery_history_table(GroupHeaderCardWidget):
             return
 
         try:
-            history_file = get_data_path(
-                "history/lottery_history", f"{self.current_pool_name}.json"
-            )
-
-            if not file_exists(history_file):
+            if get_history_version("lottery", self.current_pool_name) is None:
                 self.available_subjects = []
                 return
 
-            with open_file(history_file, "r", encoding="utf-8") as f:
-                history_data = json.load(f)
-
             # 收集所有课程名称
-            subjects = set()
-            lotterys = history_data.get("lotterys", {})
-            for lottery_info in lotterys.values():
-                history = lottery_info.get("history", [])
-                for record in history:
-                    class_name = record.get("class_name", "")
-                    if class_name:
-                        subjects.add(class_name)
-
-            self.available_subjects = sorted(list(subjects))
+            self.available_subjects = get_history_subjects(
+                "lottery", self.current_pool_name
+            )
 
             # 更新课程下拉框
             if hasattr(self, "subject_comboBox"):
@@ -1,8 +1,6 @@
 # ==================================================
 # 导入库
 # ==================================================
-import json
-
 from loguru import logger
 from PySide6.QtWidgets import *
 from PySide6.QtGui import *
@@ -19,8 +17,6 @@ from app.Language.obtain_language import *
 from app.common.history import *
 from app.common.history.history_reader import (
     get_roll_call_student_list,
-    get_roll_call_history_data,
-    filter_roll_call_history_by_subject,
     get_roll_call_students_data,
     get_roll_call_session_data,
     get_roll_call_student_stats_data,
@@ -405,15 +401,11 @@ class roll_call_history_table(GroupHeaderCardWidget):
             # 如果是第一次加载（current_row == 0），获取并排序数据
             if self.current_row == 0:
                 cleaned_students = get_roll_call_student_list(self.current_class_name)
-                history_data = get_roll_call_history_data(self.current_class_name)
-
-                if self.current_subject:
-                    history_data = filter_roll_call_history_by_subject(
-                        history_data, self.current_subject
-                    )
-
                 students_data = get_roll_call_students_data(
-                    cleaned_students, history_data, self.current_subject
+                    cleaned_students,
+                    None,
+                    self.current_subject,
+                    class_name=self.current_class_name,
                 )
 
                 students_weight_data = calculate_weight(
@@ -531,10 +523,11 @@ class roll_call_history_table(GroupHeaderCardWidget):
             # 如果是第一次加载（current_row == 0），获取并排序数据
             if self.current_row == 0:
                 cleaned_students = get_roll_call_student_list(self.current_class_name)
-                history_data = get_roll_call_history_data(self.current_class_name)
-
                 students_data = get_roll_call_session_data(
-                    cleaned_students, history_data, self.current_subject
+                    cleaned_students,
+                    None,
+                    self.current_subject,
+                    class_name=self.current_class_name,
                 )
 
                 self.has_class_record = any(
@@ -645,10 +638,12 @@ class roll_call_history_table(GroupHeaderCardWidget):
             # 如果是第一次加载（current_row == 0），获取并排序数据
             if self.current_row == 0:
                 cleaned_students = get_roll_call_student_list(self.current_class_name)
-                history_data = get_roll_call_history_data(self.current_class_name)
-
                 students_data = get_roll_call_student_stats_data(
-                    cleaned_students, history_data, student_name, self.current_subject
+                    cleaned_students,
+                    None,
+                    student_name,
+                    self.current_subject,
+                    class_name=self.current_class_name,
                 )
 
                 self.has_class_record = any(
@@ -868,28 +863,14 @@ class roll_call_history_table(GroupHeaderCardWidget):
             return
 
         try:
-            history_file = get_data_path(
-                "history/roll_call_history", f"{self.current_class_name}.json"
-            )
-
-            if not file_exists(history_file):
+            if get_history_version("roll_call", self.current_class_name) is None:
                 self.available_subjects = []
                 return
 
-            with open_file(history_file, "r", encoding="utf-8") as f:
-                history_data = json.load(f)
-
             # 收集所有课程名称
-            subjects = set()
-            students = history_data.get("students", {})
-            for student_info in students.values():
-                history = student_info.get("history", [])
-                for record in history:
-                    class_name = record.get("class_name", "")
-                    if class_name:
-                        subjects.add(class_name)
-
-            self.available_subjects = sorted(list(subjects))
+            self.available_subjects = get_history_subjects(
+                "roll_call", self.current_class_name
+            )
 
             # 更新课程下拉框
             if hasattr(self, "subject_comboBox"):
@@ -9,6 +9,7 @@ from typing import Dict, Set, Callable, Any
 import weakref
 
 from app.tools.path_utils import get_path
+from app.common.data.list import invalidate_roster_cache
 
 
 class SharedFileWatcherManager(QObject):
@@ -139,6 +140,9 @@ class SharedFileWatcherManager(QObject):
         """
         path_str = str(get_path(path).resolve())
 
+        # 名单目录变化时丢弃对应的名单缓存
+        invalidate_roster_cache(path)
+
         # 调用所有有效的回调函数
         if path_str in self._callbacks:
             for callback in list(self._callbacks[path_str]):
@@ -146,6 +146,29 @@ class basic_fair_settings(GroupHeaderCardWidget):
             )
         )
 
+        # 小组是否按组内成员权重之和抽取
+        self.group_proportional_draw_switch = SwitchButton()
+        self.group_proportional_draw_switch.setOffText(
+            get_content_switchbutton_name_async(
+                "fair_draw_settings", "group_proportional_draw", "disable"
+            )
+        )
+        self.group_proportional_draw_switch.setOnText(
+            get_content_switchbutton_name_async(
+                "fair_draw_settings", "group_proportional_draw", "enable"
+            )
+        )
+        self.group_proportional_draw_switch.setChecked(
+            readme_settings_async("fair_draw_settings", "group_proportional_draw")
+        )
+        self.group_proportional_draw_switch.checkedChanged.connect(
+            lambda: update_settings(
+                "fair_draw_settings",
+                "group_proportional_draw",
+                self.group_proportional_draw_switch.isChecked(),
+            )
+        )
+
         # 添加设置项到分组
         self.addGroup(
             get_theme_icon("ic_fluent_lottery_20_filled"),
@@ -171,6 +194,14 @@ class basic_fair_settings(GroupHeaderCardWidget):
             get_content_description_async("fair_draw_settings", "fair_draw_time"),
             self.fair_draw_time_switch,
         )
+        self.addGroup(
+            get_theme_icon("ic_fluent_lottery_20_filled"),
+            get_content_name_async("fair_draw_settings", "group_proportional_draw"),
+            get_content_description_async(
+                "fair_draw_settings", "group_proportional_draw"
+            ),
+            self.group_proportional_draw_switch,
+        )
 
 
 class cold_start_settings(GroupHeaderCardWidget):
@@ -17,7 +17,12 @@ from app.tools.config import (
     create_sentry_before_send_filter,
 )
 from app.tools.settings_default import manage_settings_file
-from app.tools.settings_access import readme_settings_async, get_or_create_user_id
+from app.tools.settings_access import (
+    readme_settings_async,
+    get_or_create_user_id,
+    flush_settings,
+)
+from app.tools.history_writer import flush_history_writes
 from app.tools.online_status import (
     start_online_status_reporter,
     stop_online_status_reporter,
@@ -422,6 +427,12 @@ def handle_exit(
     """
     logger.debug("Qt 事件循环已结束")
 
+    if flush_settings():
+        logger.debug("设置修改已全部写入")
+
+    if flush_history_writes():
+        logger.debug("历史记录已全部写入")
+
     stop_online_status_reporter()
 
     cleanup_resources(